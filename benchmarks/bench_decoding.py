@@ -0,0 +1,52 @@
+"""Measures decode throughput of payment detail responses
+
+    $ python benchmarks/bench_decoding.py
+"""
+import copy
+import json
+import os
+import timeit
+
+from paypayopa.objects.payment import PaymentBody
+from paypayopa.objects.payment_auth import PaymentAuthBody
+
+MOCK = os.path.join(os.path.dirname(__file__), os.pardir, 'tests', 'mocks',
+                    'get_payment_details_completed.json')
+
+
+def payload(refunds=0, captures=0):
+    """
+    Returns a payment detail object with the given number of refunds and
+    captures
+    """
+    with open(MOCK) as mock:
+        data = json.load(mock)['data']
+    refund = data['refunds']['data'][0]
+    data['refunds'] = {'data': [dict(copy.deepcopy(refund), merchantRefundId='refund_{}'.format(i))
+                                for i in range(refunds)]}
+    data['captures'] = {'data': [{'merchantCaptureId': 'capture_{}'.format(i),
+                                  'amount': {'amount': 1, 'currency': 'JPY'},
+                                  'orderDescription': 'capture', 'status': 'COMPLETED',
+                                  'acceptedAt': 1609749561, 'requestedAt': 1609749559,
+                                  'expiresAt': 1609759559}
+                                 for i in range(captures)]}
+    return data
+
+
+def main():
+    cases = [
+        ("PaymentBody", PaymentBody, payload()),
+        ("PaymentBody 100 refunds", PaymentBody, payload(refunds=100)),
+        ("PaymentBody 1000 refunds", PaymentBody, payload(refunds=1000)),
+        ("PaymentAuthBody 100+100", PaymentAuthBody, payload(refunds=100, captures=100)),
+    ]
+    for name, cls, data in cases:
+        size = len(json.dumps(data))
+        number = max(1, 200000 // size)
+        seconds = min(timeit.repeat(lambda: cls.from_dict(data), number=number, repeat=5)) / number
+        print("{:<26} {:10.1f} us/op {:10.0f} ops/s {:8.1f} MB/s".format(
+            name, seconds * 1e6, 1 / seconds, size / seconds / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Measures the cold start of `import paypayopa` plus Client construction
+
+Each sample runs in a fresh interpreter. Exits with status 1 when the
+median exceeds the budget (in milliseconds).
+
+    $ python benchmarks/bench_import.py --budget 60
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+SNIPPET = """
+import time
+start = time.perf_counter()
+import paypayopa
+client = paypayopa.Client(auth=('key_id', 'key_secret'))
+print((time.perf_counter() - start) * 1000)
+"""
+
+DEFAULT_BUDGET_MS = 60.0
+
+
+def sample():
+    output = subprocess.check_output([sys.executable, '-c', SNIPPET])
+    return float(output)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=15)
+    args = parser.parse_args()
+    samples = [sample() for _ in range(args.runs)]
+    median = statistics.median(samples)
+    print("import + Client(): median {:.1f} ms, min {:.1f} ms, max {:.1f} ms (budget {:.0f} ms)".format(
+        median, min(samples), max(samples), args.budget))
+    if median > args.budget:
+        print("over budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
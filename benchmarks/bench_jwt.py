@@ -0,0 +1,52 @@
+"""Compares account link JWT throughput of JwtCodec with one-off pyjwt calls
+
+    $ python benchmarks/bench_jwt.py
+"""
+import base64
+import datetime
+import timeit
+import uuid
+
+import jwt
+
+from paypayopa.jwt_codec import JwtCodec
+
+SECRET = base64.b64encode(b'fake_secret_fake_secret_fake_sec').decode()
+NUMBER = 20000
+
+
+def legacy_encode():
+    return jwt.encode({
+        "iss": 'merchant',
+        "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=5),
+        "scope": "direct_debit",
+        "nonce": str(uuid.uuid4())[:8],
+        "redirectUrl": "https://example.com",
+        "referenceId": str(uuid.uuid4())[:8],
+        "deviceId": "",
+        "phoneNumber": "",
+    }, base64.b64decode(SECRET), algorithm='HS256')
+
+
+def main():
+    codec = JwtCodec('fake_client_id', SECRET)
+    token = jwt.encode({"aud": "fake_client_id", "userAuthorizationId": "user",
+                        "referenceId": "ref",
+                        "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)},
+                       base64.b64decode(SECRET), algorithm='HS256')
+    cases = [
+        ("encode pyjwt", legacy_encode),
+        ("encode JwtCodec", lambda: codec.encode(redirect_url="https://example.com")),
+        ("decode pyjwt", lambda: jwt.decode(token, base64.b64decode(SECRET),
+                                            algorithms='HS256', audience='fake_client_id')),
+        ("decode JwtCodec", lambda: codec.decode(token)),
+    ]
+    for name, fn in cases:
+        seconds = min(timeit.repeat(fn, number=NUMBER, repeat=3)) / NUMBER
+        print("{:<16} {:8.2f} us/op {:10.0f} ops/s".format(name, seconds * 1e6, 1 / seconds))
+    seconds = min(timeit.repeat(lambda: codec.encode_many(range(1000)), number=10, repeat=3)) / 10
+    print("{:<16} {:8.2f} ms per 1000 tokens".format("encode_many", seconds * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Replays a recording through Client at full speed
+
+Reports the time per request of the whole client pipeline and of decoding
+the recorded payment bodies alone. Without a recording one is made with
+the offline simulator.
+
+    $ python benchmarks/bench_replay.py traffic.jsonl.gz
+"""
+import argparse
+import os
+import tempfile
+import time
+import timeit
+
+import paypayopa
+from paypayopa.objects.payment import PaymentBody
+from paypayopa.recording import Replayer, load, record_session
+from paypayopa.simulator import Simulator
+
+AUTH = ('key_id', 'key_secret')
+
+
+def make_recording(path, payments=200):
+    simulator = Simulator(dict([AUTH]))
+    session = record_session(path, simulator.session())
+    client = paypayopa.Client(auth=AUTH, session=session)
+    for i in range(payments):
+        client.Payment.create({"merchantPaymentId": "order_{}".format(i),
+                               "userAuthorizationId": "user",
+                               "amount": {"amount": 100 + i, "currency": "JPY"},
+                               "requestedAt": int(time.time())})
+        client.Payment.get_payment_details("order_{}".format(i))
+    session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('recording', nargs='?')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    path = args.recording
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'traffic.jsonl.gz')
+        make_recording(path)
+    exchanges = load(path)
+    client = paypayopa.Client(auth=AUTH, session=Replayer(exchanges, loop=True).session(),
+                              coalesce=False)
+    codec = client.codec
+
+    def replay():
+        for exchange in exchanges:
+            client._dispatch(exchange['method'], exchange['path'],
+                             codec.loads(exchange['body']) if exchange['body'] else None,
+                             api_id=None)
+
+    seconds = min(timeit.repeat(replay, number=1, repeat=args.rounds)) / len(exchanges)
+    print("replay {:>6} requests {:10.1f} us/request".format(len(exchanges), seconds * 1e6))
+    bodies = [codec.loads(exchange['response'])['data'] for exchange in exchanges
+              if exchange['status'] < 300 and exchange['response'] and
+              '"merchantPaymentId"' in exchange['response']]
+    if bodies:
+        seconds = min(timeit.repeat(lambda: [PaymentBody.from_dict(body) for body in bodies],
+                                    number=1, repeat=args.rounds)) / len(bodies)
+        print("decode {:>6} payments {:10.1f} us/payment".format(len(bodies), seconds * 1e6))
+
+
+if __name__ == '__main__':
+    main()
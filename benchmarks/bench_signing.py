@@ -0,0 +1,69 @@
+"""Compares the OPA-Auth signer against the original Client.auth_header
+
+    $ python benchmarks/bench_signing.py
+"""
+import base64
+import datetime
+import hashlib
+import hmac
+import json
+import timeit
+import uuid
+
+from paypayopa.signing import Signer
+
+API_KEY = 'key_id'
+API_SECRET = 'key_secret'
+CONTENT_TYPE = "application/json;charset=UTF-8"
+PAYLOAD = {
+    "merchantPaymentId": "cb31bcc0-3b6c-46e0-9002-e5c4bb1e3d5f",
+    "codeType": "ORDER_QR",
+    "amount": {"amount": 1, "currency": "JPY"},
+    "orderDescription": "Example - Mune Cake shop",
+}
+
+
+def legacy_auth_header(api_key, api_secret, method, resource,
+                       content_type="empty", request_body=None):
+    auth_type = 'hmac OPA-Auth'
+    nonce = str(uuid.uuid4())[:8]
+    timestamp = str(int(datetime.datetime.now().timestamp()))
+    body_hash = "empty"
+    if request_body is not None:
+        hashed_body = hashlib.md5()
+        hashed_body.update(content_type.encode("utf-8"))
+        hashed_body.update(request_body.encode("utf-8"))
+        body_hash = base64.b64encode(hashed_body.digest())
+    if body_hash != "empty":
+        body_hash = body_hash.decode()
+    signature_list = "\n".join([resource, method, nonce, timestamp,
+                                content_type, body_hash])
+    hmac_data = hmac.new(api_secret.encode("utf-8"),
+                         signature_list.encode("utf-8"),
+                         digestmod=hashlib.sha256)
+    hmac_base64 = base64.b64encode(hmac_data.digest())
+    header_list = [api_key, hmac_base64.decode("utf-8"), nonce, timestamp,
+                   body_hash]
+    return "{}:{}".format(auth_type, ":".join(header_list))
+
+
+def main(number=50000):
+    body = json.dumps(PAYLOAD)
+    body_bytes = body.encode("utf-8")
+    signer = Signer(API_KEY, API_SECRET)
+    cases = [
+        ("legacy GET", lambda: legacy_auth_header(
+            API_KEY, API_SECRET, "GET", "/v2/payments/id")),
+        ("signer GET", lambda: signer.sign("GET", "/v2/payments/id")),
+        ("legacy POST", lambda: legacy_auth_header(
+            API_KEY, API_SECRET, "POST", "/v2/codes", CONTENT_TYPE, body)),
+        ("signer POST", lambda: signer.sign(
+            "POST", "/v2/codes", CONTENT_TYPE, body_bytes)),
+    ]
+    for name, case in cases:
+        seconds = min(timeit.repeat(case, number=number, repeat=5))
+        print("{:<12} {:8.2f} us/op".format(name, seconds / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Benchmark suite of the request pipeline with stored baselines
+
+Times request signing, body encoding, a Payment.create round trip against
+the local simulator, decoding of large payment details, and client
+construction and cold start. Results are compared with baseline.json and
+the run exits with status 1 when a benchmark is slower than its baseline
+by more than the tolerance.
+
+    $ python benchmarks/bench_suite.py                 # compare with baseline.json
+    $ python benchmarks/bench_suite.py -k decode       # only matching benchmarks
+    $ python benchmarks/bench_suite.py --save          # store a new baseline
+
+Baselines depend on the machine; save one before comparing on new hardware.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import timeit
+
+import paypayopa
+from paypayopa.objects.payment import PaymentBody
+from paypayopa.objects.payment_auth import PaymentAuthBody
+from paypayopa.simulator import Simulator
+
+from bench_decoding import payload
+from bench_import import sample as import_sample
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.5
+API_KEY = 'key_id'
+API_SECRET = 'key_secret'
+CREDENTIALS = {API_KEY: API_SECRET}
+CONTENT_TYPE = "application/json;charset=UTF-8"
+PAYMENT = {
+    "merchantPaymentId": "cb31bcc0-3b6c-46e0-9002-e5c4bb1e3d5f",
+    "userAuthorizationId": "fake_user_authorization_id",
+    "amount": {"amount": 1, "currency": "JPY"},
+    "requestedAt": 1609749559,
+    "orderDescription": "Example - Mune Cake shop",
+}
+
+BENCHMARKS = {}
+
+
+def benchmark(fn):
+    """
+    Registers fn, which returns the callable to time, under its name
+    """
+    BENCHMARKS[fn.__name__] = fn
+    return fn
+
+
+@benchmark
+def auth_header_get():
+    return lambda: paypayopa.Client.auth_header(API_KEY, API_SECRET, "GET", "/v2/payments/id")
+
+
+@benchmark
+def auth_header_post():
+    body = json.dumps(PAYMENT)
+    return lambda: paypayopa.Client.auth_header(API_KEY, API_SECRET, "POST", "/v2/payments",
+                                                CONTENT_TYPE, body)
+
+
+@benchmark
+def update_request():
+    client = paypayopa.Client(auth=(API_KEY, API_SECRET))
+    return lambda: client._update_request(PAYMENT, "/v2/payments", "POST")
+
+
+def _round_trip(client):
+    ids = iter(range(10 ** 9))
+
+    def create():
+        client.Payment.create(dict(PAYMENT, merchantPaymentId="bench_{}".format(next(ids))))
+    return create
+
+
+@benchmark
+def payment_create_in_process():
+    return _round_trip(Simulator(CREDENTIALS).client())
+
+
+@benchmark
+def payment_create_http():
+    server = Simulator(CREDENTIALS).serve()
+    client = paypayopa.Client(auth=(API_KEY, API_SECRET), base_url=server.url)
+    return _round_trip(client)
+
+
+@benchmark
+def decode_payment_1000_refunds():
+    data = json.dumps(payload(refunds=1000))
+    return lambda: PaymentBody.from_json(data)
+
+
+@benchmark
+def decode_payment_auth_100_captures():
+    data = json.dumps(payload(refunds=100, captures=100))
+    return lambda: PaymentAuthBody.from_json(data)
+
+
+@benchmark
+def client_construction():
+    return lambda: paypayopa.Client(auth=(API_KEY, API_SECRET))
+
+
+@benchmark
+def cold_import():
+    # each sample is a fresh interpreter, timed by the interpreter itself
+    return lambda: import_sample() / 1000
+
+
+# benchmarks too slow for timeit.autorange
+SAMPLED = {'cold_import': 9}
+
+
+def measure(name, repeat=7):
+    """
+    Returns the best seconds per call of a benchmark
+    """
+    fn = BENCHMARKS[name]()
+    if name in SAMPLED:
+        return statistics.median(fn() for _ in range(SAMPLED[name]))
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)['benchmarks']
+    except FileNotFoundError:
+        return {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-k', dest='pattern', default='',
+                        help='only run benchmarks whose name contains this')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown against the baseline, 0.5 = 50%%')
+    parser.add_argument('--save', action='store_true', help='store results as the baseline')
+    args = parser.parse_args(argv)
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+    for name in BENCHMARKS:
+        if args.pattern not in name:
+            continue
+        results[name] = seconds = measure(name)
+        line = "{:<34} {:12.2f} us".format(name, seconds * 1e6)
+        if name in baseline:
+            ratio = seconds / baseline[name]
+            line += "  {:6.2f}x baseline".format(ratio)
+            if ratio > 1 + args.tolerance:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'saved': int(time.time()),
+                       'benchmarks': baseline}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print("saved {}".format(args.baseline))
+    elif regressions:
+        print("{} slower than baseline: {}".format(len(regressions), ", ".join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
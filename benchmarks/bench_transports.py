@@ -0,0 +1,42 @@
+"""Compares the built-in transports on Payment.create and get_payment_details
+
+Every transport runs the same signing and decoding pipeline against the
+offline simulator served over loopback HTTP.
+
+    $ python benchmarks/bench_transports.py
+"""
+import time
+import timeit
+
+import paypayopa
+from paypayopa.simulator import Simulator
+
+AUTH = ('key_id', 'key_secret')
+NUMBER = 500
+
+
+def main():
+    simulator = Simulator(dict([AUTH]))
+    with simulator.serve() as server:
+        for name in ('requests', 'urllib3', 'httpx'):
+            client = paypayopa.Client(auth=AUTH, base_url=server.url, transport=name,
+                                      warm_up=True, coalesce=False)
+            ids = iter(range(10 ** 9))
+
+            def create():
+                client.Payment.create({"merchantPaymentId": "{}_{}".format(name, next(ids)),
+                                       "userAuthorizationId": "user",
+                                       "amount": {"amount": 100, "currency": "JPY"},
+                                       "requestedAt": int(time.time())})
+
+            def details():
+                client.Payment.get_payment_details("{}_0".format(name))
+
+            for case, fn in (("create", create), ("details", details)):
+                seconds = min(timeit.repeat(fn, number=NUMBER, repeat=3)) / NUMBER
+                print("{:<9} {:<8} {:8.1f} us/request".format(name, case, seconds * 1e6))
+            client.close()
+
+
+if __name__ == '__main__':
+    main()
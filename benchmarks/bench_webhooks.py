@@ -0,0 +1,53 @@
+"""Measures notifications handled per second by WebhookReceiver
+
+    $ python benchmarks/bench_webhooks.py
+"""
+import base64
+import datetime
+import json
+import timeit
+
+import jwt
+
+from paypayopa.objects.notification import TransactionNotification, UserAuthorizationNotification
+from paypayopa.webhooks import WebhookReceiver
+
+SECRET = base64.b64encode(b'fake_secret_fake_secret_fake_sec').decode()
+NUMBER = 20000
+
+
+def transactions():
+    for i in range(NUMBER):
+        yield json.dumps({
+            "notification_type": "Transaction", "merchant_id": "merchant",
+            "store_id": "", "pos_id": "", "order_id": str(i),
+            "merchant_order_id": "order_{}".format(i), "authorized_at": None,
+            "expires_at": None, "paid_at": "2024-01-01T00:00:00Z",
+            "order_amount": "100", "state": "COMPLETED"}).encode()
+
+
+def tokens():
+    exp = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    for i in range(NUMBER // 10):
+        yield jwt.encode({"result": "succeeded", "userAuthorizationId": "user",
+                          "referenceId": "reference_{}".format(i), "nonce": str(i),
+                          "aud": "fake_client_id", "exp": exp}, base64.b64decode(SECRET), algorithm='HS256')
+
+
+def main():
+    for name, bodies in (("json", list(transactions())), ("jwt", list(tokens()))):
+        # measures parsing and dedupe, not the API round trip of ApiVerifier
+        receiver = WebhookReceiver(secret=SECRET, client_id='fake_client_id',
+                                   verifier=lambda notification: True)
+        receiver.on(TransactionNotification)(lambda notification: None)
+        receiver.on(UserAuthorizationNotification)(lambda notification: None)
+        fresh = iter(bodies)
+        seconds = timeit.timeit(lambda: receiver.handle(next(fresh)), number=len(bodies))
+        duplicate = bodies[0]
+        dup_seconds = timeit.timeit(lambda: receiver.handle(duplicate), number=len(bodies))
+        print("{:<5} {:10.0f} notifications/s {:10.0f} duplicates/s".format(
+            name, len(bodies) / seconds, len(bodies) / dup_seconds))
+
+
+if __name__ == '__main__':
+    main()
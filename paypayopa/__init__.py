@@ -1,11 +1,38 @@
-from .client import Client
-from .resources import Code
+import importlib
+from typing import TYPE_CHECKING
+
 from .constants import ErrorCode
 from .constants import HttpStatusCode
 
+if TYPE_CHECKING:
+    # resolved by __getattr__ at runtime; imported here for linters and IDEs
+    from .async_client import AsyncClient
+    from .client import Client
+    from .resources import Code
+
+# heavier modules are imported on first access
+_LAZY = {
+    'Client': '.client',
+    'AsyncClient': '.async_client',
+    'Code': '.resources',
+}
+
 __all__ = [
     'Client',
+    'AsyncClient',
     'Code',
     'ErrorCode',
     'HttpStatusCode',
 ]
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,50 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+from .transports import (DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE,
+                         pool_manager_stats, socket_options)
+
+
+class PoolingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter with connection pool and TCP keep-alive tuning"""
+
+    def __init__(self, tcp_keepalive=None, **kwargs):
+        self.socket_options = None
+        if tcp_keepalive is not None:
+            self.socket_options = socket_options(tcp_keepalive)
+        super(PoolingHTTPAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options is not None:
+            kwargs['socket_options'] = self.socket_options
+        super(PoolingHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+
+
+def pool_stats(session):
+    """
+    Returns the connection usage of every host pool mounted on a session
+    """
+    stats = {}
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        poolmanager = getattr(adapter, 'poolmanager', None)
+        if poolmanager is not None:
+            stats.update(pool_manager_stats(poolmanager))
+    return stats
+
+
+def new_session(**options):
+    """
+    Creates a requests.Session whose adapters honour the pool options
+    """
+    session = requests.Session()
+    adapter = PoolingHTTPAdapter(
+        pool_connections=options.get('pool_connections', DEFAULT_POOL_CONNECTIONS),
+        pool_maxsize=options.get('pool_maxsize', DEFAULT_POOL_MAXSIZE),
+        pool_block=options.get('pool_block', False),
+        tcp_keepalive=options.get('tcp_keepalive'))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if options.get('keep_alive', True) is False:
+        session.headers['Connection'] = 'close'
+    return session
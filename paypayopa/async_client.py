@@ -0,0 +1,171 @@
+import asyncio
+import time
+
+from . import timeouts
+from .client import Client
+from .errors import DeadlineExceeded
+from .instrumentation import RequestEvent, emit
+
+
+class AsyncClient(Client):
+    """PayPay asyncio client class
+
+    Every resource method returns a coroutine resolving to the same value
+    the blocking Client returns. Requests are signed and validated exactly
+    like Client and sent over an async transport, by default a pooled
+    httpx.AsyncClient.
+    """
+
+    def __init__(self,
+                 session=None,
+                 auth=None,
+                 production_mode=False,
+                 **options):
+        """
+        Initialize an AsyncClient object with an optional httpx.AsyncClient
+        session, auth handler, and options
+
+        The transport option takes an async transport, by default a
+        transports.AsyncHttpxTransport. When no session is given a pooled
+        one is created from the max_connections, max_keepalive_connections,
+        keepalive_expiry and http2 options. Call warm_up() to open the
+        first connection early.
+        """
+        # warming up needs the event loop, see warm_up()
+        options.pop('warm_up', None)
+        super(AsyncClient, self).__init__(
+            session=session,
+            auth=auth,
+            production_mode=production_mode,
+            **options)
+
+    def _new_transport(self):
+        from .transports import get_transport
+        return get_transport(self._session, asynchronous=True, **self._options)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """
+        Closes the pooled connections of the transport
+        """
+        if self._transport is not None:
+            await self._transport.aclose()
+
+    def close(self):
+        raise TypeError("use `await client.aclose()` to close an AsyncClient")
+
+    async def warm_up(self):
+        """
+        Establishes a pooled connection (and TLS session) to the API host
+        """
+        await self.transport.warm_up(self.base_url)
+
+    async def request(self, method, path, auth_header, **options):
+        """
+        Dispatches a request to the PayPay HTTP API
+        """
+        api_name = options.pop('api_id')
+        merchant = options.pop('assume_merchant', None)
+        options.pop('cache', None)
+        timeout = timeouts.clamp(self.timeouts.get(api_name), api_name)
+        response = await self._send_by_deadline(method, path, auth_header, options,
+                                                timeout, api_name, merchant)
+        return self._process_response(response, api_name)
+
+    async def _send(self, method, path, auth_header, options, timeout=None, api_name=None,
+                    merchant=None):
+        url = "{}{}".format(self.base_url, path)
+        headers = self._headers(auth_header, merchant)
+        if self.circuit_breaker is None:
+            return await self.transport.request(method.upper(), url, headers,
+                                                timeout=timeout, **options)
+        breaker = self.circuit_breaker.get(api_name, self.base_url)
+        token = breaker.acquire()
+        healthy = None
+        try:
+            response = await self.transport.request(method.upper(), url, headers,
+                                                    timeout=timeout, **options)
+            healthy = not breaker.is_failure(response)
+            return response
+        except self._transport_errors():
+            healthy = False
+            raise
+        finally:
+            breaker.record(token, healthy)
+
+    async def _send_by_deadline(self, method, path, auth_header, options, timeout, api_name,
+                                merchant=None):
+        """
+        _send cancelled when the deadline in effect passes
+        """
+        left = timeouts.remaining()
+        if left is None:
+            return await self._send(method, path, auth_header, options, timeout, api_name,
+                                    merchant)
+        try:
+            return await asyncio.wait_for(
+                self._send(method, path, auth_header, options, timeout, api_name, merchant),
+                left)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(api_name)
+
+    async def _dispatch(self, method, path, data, with_response=False, **options):
+        api_name = options.pop('api_id')
+        parser = options.pop('parser', None)
+        merchant = options.pop('assume_merchant', None)
+        use_cache = options.pop('cache', True)
+        cache_key = self._cache_key(method, api_name, path, options, merchant)
+        if cache_key is not None and use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return self._cached(cached, api_name, method, path, parser, with_response)
+        attempt = 0
+        while True:
+            attempt += 1
+            event = RequestEvent(api_name, method, path, attempt) if self.hooks else None
+            try:
+                if self.rate_limiter is not None:
+                    delay = self.rate_limiter.reserve(api_name)
+                    if delay > 0:
+                        timeouts.check(api_name, delay)
+                        await asyncio.sleep(delay)
+                body, auth_header = self._update_request(data, path, method, event)
+                if method != "GET":
+                    options['data'] = body
+                timeout = timeouts.clamp(self.timeouts.get(api_name), api_name)
+            except Exception as e:
+                self._failed(event, e)
+                raise
+            try:
+                started = time.perf_counter() if event is not None else 0
+                response = await self._send_by_deadline(method, path, auth_header, options,
+                                                        timeout, api_name, merchant)
+                if event is not None:
+                    event.phases['network'] = time.perf_counter() - started
+            except self._transport_errors() as e:
+                self._failed(event, e)
+                delay = self._backoff(method, api_name, data, attempt, error=e)
+                if delay is None:
+                    timeouts.check(api_name)
+                    raise
+            except Exception as e:
+                self._failed(event, e)
+                raise
+            else:
+                delay = self._backoff(method, api_name, data, attempt, response=response)
+                if delay is None:
+                    return self._finish(response, api_name, method, path, data,
+                                        cache_key, parser, event, with_response)
+                if event is not None:
+                    event.finish(response)
+                    emit(self.hooks, event)
+            await asyncio.sleep(delay)
+
+    async def _coalesce(self, key, fn, parser):
+        return (await self.single_flight.do_async(key, fn, self._follower(parser)))[1]
+
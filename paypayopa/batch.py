@@ -0,0 +1,356 @@
+import csv
+import datetime
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from .bulk import run_concurrent
+
+STARTED = "started"
+DONE = "done"
+FAILED = "failed"
+VERIFIED = "verified"
+
+REFUND_CSV_FIELDS = ("merchantRefundId", "paymentId", "amount", "currency", "reason")
+
+
+class Journal(object):
+    """Append-only JSON lines checkpoint of a bulk operation
+
+    Every state change of a key is written and flushed before the call it
+    describes goes out, so a run that is interrupted at any point can be
+    resumed from the file without repeating calls that already went
+    through.
+    """
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._states = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a torn last line from a crash mid write
+                        continue
+                    self._states[entry["key"]] = entry
+        self._file = open(path, "a", encoding="utf-8")
+
+    def state(self, key):
+        """
+        Returns the last recorded state of a key, or None
+        """
+        entry = self._states.get(key)
+        return entry["state"] if entry else None
+
+    def entry(self, key):
+        return self._states.get(key)
+
+    def record(self, key, state, **extra):
+        entry = dict(extra, key=key, state=state)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._states[key] = entry
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def keys(self, state):
+        """
+        Returns the keys whose last recorded state is `state`
+        """
+        with self._lock:
+            return [key for key, entry in self._states.items() if entry["state"] == state]
+
+    def counts(self):
+        """
+        Returns the number of keys per state
+        """
+        counts = {}
+        with self._lock:
+            for entry in self._states.values():
+                counts[entry["state"]] = counts.get(entry["state"], 0) + 1
+        return counts
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+@dataclass
+class PayoutStats:
+    """Counters and timings of a CashbackPayout run"""
+    sent: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    duplicates: int = 0
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list, repr=False)
+    # final cashback status -> count, filled in by verify
+    verified: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def throughput(self):
+        """Calls sent per second"""
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def latency(self, q):
+        """Latency quantile of give_cashback calls in seconds"""
+        return _percentile(self.latencies, q)
+
+    def summary(self):
+        return {
+            "sent": self.sent,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "duplicates": self.duplicates,
+            "elapsed": self.elapsed,
+            "throughput": self.throughput,
+            "p50": self.latency(0.5),
+            "p95": self.latency(0.95),
+            "p99": self.latency(0.99),
+            "max": max(self.latencies, default=0.0),
+            "verified": dict(self.verified),
+        }
+
+
+def _result_code(response):
+    result_info = getattr(response, "result_info", None)
+    if result_info is None and isinstance(response, dict):
+        result_info = response.get("resultInfo")
+    return (result_info or {}).get("code")
+
+
+class RefundBatch(object):
+    """Refunds many payments through Pending.refund_payment
+
+    Every refund is validated before the first one is sent. Refunds then
+    run on `concurrency` threads, at most `rate` per second, and results
+    are yielded as BulkResults keyed by merchantRefundId whose response
+    is a RefundAPIResponse. With a journal, refunds recorded as done are
+    skipped on a rerun, and refunds that were in flight are looked up with
+    refund_details before being sent again.
+    """
+
+    def __init__(self, client, journal=None, concurrency=8, rate=None):
+        self.client = client
+        if isinstance(journal, (str, os.PathLike)):
+            journal = Journal(journal)
+        self.journal = journal
+        self.concurrency = concurrency
+        self.rate = rate
+
+    @staticmethod
+    def read_csv(stream):
+        """
+        Yields refund requests from CSV rows with REFUND_CSV_FIELDS
+        columns; currency defaults to JPY
+        """
+        for row in csv.DictReader(stream):
+            amount = (row.get("amount") or "").strip()
+            try:
+                amount = int(amount)
+            except ValueError:
+                pass
+            data = {
+                "merchantRefundId": row.get("merchantRefundId"),
+                "paymentId": row.get("paymentId"),
+                "amount": {"amount": amount,
+                           "currency": row.get("currency") or "JPY"},
+            }
+            if row.get("reason"):
+                data["reason"] = row["reason"]
+            yield {key: value for key, value in data.items() if value is not None}
+
+    def validate(self, refunds):
+        """
+        Checks every refund request and returns them as a list, raising a
+        single ValueError that lists all invalid rows
+        """
+        refunds = list(refunds)
+        errors = []
+        seen = set()
+        for index, data in enumerate(refunds):
+            try:
+                self.client.Pending.validate_refund_payment(data)
+            except (ValueError, KeyError, TypeError) as e:
+                errors.append("row {}: {}".format(index, e))
+                continue
+            refund_id = data["merchantRefundId"]
+            if refund_id in seen:
+                errors.append("row {}: duplicate merchantRefundId {}".format(index, refund_id))
+            seen.add(refund_id)
+        if errors:
+            raise ValueError("{} invalid refund requests\n{}".format(
+                len(errors), "\n".join(errors)))
+        return refunds
+
+    def run(self, refunds):
+        """
+        Validates and sends refunds, yielding a BulkResult for each
+        """
+        refunds = self.validate(refunds)
+        requested_at = int(datetime.datetime.now().timestamp())
+        by_id = {data["merchantRefundId"]:
+                 dict(data, requestedAt=data.get("requestedAt", requested_at))
+                 for data in refunds}
+        for result in run_concurrent(lambda refund_id: self._refund(by_id[refund_id]),
+                                     list(by_id),
+                                     concurrency=self.concurrency,
+                                     rate=self.rate):
+            if result.ok:
+                result.response, result.skipped = result.response
+            elif self.journal is not None:
+                self.journal.record(result.key, FAILED, error=repr(result.error))
+            yield result
+
+    def _refund(self, data):
+        refund_id = data["merchantRefundId"]
+        journal = self.journal
+        state = journal.state(refund_id) if journal is not None else None
+        if state == DONE:
+            return None, True
+        if state is not None:
+            # the refund may have reached PayPay before the previous run
+            # stopped, refund_details tells whether to send it again
+            response = self.client.Pending.refund_details(refund_id)
+            if response is not None and response.data is not None:
+                journal.record(refund_id, DONE, code=_result_code(response))
+                return response, True
+        if journal is not None:
+            journal.record(refund_id, STARTED)
+        response = self.client.Pending.refund_payment(data)
+        if journal is not None:
+            journal.record(refund_id, DONE, code=_result_code(response))
+        return response, False
+
+
+class CashbackPayout(object):
+    """Pays out many cashbacks through Cashback.give_cashback
+
+    Requests are pulled from an iterator as workers free up, so a
+    campaign of any size runs in constant memory apart from the set of
+    merchantCashbackIds used to drop duplicates. Each request is validated
+    just before it is sent and an invalid one is reported on its result.
+    The journal works as for RefundBatch, using check_cashback_detail to
+    look up payouts that were in flight. Counters and latencies of the
+    last run are kept in `stats`.
+    """
+
+    def __init__(self, client, journal=None, concurrency=8, rate=None):
+        self.client = client
+        if isinstance(journal, (str, os.PathLike)):
+            journal = Journal(journal)
+        self.journal = journal
+        self.concurrency = concurrency
+        self.rate = rate
+        self.stats = PayoutStats()
+        self._lock = threading.Lock()
+
+    def _unique(self, cashbacks):
+        seen = set()
+        for data in cashbacks:
+            cashback_id = data.get("merchantCashbackId")
+            if cashback_id is not None:
+                if cashback_id in seen:
+                    self.stats.duplicates += 1
+                    continue
+                seen.add(cashback_id)
+            yield cashback_id, data
+
+    def run(self, cashbacks):
+        """
+        Sends cashbacks, yielding a BulkResult keyed by merchantCashbackId
+        for each unique one
+        """
+        self.stats = PayoutStats()
+        started = time.perf_counter()
+        try:
+            for result in run_concurrent(lambda item: self._give(*item),
+                                         self._unique(cashbacks),
+                                         concurrency=self.concurrency,
+                                         rate=self.rate):
+                result.key = result.key[0]
+                if result.ok:
+                    result.response, result.skipped = result.response
+                    if result.skipped:
+                        self.stats.skipped += 1
+                    else:
+                        self.stats.succeeded += 1
+                else:
+                    self.stats.failed += 1
+                    if self.journal is not None and result.key is not None:
+                        self.journal.record(result.key, FAILED, error=repr(result.error))
+                yield result
+        finally:
+            self.stats.elapsed = time.perf_counter() - started
+
+    def _give(self, cashback_id, data):
+        self.client.Cashback.validate_give_cashback(data)
+        journal = self.journal
+        state = journal.state(cashback_id) if journal is not None else None
+        if state in (DONE, VERIFIED):
+            return None, True
+        if state is not None:
+            response = self.client.Cashback.check_cashback_detail(cashback_id)
+            if response is not None and response.get("data"):
+                journal.record(cashback_id, DONE, code=_result_code(response))
+                return response, True
+        if journal is not None:
+            journal.record(cashback_id, STARTED)
+        started = time.perf_counter()
+        try:
+            response = self.client.Cashback.give_cashback(data)
+        finally:
+            latency = time.perf_counter() - started
+            with self._lock:
+                self.stats.sent += 1
+                self.stats.latencies.append(latency)
+        if journal is not None:
+            journal.record(cashback_id, DONE, code=_result_code(response))
+        return response, False
+
+    def verify(self, merchant_cashback_ids=None):
+        """
+        Looks up the final state of payouts with check_cashback_detail,
+        by default of every payout the journal records as done, and
+        yields a BulkResult per payout. Final statuses are counted in
+        stats.verified.
+        """
+        if merchant_cashback_ids is None:
+            if self.journal is None:
+                raise ValueError("merchant_cashback_ids are required without a journal")
+            merchant_cashback_ids = self.journal.keys(DONE)
+        self.stats.verified = {}
+        for result in run_concurrent(self.client.Cashback.check_cashback_detail,
+                                     merchant_cashback_ids,
+                                     concurrency=self.concurrency,
+                                     rate=self.rate):
+            if result.ok:
+                data = (result.response or {}).get("data") or {}
+                status = data.get("status", "NOT_FOUND")
+                self.stats.verified[status] = self.stats.verified.get(status, 0) + 1
+                if self.journal is not None and data:
+                    self.journal.record(result.key, VERIFIED, status=status)
+            yield result
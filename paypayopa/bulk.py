@@ -0,0 +1,125 @@
+import asyncio
+import collections
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from . import timeouts
+from .ratelimit import TokenBucket
+
+
+@dataclass
+class BulkResult:
+    """Outcome of one call of a bulk operation"""
+    key: Any
+    response: Any = None
+    error: Optional[BaseException] = None
+    # set when a resumed run found the call already done
+    skipped: bool = False
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _call(fn, key, pacer):
+    try:
+        timeouts.check()
+        if pacer is not None:
+            pacer.acquire()
+        return BulkResult(key, response=fn(key))
+    except Exception as e:
+        return BulkResult(key, error=e)
+
+
+def run_concurrent(fn, keys, concurrency=8, rate=None, ordered=False):
+    """
+    Calls fn for every key on a thread pool and yields BulkResults as
+    they complete, or in input order when ordered=True. At most
+    concurrency calls run at once and at most rate calls start per second.
+    Calls run in the caller's context, so a timeouts.deadline() around the
+    iteration applies to them; calls starting after it passed fail with
+    DeadlineExceeded.
+    """
+    pacer = TokenBucket(rate, capacity=1) if rate else None
+    window = concurrency * 2
+    keys = iter(keys)
+    pending = collections.deque() if ordered else set()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        while True:
+            for key in keys:
+                future = executor.submit(contextvars.copy_context().run, _call, fn, key, pacer)
+                if ordered:
+                    pending.append(future)
+                else:
+                    pending.add(future)
+                if len(pending) >= window:
+                    break
+            if not pending:
+                return
+            if ordered:
+                yield pending.popleft().result()
+            else:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_concurrent_async(fn, keys, concurrency=8, rate=None, ordered=False):
+    """
+    Asyncio counterpart of run_concurrent for coroutine functions
+    """
+    pacer = TokenBucket(rate, capacity=1) if rate else None
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(key):
+        async with semaphore:
+            try:
+                timeouts.check()
+                if pacer is not None:
+                    await pacer.acquire_async()
+                return BulkResult(key, response=await fn(key))
+            except Exception as e:
+                return BulkResult(key, error=e)
+
+    window = concurrency * 2
+    keys = iter(keys)
+    pending = collections.deque() if ordered else set()
+    try:
+        while True:
+            for key in keys:
+                task = asyncio.ensure_future(call(key))
+                if ordered:
+                    pending.append(task)
+                else:
+                    pending.add(task)
+                if len(pending) >= window:
+                    break
+            if not pending:
+                return
+            if ordered:
+                yield await pending.popleft()
+            else:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def fan_out(client, fn, keys, **options):
+    """
+    Runs the calls fn makes through client over keys with the runner of
+    the client: run_concurrent for a Client, run_concurrent_async for an
+    AsyncClient, whose fn returns coroutines
+    """
+    from .async_client import AsyncClient
+    if isinstance(client, AsyncClient):
+        return run_concurrent_async(fn, keys, **options)
+    return run_concurrent(fn, keys, **options)
@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .constants.api_list import API_NAMES
+from .singleflight import copy_json
+
+# seconds a read is cached for, per API_NAMES entry; APIs not listed
+# are never cached
+DEFAULT_TTLS = {
+    API_NAMES.GET_PAYMENT: 5.0,
+    API_NAMES.GET_QR_PAYMENT: 5.0,
+    API_NAMES.GET_REQUEST_ORDER: 5.0,
+    API_NAMES.GET_REFUND: 5.0,
+    API_NAMES.GET_CASHBACK_DETAILS: 5.0,
+    API_NAMES.GET_REVERESED_CASHBACK_DETAILS: 5.0,
+    API_NAMES.GET_USER_AUTH_STATUS: 5.0,
+}
+# seconds a read is cached for by the status in its data, overriding
+# the API ttl: final states long, states still moving briefly
+DEFAULT_STATUS_TTLS = {
+    "COMPLETED": 300.0,
+    "REFUNDED": 300.0,
+    "CANCELED": 300.0,
+    "EXPIRED": 300.0,
+    "FAILED": 300.0,
+    "SUCCESS": 300.0,
+    "AUTHORIZED": 30.0,
+    "CREATED": 1.0,
+}
+# response and request fields whose values identify the object a cache
+# entry is about
+ID_KEYS = (
+    "merchantPaymentId",
+    "paymentId",
+    "merchantRefundId",
+    "merchantCashbackId",
+    "merchantCashbackReversalId",
+    "userAuthorizationId",
+)
+
+
+def _ids(path, data):
+    """
+    Returns the identifiers a request path and body refer to
+    """
+    ids = {path.rstrip("/").rsplit("/", 1)[-1]}
+    if isinstance(data, dict):
+        ids.update(str(data[key]) for key in ID_KEYS if data.get(key))
+    return ids
+
+
+class ResponseCache(object):
+    """Thread-safe LRU cache of read responses
+
+    Holds at most maxsize decoded responses, each for the ttl of its API
+    (or of the status in its data, see DEFAULT_STATUS_TTLS). Entries are
+    tagged with the ids they refer to, and a successful write through the
+    same client (cancel, refund, capture, ...) naming one of those ids
+    drops them. Responses are copied in and out (see copy_json), so every
+    caller gets its own and may modify it.
+    """
+
+    def __init__(self, maxsize=1024, ttls=None, status_ttls=None):
+        self.maxsize = maxsize
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.status_ttls = dict(DEFAULT_STATUS_TTLS if status_ttls is None else status_ttls)
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(api_id, path, params=None, merchant=None):
+        if params:
+            params = tuple(sorted(params.items()))
+        return api_id, path, params or None, merchant or None
+
+    def cacheable(self, api_id):
+        return api_id in self.ttls
+
+    def get(self, key):
+        """
+        Returns a copy of the cached response of a key, or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, response, tags = entry
+            if expires <= time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy_json(response)
+
+    def ttl(self, api_id, response):
+        data = response.get("data") if isinstance(response, dict) else None
+        status = data.get("status") if isinstance(data, dict) else None
+        if status in self.status_ttls:
+            return self.status_ttls[status]
+        return self.ttls.get(api_id, 0)
+
+    def set(self, key, response):
+        api_id, path, params, _ = key
+        ttl = self.ttl(api_id, response)
+        if ttl <= 0 or response is None:
+            return
+        tags = _ids(path, dict(params or ()))
+        data = response.get("data") if isinstance(response, dict) else None
+        tags |= _ids("", data) - {""}
+        response = copy_json(response)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, response, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *ids):
+        """
+        Drops every entry about one of the given ids
+        """
+        with self._lock:
+            for id in ids:
+                for key in list(self._tags.get(str(id), ())):
+                    self._drop(key)
+                    self.invalidations += 1
+
+    def invalidate_request(self, path, data):
+        """
+        Drops the entries a write request to path with body data affects
+        """
+        self.invalidate(*_ids(path, data))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def get_response_cache(cache=None):
+    """
+    Resolves the cache client option: a ResponseCache, True for the
+    default one, or None/False to disable caching
+    """
+    if cache is True:
+        return ResponseCache()
+    if not cache:
+        return None
+    return cache
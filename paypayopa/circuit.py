@@ -0,0 +1,252 @@
+"""Circuit breakers per PayPay endpoint
+
+A breaker watches the outcomes of the requests made to one API of one
+base URL. When the share of failures (5xx responses, connection errors
+and timeouts) within the last `window` seconds reaches `failure_rate`,
+the circuit opens and requests fail fast with errors.CircuitOpenError
+instead of waiting on a degraded endpoint. After `open_for` seconds up to
+`half_open_probes` requests are let through: the circuit closes once they
+all succeed and opens again on the first failure.
+"""
+import collections
+import logging
+import threading
+import time
+
+from .errors import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+FAILURE_STATUSES = (500, 502, 503, 504)
+# the failure rate window is counted in this many slices
+WINDOW_SLICES = 10
+
+
+class CircuitBreaker(object):
+    """Thread-safe circuit breaker of one endpoint
+
+    on_state_change is called with the breaker, the old and the new
+    state on every transition.
+    """
+
+    def __init__(self, api_id=None, base_url=None,
+                 failure_rate=0.5,
+                 min_requests=20,
+                 window=30.0,
+                 open_for=15.0,
+                 half_open_probes=1,
+                 failure_statuses=FAILURE_STATUSES,
+                 on_state_change=None):
+        if not 0 < failure_rate <= 1:
+            raise ValueError("failure_rate should be in (0, 1]")
+        self.api_id = api_id
+        self.base_url = base_url
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.open_for = open_for
+        self.half_open_probes = half_open_probes
+        self.failure_statuses = frozenset(failure_statuses)
+        self.on_state_change = on_state_change
+        self._state = CLOSED
+        # bumped on every transition, so late outcomes of an older state are ignored
+        self._epoch = 0
+        self._opened_at = None
+        self._probes = 0
+        self._probe_successes = 0
+        # [slice start, requests, failures]
+        self._slices = collections.deque()
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """
+        One of CLOSED, OPEN and HALF_OPEN
+        """
+        with self._lock:
+            if self._state == OPEN and self._retry_after(time.monotonic()) <= 0:
+                return HALF_OPEN
+            return self._state
+
+    def _retry_after(self, now):
+        return self._opened_at + self.open_for - now
+
+    def _prune(self, now):
+        while self._slices and self._slices[0][0] <= now - self.window:
+            self._slices.popleft()
+
+    def _counts(self):
+        return (sum(s[1] for s in self._slices), sum(s[2] for s in self._slices))
+
+    def _transition(self, state, now, changes):
+        changes.append((self._state, state))
+        self._state = state
+        self._epoch += 1
+        self._probes = 0
+        self._probe_successes = 0
+        if state == OPEN:
+            self._opened_at = now
+        elif state == CLOSED:
+            self._opened_at = None
+            self._slices.clear()
+
+    def _notify(self, changes):
+        for old, new in changes:
+            log = logger.warning if new == OPEN else logger.info
+            log("Circuit of %s at %s %s", self.api_id, self.base_url, new.replace('_', '-'))
+            if self.on_state_change is not None:
+                self.on_state_change(self, old, new)
+
+    def acquire(self):
+        """
+        Admits a request, returning the token to record its outcome with,
+        or raises errors.CircuitOpenError
+        """
+        changes = []
+        try:
+            with self._lock:
+                now = time.monotonic()
+                if self._state == OPEN:
+                    retry_after = self._retry_after(now)
+                    if retry_after > 0:
+                        raise CircuitOpenError(self.api_id, self.base_url, retry_after)
+                    self._transition(HALF_OPEN, now, changes)
+                if self._state == HALF_OPEN:
+                    if self._probes >= self.half_open_probes:
+                        raise CircuitOpenError(self.api_id, self.base_url)
+                    self._probes += 1
+                    return self._epoch
+                return None
+        finally:
+            self._notify(changes)
+
+    def is_failure(self, response):
+        return response.status_code in self.failure_statuses
+
+    def record(self, token, healthy):
+        """
+        Records the outcome of a request admitted by acquire(): healthy is
+        True, False, or None when the request was abandoned by the caller
+        """
+        changes = []
+        with self._lock:
+            now = time.monotonic()
+            if token is not None:
+                if self._state != HALF_OPEN or token != self._epoch:
+                    return
+                self._probes -= 1
+                if healthy is False:
+                    self._transition(OPEN, now, changes)
+                elif healthy:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self._transition(CLOSED, now, changes)
+            elif self._state == CLOSED and healthy is not None:
+                self._prune(now)
+                if not self._slices or self._slices[-1][0] <= now - self.window / WINDOW_SLICES:
+                    self._slices.append([now, 0, 0])
+                self._slices[-1][1] += 1
+                if not healthy:
+                    self._slices[-1][2] += 1
+                    requests, failures = self._counts()
+                    if (requests >= self.min_requests and
+                            failures >= self.failure_rate * requests):
+                        self._transition(OPEN, now, changes)
+        self._notify(changes)
+
+    def reset(self):
+        """
+        Closes the circuit and forgets the recorded outcomes
+        """
+        changes = []
+        with self._lock:
+            if self._state != CLOSED:
+                self._transition(CLOSED, time.monotonic(), changes)
+            self._slices.clear()
+        self._notify(changes)
+
+    def snapshot(self):
+        """
+        Returns the state, the requests and failures counted in the window,
+        their failure rate and the seconds until the circuit half-opens
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            requests, failures = self._counts()
+            state, retry_after = self._state, None
+            if state == OPEN:
+                retry_after = max(0.0, self._retry_after(now))
+                if retry_after == 0:
+                    state = HALF_OPEN
+            return {
+                'state': state,
+                'requests': requests,
+                'failures': failures,
+                'failure_rate': failures / requests if requests else 0.0,
+                'retry_after': retry_after,
+            }
+
+
+class CircuitBreakers(object):
+    """Circuit breakers keyed by base URL and API_NAMES entry
+
+    The breakers are created on first use from the CircuitBreaker keyword
+    arguments, updated with the overrides given for their api_id.
+    CircuitBreakers may be shared by several clients.
+    """
+
+    def __init__(self, overrides=None, **defaults):
+        self.overrides = dict(overrides or {})
+        self.defaults = defaults
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, api_id, base_url=None):
+        """
+        Returns the breaker of an API at base_url
+        """
+        key = (base_url, api_id)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    settings = dict(self.defaults, **self.overrides.get(api_id, {}))
+                    breaker = self._breakers[key] = CircuitBreaker(api_id, base_url,
+                                                                   **settings)
+        return breaker
+
+    def snapshot(self):
+        """
+        Returns {base_url: {api_id: CircuitBreaker.snapshot()}} for
+        dashboards
+        """
+        with self._lock:
+            breakers = list(self._breakers.values())
+        snapshot = {}
+        for breaker in breakers:
+            snapshot.setdefault(breaker.base_url, {})[breaker.api_id] = breaker.snapshot()
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            breakers = list(self._breakers.values())
+        for breaker in breakers:
+            breaker.reset()
+
+
+def get_circuit_breakers(circuit_breaker=None):
+    """
+    Resolves the circuit_breaker client option: a CircuitBreakers, True
+    for the default settings, or None/False to disable circuit breaking
+    """
+    if circuit_breaker is True:
+        return CircuitBreakers()
+    if not circuit_breaker:
+        return None
+    return circuit_breaker
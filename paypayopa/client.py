@@ -1,19 +1,46 @@
-import hmac
-import hashlib
-import base64
-import importlib.metadata
-import json
+import importlib
+import functools
+import logging
+import threading
+import time
 
-import jwt
-import requests
-import uuid
-import datetime
+from .constants import URL, HttpStatusCode
 
-from pkg_resources import DistributionNotFound
+from . import codec
+from . import timeouts
+from .instrumentation import RequestEvent, emit
+from .cache import get_response_cache
+from .circuit import OPEN, get_circuit_breakers
+from .errors import error_for_response
+from .retry import get_retry_policy
+from .signing import Signer
+from .singleflight import SingleFlight, copy_json
 
-from .constants import URL, HttpStatusCode
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=32)
+def _jwt_codec(client_id, secret):
+    from .jwt_codec import JwtCodec
+    return JwtCodec(client_id, secret)
+
+
+class _LazyResource(object):
+    """Creates a client resource on first attribute access, once per client"""
 
-from . import resources
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, client, owner=None):
+        if client is None:
+            return self
+        with client._lock:
+            resource = client.__dict__.get(self.name)
+            if resource is None:
+                resources = importlib.import_module('.resources', __package__)
+                resource = getattr(resources, self.name)(client)
+                client.__dict__[self.name] = resource
+        return resource
 
 
 class Client:
@@ -24,6 +51,15 @@ class Client:
         'perf_mode_base_url': URL.PERF_BASE_URL
     }
 
+    # resources are created on first access
+    Code = _LazyResource('Code')
+    Payment = _LazyResource('Payment')
+    Account = _LazyResource('Account')
+    Preauth = _LazyResource('Preauth')
+    Pending = _LazyResource('Pending')
+    User = _LazyResource('User')
+    Cashback = _LazyResource('Cashback')
+
     def __init__(self,
                  session=None,
                  auth=None,
@@ -32,30 +68,98 @@ class Client:
         """
         Initialize a Client object with session,
         optional auth handler, and options
+
+        Requests are sent over the transport option: a
+        transports.Transport instance, or "requests" (the default),
+        "urllib3" or "httpx". A given session is used by the requests
+        transport. Otherwise a pooled one is created from the
+        pool_connections, pool_maxsize, pool_block, keep_alive and
+        tcp_keepalive options. warm_up=True opens the first connection
+        to the API host during construction. json_codec selects the JSON
+        codec ("orjson", "ujson", "json" or a codec.JSONCodec instance);
+        by default the fastest installed one is used. retry takes a
+        retry.RetryPolicy (or True for the default one) to resend failed
+        requests that are safe to repeat. rate_limiter takes a
+        ratelimit.RateLimiter throttling requests per API_NAMES entry.
+        cache takes a cache.ResponseCache (or True for the default one)
+        serving repeated detail reads from memory. Concurrent identical
+        GETs share one request unless coalesce=False. hooks is a list of
+        callables receiving an instrumentation.RequestEvent with the
+        phase timings of every request attempt. timeout takes the connect
+        and read timeouts of every attempt: a timeouts.Timeouts with per
+        API overrides, a (connect, read) tuple, or the read timeout in
+        seconds. Requests made inside a timeouts.deadline() block are
+        shortened to it, and raise errors.DeadlineExceeded once it passes.
+        circuit_breaker takes a circuit.CircuitBreakers (or True for the
+        default one) failing requests to a degraded API fast with
+        errors.CircuitOpenError. assume_merchant sets the
+        X-ASSUME-MERCHANT header of every request; resource methods take
+        an assume_merchant keyword to override it per call, and reads take
+        cache=False to skip the response cache and coalescing.
+
+        A client holds no per-call state and may be shared by threads.
         """
-        self.session = session or requests.Session()
+        self._lock = threading.RLock()
+        self._session = session
+        self._transport = None
+        self._options = options
         self.auth = auth
+        self.signer = Signer(*auth) if auth else None
+        self.codec = codec.get_codec(options.get('json_codec'))
+        self.retry = get_retry_policy(options.get('retry'))
+        self.rate_limiter = options.get('rate_limiter')
+        self.cache = get_response_cache(options.get('cache'))
+        self.single_flight = SingleFlight() if options.get('coalesce', True) else None
+        self.hooks = tuple(options.get('hooks') or ())
+        self.timeouts = timeouts.get_timeouts(options.get('timeout'))
+        self.circuit_breaker = get_circuit_breakers(options.get('circuit_breaker'))
         self.production_mode = production_mode
         self.perf_mode = options.get('perf_mode')
-        self.assume_merchant = ""
+        self.assume_merchant = options.get('assume_merchant') or ""
 
         self.base_url = self._set_base_url(**options)
-        # initializes each resource
-        self.Code = resources.Code(self)
-        self.Payment = resources.Payment(self)
-        self.Account = resources.Account(self)
-        self.Preauth = resources.Preauth(self)
-        self.Pending = resources.Pending(self)
-        self.User = resources.User(self)
-        self.Cashback = resources.Cashback(self)
+
+        if options.get('warm_up'):
+            self.warm_up()
+
+    @property
+    def transport(self):
+        """
+        The transport requests are sent over, created on first use
+        """
+        transport = self._transport
+        if transport is None:
+            with self._lock:
+                if self._transport is None:
+                    self._transport = self._new_transport()
+                transport = self._transport
+        return transport
+
+    def _new_transport(self):
+        from .transports import get_transport
+        return get_transport(self._session, **self._options)
+
+    @property
+    def session(self):
+        """
+        The HTTP session of the transport, if it has one
+        """
+        return getattr(self.transport, 'session', None)
+
+    @session.setter
+    def session(self, session):
+        with self._lock:
+            self._session = session
+            self._transport = None
 
     @staticmethod
     def get_version():
+        import importlib.metadata
         version = ""
         try:
             version = importlib.metadata.version("paypayopa")
-        except DistributionNotFound:
-            print('DistributionNotFound')
+        except importlib.metadata.PackageNotFoundError:
+            logger.debug("paypayopa package metadata not found")
         return version
 
     def _set_base_url(self, **options):
@@ -71,175 +175,351 @@ class Client:
             del (options['base_url'])
         return base_url
 
+    def warm_up(self):
+        """
+        Establishes a pooled connection (and TLS session) to the API host
+        """
+        self.transport.warm_up(self.base_url)
+
+    def pool_stats(self):
+        """
+        Returns per host connection pool statistics of the transport
+        """
+        return self.transport.pool_stats()
+
+    def close(self):
+        """
+        Closes the pooled connections of the transport
+        """
+        if self._transport is not None:
+            self._transport.close()
+
     def set_assume_merchant(self, merchant):
+        """
+        Sets the default X-ASSUME-MERCHANT of every request of the client.
+        Pass assume_merchant to a resource method to act for a merchant in
+        one call instead.
+        """
         if merchant:
             self.assume_merchant = merchant
 
     @staticmethod
     def encode_jwt(secret: str, scope="direct_debit",
                    redirect_url=None,
-                   reference_id=str(uuid.uuid4())[:8],
+                   reference_id=None,
                    device_id="", phone_number=""):
-        jwt_data = {
-            "iss": 'merchant',
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(minutes=5),
-            "scope": scope,
-            "nonce": str(uuid.uuid4())[:8],
-            "redirectUrl": redirect_url,
-            "referenceId": reference_id,
-            "deviceId": device_id,
-            "phoneNumber": phone_number
-        }
-        encoded = jwt.encode(jwt_data,
-                             base64.b64decode(secret),
-                             algorithm='HS256')
-        return encoded
+        return _jwt_codec(None, secret).encode(scope, redirect_url, reference_id,
+                                               device_id, phone_number)
 
     @staticmethod
     def decode_jwt(client_id, secret, token):
+        from .errors import JwtError
         try:
-            ca = jwt.decode(token, base64.b64decode(secret), algorithms='HS256', audience=client_id)
-            return ca.get('userAuthorizationId'), ca.get('referenceId')
-        except Exception as e:
-            print("JWT Signature verification failed: ", e)
+            result = _jwt_codec(client_id, secret).decode(token)
+            return result.user_authorization_id, result.reference_id
+        except JwtError as e:
+            logger.warning("JWT Signature verification failed: %s", e)
+
+    @staticmethod
+    def jwt_codec(client_id, secret):
+        """
+        Returns the jwt_codec.JwtCodec of a client id and secret, for
+        batch encoding and typed verification results
+        """
+        return _jwt_codec(client_id, secret)
 
     @staticmethod
     def auth_header(api_key, api_secret,
                     method, resource, content_type="empty",
                     request_body=None):
-        auth_type = 'hmac OPA-Auth'
-        nonce = str(uuid.uuid4())[:8]
-        timestamp = str(int(datetime.datetime.now().timestamp()))
-        body_hash = "empty"
-        if request_body is not None:
-            hashed_body = hashlib.md5()
-            hashed_body.update(content_type.encode("utf-8"))
-            hashed_body.update(request_body.encode("utf-8"))
-            body_hash = base64.b64encode(hashed_body.digest())
-        if body_hash != "empty":
-            body_hash = body_hash.decode()
-        signature_list = "\n".join([resource,
-                                    method,
-                                    nonce,
-                                    timestamp,
-                                    content_type,
-                                    body_hash])
-        hmac_data = hmac.new(api_secret.encode("utf-8"),
-                             signature_list.encode("utf-8"),
-                             digestmod=hashlib.sha256)
-        hmac_base64 = base64.b64encode(hmac_data.digest())
-        header_list = [api_key,
-                       hmac_base64.decode("utf-8"),
-                       nonce, timestamp,
-                       body_hash]
-        header = ":".join(header_list)
-        return "{}:{}".format(auth_type, header)
+        return Signer(api_key, api_secret).sign(method, resource,
+                                                content_type, request_body)
 
     def request(self, method, path, auth_header, **options):
         """
         Dispatches a request to the PayPay HTTP API
         """
-        api_name = options['api_id']
-        del options['api_id']
+        api_name = options.pop('api_id')
+        merchant = options.pop('assume_merchant', None)
+        options.pop('cache', None)
+        timeout = timeouts.clamp(self.timeouts.get(api_name), api_name)
+        response = self._send(method, path, auth_header, options, timeout, api_name, merchant)
+        return self._process_response(response, api_name)
+
+    def _send(self, method, path, auth_header, options, timeout=None, api_name=None,
+              merchant=None):
+        """
+        Sends a signed request through the circuit breaker of its API and
+        returns the raw HTTP response
+        """
         url = "{}{}".format(self.base_url, path)
-        response = getattr(self.session, method)(url, headers={
+        headers = self._headers(auth_header, merchant)
+        if self.circuit_breaker is None:
+            return self.transport.request(method.upper(), url, headers,
+                                          timeout=timeout, **options)
+        breaker = self.circuit_breaker.get(api_name, self.base_url)
+        token = breaker.acquire()
+        healthy = None
+        try:
+            response = self.transport.request(method.upper(), url, headers,
+                                              timeout=timeout, **options)
+            healthy = not breaker.is_failure(response)
+            return response
+        except self._transport_errors():
+            healthy = False
+            raise
+        finally:
+            breaker.record(token, healthy)
+
+    def _transport_errors(self):
+        """
+        Exceptions of the transport that are worth retrying
+        """
+        return self.transport.errors
+
+    def _headers(self, auth_header, merchant=None):
+        return {
             'Authorization': auth_header,
             'Content-Type': 'application/json;charset=UTF-8',
-            'X-ASSUME-MERCHANT': self.assume_merchant
-        }, **options)
+            'X-ASSUME-MERCHANT': merchant or self.assume_merchant
+        }
+
+    def _process_response(self, response, api_name):
+        """
+        Maps an HTTP response onto the SDK return value, or raises the
+        errors.PayPayError subclass of its status and resultInfo code
+        """
         if ((response.status_code >= HttpStatusCode.OK) and
                 (response.status_code < HttpStatusCode.REDIRECT)):
-            return response.json()
-        elif response.status_code == HttpStatusCode.UNAUTHORIZED:
-            raise ValueError("401 Unauthorized request. Body: " + response.text)
+            return self.codec.loads(response.content)
         elif response.status_code == HttpStatusCode.NOT_FOUND:
             return None
-        elif response.status_code == HttpStatusCode.SERVER_ERROR:
-            raise ValueError("500 Server error. Body: " + response.text)
-        else:
-            json_response = response.json()
-            resolve_url = "{}?api_name={}&code={}&code_id={}".format(
-                URL.RESOLVE,
-                api_name,
-                json_response['resultInfo']['code'],
-                json_response['resultInfo']['codeId'])
-            print("This link should help you to troubleshoot the error: " + resolve_url)
-            return json_response
+        try:
+            body = self.codec.loads(response.content)
+        except ValueError:
+            # gateways answer errors with HTML
+            body = None
+        error = error_for_response(response, api_name, body)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s, see %s", error, error.resolve_url)
+        raise error
+
+    def _cache_key(self, method, api_name, path, options, merchant=None):
+        """
+        Returns the cache key of a request, or None when it is not cached
+        """
+        if self.cache is None or method != "GET" or not self.cache.cacheable(api_name):
+            return None
+        return self.cache.key(api_name, path, options.get('params'),
+                              merchant or self.assume_merchant)
+
+    def _finish(self, response, api_name, method, path, data, cache_key, parser, event,
+                with_response=False):
+        """
+        Processes the final response of a dispatched request, keeping the
+        response cache up to date, and applies the resource's parser.
+        with_response returns the decoded response along with the result.
+        """
+        started = time.perf_counter() if event is not None else 0
+        try:
+            result = self._process_response(response, api_name)
+            if (self.cache is not None and
+                    HttpStatusCode.OK <= response.status_code < HttpStatusCode.REDIRECT):
+                if cache_key is not None:
+                    self.cache.set(cache_key, result)
+                elif method != "GET":
+                    self.cache.invalidate_request(path, data)
+            raw, result = result, self._parse(result, parser)
+        except Exception as e:
+            if event is not None:
+                event.finish(response, error=e, code=getattr(e, "code", None))
+                emit(self.hooks, event)
+            raise
+        if event is not None:
+            event.phases['decode'] = time.perf_counter() - started
+            event.finish(response, raw)
+            emit(self.hooks, event)
+        return (raw, result) if with_response else result
+
+    def _cached(self, cached, api_name, method, path, parser, with_response=False):
+        """
+        Applies the resource's parser to a response cache hit, reporting
+        it to the hooks as a cached event
+        """
+        event = (RequestEvent(api_name, method, path, attempt=0, cached=True)
+                 if self.hooks else None)
+        started = time.perf_counter() if event is not None else 0
+        try:
+            result = self._parse(cached, parser)
+        except Exception as e:
+            self._failed(event, e)
+            raise
+        if event is not None:
+            event.phases['decode'] = time.perf_counter() - started
+            event.finish(result=cached)
+            emit(self.hooks, event)
+        return (cached, result) if with_response else result
+
+    def _failed(self, event, error):
+        """
+        Reports an attempt that ended with error to the hooks
+        """
+        if event is not None:
+            event.finish(error=error, code=getattr(error, "code", None))
+            emit(self.hooks, event)
+
+    @staticmethod
+    def _parse(response, parser):
+        if parser is None or response is None:
+            return response
+        return parser(response)
 
     def get(self, path, params, **options):
         """
-        Parses GET request options and dispatches a request
+        Parses GET request options and dispatches a request, sharing it
+        with identical GETs in flight under the same deadline. Every
+        caller sharing it parses its own copy of the response.
+        """
+        if (self.single_flight is None or
+                not options.keys() <= {'api_id', 'parser', 'assume_merchant'}):
+            return self._dispatch("GET", path, None, params=params, **options)
+        key = (options['api_id'], path,
+               tuple(sorted(params.items())) if params else None,
+               options.get('assume_merchant') or self.assume_merchant, timeouts.current())
+        return self._coalesce(key, lambda: self._dispatch("GET", path, None, with_response=True,
+                                                          params=params, **options),
+                              options.get('parser'))
+
+    def _coalesce(self, key, fn, parser):
+        return self.single_flight.do(key, fn, self._follower(parser))[1]
+
+    def _follower(self, parser):
+        """
+        Returns the copy function of SingleFlight giving a coalesced caller
+        the (response, result) pair of its own copy of the shared response
         """
-        method = "GET"
-        data, auth_header = self._update_request(None, path, method)
-        return self.request("get",
-                            path,
-                            params=params,
-                            auth_header=auth_header,
-                            **options)
+        return lambda shared: (None, self._parse(copy_json(shared[0]), parser))
 
     def post(self, path, data, **options):
         """
         Parses POST request options and dispatches a request
         """
-        method = "POST"
-        data, auth_header = self._update_request(data, path, method)
-        return self.request("post",
-                            path,
-                            data=data,
-                            auth_header=auth_header,
-                            **options)
+        return self._dispatch("POST", path, data, **options)
 
     def patch(self, path, data, **options):
         """
         Parses PATCH request options and dispatches a request
         """
-        method = "PATCH"
-        data, auth_header = self._update_request(data, path, method)
-        return self.request("patch",
-                            path,
-                            auth_header=auth_header,
-                            **options)
+        return self._dispatch("PATCH", path, data, **options)
 
     def delete(self, path, data, **options):
         """
         Parses DELETE request options and dispatches a request
         """
-        method = "DELETE"
-        data, auth_header = self._update_request(data, path, method)
-        return self.request("delete",
-                            path,
-                            data=data,
-                            auth_header=auth_header,
-                            **options)
+        return self._dispatch("DELETE", path, data, **options)
 
     def put(self, path, data, **options):
         """
         Parses PUT request options and dispatches a request
         """
-        method = "PUT"
-        data, auth_header = self._update_request(data, path, method)
-        return self.request("put",
-                            path,
-                            data=data,
-                            auth_header=auth_header,
-                            **options)
+        return self._dispatch("PUT", path, data, **options)
+
+    def _dispatch(self, method, path, data, with_response=False, **options):
+        """
+        Signs and sends a request, resending it while the retry policy
+        allows. Every attempt waits for the rate limiter and is signed
+        with a fresh nonce. Cached reads are answered without a request
+        unless the cache option is False; the fresh response is cached.
+        The response is decoded with the resource's parser option.
+        Attempts and retries are cut short by the deadline in effect.
+        Every attempt and cache hit is reported to the hooks.
+        """
+        api_name = options.pop('api_id')
+        parser = options.pop('parser', None)
+        merchant = options.pop('assume_merchant', None)
+        use_cache = options.pop('cache', True)
+        cache_key = self._cache_key(method, api_name, path, options, merchant)
+        if cache_key is not None and use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return self._cached(cached, api_name, method, path, parser, with_response)
+        attempt = 0
+        while True:
+            attempt += 1
+            event = RequestEvent(api_name, method, path, attempt) if self.hooks else None
+            try:
+                if self.rate_limiter is not None:
+                    self._throttle(api_name)
+                body, auth_header = self._update_request(data, path, method, event)
+                if method != "GET":
+                    options['data'] = body
+                timeout = timeouts.clamp(self.timeouts.get(api_name), api_name)
+            except Exception as e:
+                self._failed(event, e)
+                raise
+            try:
+                started = time.perf_counter() if event is not None else 0
+                response = self._send(method, path, auth_header, options, timeout, api_name,
+                                      merchant)
+                if event is not None:
+                    event.phases['network'] = time.perf_counter() - started
+            except self._transport_errors() as e:
+                self._failed(event, e)
+                delay = self._backoff(method, api_name, data, attempt, error=e)
+                if delay is None:
+                    timeouts.check(api_name)
+                    raise
+            except Exception as e:
+                self._failed(event, e)
+                raise
+            else:
+                delay = self._backoff(method, api_name, data, attempt, response=response)
+                if delay is None:
+                    return self._finish(response, api_name, method, path, data,
+                                        cache_key, parser, event, with_response)
+                if event is not None:
+                    event.finish(response)
+                    emit(self.hooks, event)
+            time.sleep(delay)
+
+    def _throttle(self, api_name):
+        delay = self.rate_limiter.reserve(api_name)
+        if delay > 0:
+            timeouts.check(api_name, delay)
+            time.sleep(delay)
+
+    def _backoff(self, method, api_name, data, attempt, **outcome):
+        """
+        Returns the seconds to wait before resending a request, or None
+        when its outcome is final, the deadline leaves no time to retry or
+        the circuit of the API opened
+        """
+        if self.retry is None:
+            return None
+        if (self.circuit_breaker is not None and
+                self.circuit_breaker.get(api_name, self.base_url).state == OPEN):
+            return None
+        delay = self.retry.backoff(method, api_name, data, attempt, **outcome)
+        left = timeouts.remaining()
+        if delay is not None and left is not None and left <= delay:
+            return None
+        return delay
 
-    def _update_request(self, data, path, method):
+    def _update_request(self, data, path, method, event=None):
         """
         Updates The resource data and header options
         """
         _data = None
         content_type = "empty"
+        if event is not None:
+            started = time.perf_counter()
         if data is not None:
-            _data = json.dumps(data)
+            _data = self.codec.dumps(data)
             content_type = "application/json;charset=UTF-8"
-        uri_path = path
-        _auth_header = self.auth_header(
-            self.auth[0],
-            self.auth[1],
-            method,
-            uri_path,
-            content_type,
-            _data)
+        if event is not None:
+            signed = time.perf_counter()
+            event.phases['encode'] = signed - started
+        _auth_header = self.signer.sign(method, path, content_type, _data)
+        if event is not None:
+            event.phases['sign'] = time.perf_counter() - signed
         return _data, _auth_header
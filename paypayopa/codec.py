@@ -0,0 +1,72 @@
+import json
+
+
+class JSONCodec(object):
+    """Serializes request bodies to bytes and decodes response bodies"""
+    name = None
+
+    def dumps(self, obj):
+        raise NotImplementedError
+
+    def loads(self, data):
+        raise NotImplementedError
+
+
+class StdlibCodec(JSONCodec):
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self.dumps = orjson.dumps
+        self.loads = orjson.loads
+
+
+class UjsonCodec(JSONCodec):
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def dumps(self, obj):
+        return self._ujson.dumps(obj, ensure_ascii=False,
+                                 escape_forward_slashes=False).encode("utf-8")
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+
+CODECS = {
+    OrjsonCodec.name: OrjsonCodec,
+    UjsonCodec.name: UjsonCodec,
+    StdlibCodec.name: StdlibCodec,
+}
+
+
+def get_codec(codec=None):
+    """
+    Resolves the json_codec client option: a JSONCodec instance, the name
+    of a codec, or None/"auto" for the fastest codec installed
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec is None or codec == "auto":
+        for codec_class in CODECS.values():
+            try:
+                return codec_class()
+            except ImportError:
+                continue
+    if codec not in CODECS:
+        raise ValueError("Unknown json_codec {!r}, expected one of {}".format(
+            codec, ", ".join(CODECS)))
+    return CODECS[codec]()
@@ -2,10 +2,12 @@ from .httpstatuscode import HttpStatusCode
 from .errorcode import ErrorCode
 from .url import URL
 from .api_list import API_NAMES
+from .payment_status import PaymentStatus
 
 __all__ = [
     'HttpStatusCode',
     'ErrorCode',
         'URL',
         'API_NAMES',
+        'PaymentStatus',
 ]
@@ -0,0 +1,11 @@
+class PaymentStatus(object):
+    CREATED = "CREATED"
+    AUTHORIZED = "AUTHORIZED"
+    REAUTHORIZING = "REAUTHORIZING"
+    COMPLETED = "COMPLETED"
+    REFUNDED = "REFUNDED"
+    CANCELED = "CANCELED"
+    EXPIRED = "EXPIRED"
+    FAILED = "FAILED"
+    # statuses a payment does not leave without a merchant action
+    TERMINAL = frozenset([AUTHORIZED, COMPLETED, REFUNDED, CANCELED, EXPIRED, FAILED])
@@ -1,8 +1,192 @@
-class ServerError(Exception):
-    def __init__(self, message=None, *args, **kwargs):
-        super(ServerError, self).__init__(message)
+from .constants.url import URL
+
+
+class PayPayError(ValueError):
+    """Error response of the PayPay API
+
+    Carries the api_id of the request, the HTTP status, the resultInfo
+    code, codeId and message, the response latency in seconds and the raw
+    response. Subclasses ValueError, which the client raised before.
+    """
+    status = None
+
+    def __init__(self, message=None, api_id=None, status=None, code=None,
+                 code_id=None, result_message=None, latency=None, response=None):
+        super(PayPayError, self).__init__(message)
+        self.api_id = api_id
+        if status is not None:
+            self.status = status
+        self.code = code
+        self.code_id = code_id
+        self.result_message = result_message
+        self.latency = latency
+        self.response = response
+
+    @property
+    def resolve_url(self):
+        """
+        The PayPay troubleshooting page of this error
+        """
+        return "{}?api_name={}&code={}&code_id={}".format(
+            URL.RESOLVE, self.api_id, self.code, self.code_id)
+
+
+class ClientError(PayPayError):
+    """4xx: the request cannot be processed as sent"""
+
+
+class BadRequestError(ClientError):
+    status = 400
+
+
+class InvalidParamsError(BadRequestError):
+    """INVALID_PARAMS, INVALID_REQUEST_PARAMS, MISSING_REQUEST_PARAMS"""
+
+
+class UnacceptableOpError(BadRequestError):
+    """UNACCEPTABLE_OP and the order state errors"""
+
+
+class NoSufficientFundError(BadRequestError):
+    """NO_SUFFICIENT_FUND"""
+
+
+class DuplicateRequestError(BadRequestError):
+    """DUPLICATE_DYNAMIC_QR_REQUEST and other duplicate merchant ids"""
+
+
+class UnauthorizedError(ClientError):
+    status = 401
+
+
+class OpOutOfScopeError(UnauthorizedError):
+    """OP_OUT_OF_SCOPE"""
+
+
+class RateLimitError(ClientError):
+    status = 429
+
+
+class ServerError(PayPayError):
+    """5xx: the outcome of the request is unknown"""
+    status = 500
+
+
+class TransactionFailedError(ServerError):
+    """TRANSACTION_FAILED: the transaction failed and may be sent anew"""
+
+
+class MaintenanceError(ServerError):
+    status = 503
 
 
 class SignatureVerificationError(Exception):
     def __init__(self, message=None, *args, **kwargs):
         super(SignatureVerificationError, self).__init__(message)
+
+
+class JwtError(SignatureVerificationError):
+    """JWT that is malformed or fails verification"""
+
+
+class JwtSignatureError(JwtError):
+    pass
+
+
+class JwtExpiredError(JwtError):
+    pass
+
+
+class JwtAudienceError(JwtError):
+    pass
+
+
+class DeadlineExceeded(TimeoutError):
+    """The deadline of timeouts.deadline() passed before the call finished"""
+
+    def __init__(self, api_id=None):
+        super(DeadlineExceeded, self).__init__(
+            "Deadline exceeded" + (" calling {}".format(api_id) if api_id else ""))
+        self.api_id = api_id
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker of the API is open, the request was not sent
+
+    retry_after is the number of seconds until probe requests are let
+    through, or None when the circuit is already probing.
+    """
+
+    def __init__(self, api_id=None, base_url=None, retry_after=None):
+        message = "Circuit open for {}".format(api_id)
+        if retry_after is not None:
+            message += ", retry in {:.1f}s".format(retry_after)
+        super(CircuitOpenError, self).__init__(message)
+        self.api_id = api_id
+        self.base_url = base_url
+        self.retry_after = retry_after
+
+
+# resultInfo.code -> exception class, taking precedence over the status
+CODE_ERRORS = {
+    "INVALID_PARAMS": InvalidParamsError,
+    "INVALID_REQUEST_PARAMS": InvalidParamsError,
+    "MISSING_REQUEST_PARAMS": InvalidParamsError,
+    "UNACCEPTABLE_OP": UnacceptableOpError,
+    "ORDER_NOT_REVERSIBLE": UnacceptableOpError,
+    "ORDER_NOT_CANCELABLE": UnacceptableOpError,
+    "ORDER_NOT_CAPTURABLE": UnacceptableOpError,
+    "ORDER_EXPIRED": UnacceptableOpError,
+    "ALREADY_CAPTURED": UnacceptableOpError,
+    "DYNAMIC_QR_ALREADY_PAID": UnacceptableOpError,
+    "NO_SUFFICIENT_FUND": NoSufficientFundError,
+    "DUPLICATE_DYNAMIC_QR_REQUEST": DuplicateRequestError,
+    "OP_OUT_OF_SCOPE": OpOutOfScopeError,
+    "RATE_LIMIT": RateLimitError,
+    "TRANSACTION_FAILED": TransactionFailedError,
+    "MAINTENANCE_MODE": MaintenanceError,
+}
+# HTTP status -> exception class for codes without an entry above
+STATUS_ERRORS = {
+    400: BadRequestError,
+    401: UnauthorizedError,
+    429: RateLimitError,
+    503: MaintenanceError,
+}
+
+
+def error_class(status, code=None):
+    """
+    Returns the exception class of an error response
+    """
+    klass = CODE_ERRORS.get(code) or STATUS_ERRORS.get(status)
+    if klass is not None:
+        return klass
+    if status >= 500:
+        return ServerError
+    if status >= 400:
+        return ClientError
+    return PayPayError
+
+
+def error_for_response(response, api_id, body=None):
+    """
+    Builds the exception of a non 2xx response whose decoded JSON body,
+    if any, is body
+    """
+    result_info = body.get("resultInfo") if isinstance(body, dict) else None
+    result_info = result_info if isinstance(result_info, dict) else {}
+    code = result_info.get("code")
+    code_id = result_info.get("codeId")
+    result_message = result_info.get("message")
+    elapsed = getattr(response, "elapsed", None)
+    latency = elapsed.total_seconds() if elapsed is not None else None
+    message = "{} {} for {}".format(response.status_code, code or "error", api_id)
+    if result_message:
+        message += ": " + result_message
+    if code_id:
+        message += " (codeId {})".format(code_id)
+    klass = error_class(response.status_code, code)
+    return klass(message, api_id=api_id, status=response.status_code, code=code,
+                 code_id=code_id, result_message=result_message,
+                 latency=latency, response=response)
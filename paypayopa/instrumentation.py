@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# phases of a request attempt, in the order they run
+PHASES = ("encode", "sign", "network", "decode")
+# upper bounds in seconds of the histogram buckets of MetricsHook
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class RequestEvent:
+    """Timings and outcome of one attempt of a PayPay API request
+
+    phases maps each of PHASES that ran to its duration in seconds:
+    JSON encoding of the body, OPA-Auth signing, the HTTP round trip, and
+    decoding of the response up to the SDK objects. A read answered by
+    the response cache is reported with cached set and attempt 0, and a
+    request failing before it is sent (deadline passed, circuit open)
+    with its error and no status.
+    """
+    api_id: str
+    method: str
+    path: str
+    attempt: int = 1
+    status: Optional[int] = None
+    code: Optional[str] = None
+    error: Optional[BaseException] = None
+    phases: Dict[str, float] = field(default_factory=dict)
+    start_time: int = field(default_factory=time.time_ns)
+    started: float = field(default_factory=time.perf_counter, repr=False)
+    duration: float = 0.0
+    cached: bool = False
+
+    def finish(self, response=None, result=None, error=None, code=None):
+        """
+        Records the outcome of the attempt; the resultInfo code is read
+        from result, or given as code for error responses
+        """
+        self.duration = time.perf_counter() - self.started
+        if response is not None:
+            self.status = response.status_code
+        if code is not None:
+            self.code = code
+        elif isinstance(result, dict):
+            self.code = (result.get("resultInfo") or {}).get("code")
+        else:
+            result_info = getattr(result, "result_info", None)
+            if isinstance(result_info, dict):
+                self.code = result_info.get("code")
+        self.error = error
+
+
+def emit(hooks, event):
+    """
+    Passes an event to every hook; a failing hook never fails the request
+    """
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception:
+            logger.exception("instrumentation hook %r failed", hook)
+
+
+def _labels(event):
+    return (event.api_id,
+            str(event.status) if event.status is not None else "",
+            event.code or (type(event.error).__name__ if event.error is not None else ""))
+
+
+class MetricsHook(object):
+    """Prometheus-style counters and histograms kept in process
+
+    Counts requests by api_id, status and resultInfo code, and keeps a
+    histogram of every phase and of the whole attempt per api_id.
+    render() returns them in the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, namespace="paypayopa"):
+        self.buckets = tuple(buckets)
+        self.namespace = namespace
+        self.requests = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        labels = _labels(event)
+        with self._lock:
+            self.requests[labels] = self.requests.get(labels, 0) + 1
+            self._observe((event.api_id, "total"), event.duration)
+            for phase, seconds in event.phases.items():
+                self._observe((event.api_id, phase), seconds)
+
+    def _observe(self, key, seconds):
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            # per bucket counts, then the +Inf count and the sum
+            histogram = self.histograms[key] = [0] * len(self.buckets) + [0, 0.0]
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                histogram[i] += 1
+        histogram[-2] += 1
+        histogram[-1] += seconds
+
+    def render(self):
+        name = self.namespace
+        lines = ["# TYPE {}_requests_total counter".format(name)]
+        with self._lock:
+            for (api_id, status, code), count in sorted(self.requests.items()):
+                lines.append('{}_requests_total{{api_id="{}",status="{}",code="{}"}} {}'.format(
+                    name, api_id, status, code, count))
+            lines.append("# TYPE {}_phase_seconds histogram".format(name))
+            for (api_id, phase), histogram in sorted(self.histograms.items()):
+                labels = 'api_id="{}",phase="{}"'.format(api_id, phase)
+                for bound, count in zip(self.buckets, histogram):
+                    lines.append('{}_phase_seconds_bucket{{{},le="{}"}} {}'.format(
+                        name, labels, bound, count))
+                lines.append('{}_phase_seconds_bucket{{{},le="+Inf"}} {}'.format(
+                    name, labels, histogram[-2]))
+                lines.append("{}_phase_seconds_count{{{}}} {}".format(name, labels, histogram[-2]))
+                lines.append("{}_phase_seconds_sum{{{}}} {}".format(name, labels, histogram[-1]))
+        return "\n".join(lines) + "\n"
+
+
+class PrometheusHook(object):
+    """Exports request metrics through prometheus_client"""
+
+    def __init__(self, registry=None, namespace="paypayopa", buckets=DEFAULT_BUCKETS):
+        try:
+            import prometheus_client
+        except ImportError:
+            raise ImportError("PrometheusHook requires prometheus_client: "
+                              "pip install paypayopa[prometheus]")
+        kwargs = {"registry": registry} if registry is not None else {}
+        self.requests = prometheus_client.Counter(
+            "requests", "PayPay API request attempts",
+            ["api_id", "status", "code"], namespace=namespace, **kwargs)
+        self.phases = prometheus_client.Histogram(
+            "phase_seconds", "Time spent per phase of a PayPay API request",
+            ["api_id", "phase"], namespace=namespace, buckets=buckets, **kwargs)
+
+    def __call__(self, event):
+        self.requests.labels(*_labels(event)).inc()
+        self.phases.labels(event.api_id, "total").observe(event.duration)
+        for phase, seconds in event.phases.items():
+            self.phases.labels(event.api_id, phase).observe(seconds)
+
+
+class OpenTelemetryHook(object):
+    """Records every request attempt as an OpenTelemetry client span"""
+
+    def __init__(self, tracer=None):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError("OpenTelemetryHook requires opentelemetry-api: "
+                              "pip install paypayopa[opentelemetry]")
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("paypayopa")
+
+    def __call__(self, event):
+        attributes: Dict[str, Any] = {
+            "paypay.api_id": event.api_id,
+            "http.request.method": event.method,
+            "url.path": event.path,
+            "paypay.attempt": event.attempt,
+            "paypay.cached": event.cached,
+        }
+        if event.status is not None:
+            attributes["http.response.status_code"] = event.status
+        if event.code is not None:
+            attributes["paypay.result_code"] = event.code
+        for phase, seconds in event.phases.items():
+            attributes["paypay.{}_ms".format(phase)] = seconds * 1000
+        span = self.tracer.start_span(
+            event.api_id, kind=self._trace.SpanKind.CLIENT,
+            start_time=event.start_time, attributes=attributes)
+        if event.error is not None:
+            span.record_exception(event.error)
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(event.error)))
+        span.end(end_time=event.start_time + int(event.duration * 1e9))
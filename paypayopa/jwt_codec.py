@@ -0,0 +1,103 @@
+import base64
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import jwt
+
+from .errors import JwtError, JwtSignatureError, JwtExpiredError, JwtAudienceError
+
+ALGORITHM = "HS256"
+# pyjwt errors -> SDK errors, most specific first
+_ERRORS = (
+    (jwt.ExpiredSignatureError, JwtExpiredError),
+    (jwt.InvalidAudienceError, JwtAudienceError),
+    (jwt.InvalidSignatureError, JwtSignatureError),
+    (jwt.InvalidAlgorithmError, JwtSignatureError),
+)
+
+
+@dataclass
+class AuthorizationResult:
+    """Verified claims of a user authorization JWT"""
+    user_authorization_id: Optional[str]
+    reference_id: Optional[str]
+    claims: Dict[str, Any] = field(repr=False)
+
+
+class JwtCodec(object):
+    """HS256 encoder and verifier of account link JWTs for one client
+
+    The secret is base64 decoded once, raising JwtError when it is not
+    valid base64, and tokens are signed and verified by one pyjwt.PyJWT
+    instance. Tokens are only accepted for an audience: client_id, or the
+    audience passed to decode_claims.
+    """
+
+    def __init__(self, client_id, secret, leeway=0):
+        self.client_id = client_id
+        self.leeway = leeway
+        try:
+            self._key = base64.b64decode(secret)
+        except ValueError as e:
+            raise JwtError("Secret is not valid base64: {}".format(e))
+        self._jwt = jwt.PyJWT()
+
+    def encode_claims(self, claims):
+        """
+        Returns a signed token of a claims dict
+        """
+        return self._jwt.encode(claims, self._key, algorithm=ALGORITHM)
+
+    def encode(self, scope="direct_debit", redirect_url=None, reference_id=None,
+               device_id="", phone_number="", expires_in=300):
+        """
+        Returns the JWT requesting user authorization, see Client.encode_jwt
+        """
+        return self.encode_claims({
+            "iss": "merchant",
+            "exp": int(time.time()) + expires_in,
+            "scope": scope,
+            "nonce": os.urandom(4).hex(),
+            "redirectUrl": redirect_url,
+            "referenceId": reference_id if reference_id is not None else os.urandom(4).hex(),
+            "deviceId": device_id,
+            "phoneNumber": phone_number,
+        })
+
+    def encode_many(self, reference_ids, **kwargs):
+        """
+        Returns one token per reference id, sharing the other claims
+        """
+        return [self.encode(reference_id=reference_id, **kwargs)
+                for reference_id in reference_ids]
+
+    def decode_claims(self, token, verify_aud=True, audience=None):
+        """
+        Verifies a token and returns its claims, raising a JwtError
+        subclass when it is malformed, forged, expired or for another
+        audience than audience or client_id. verify_aud=False skips the
+        audience check.
+        """
+        audience = audience if audience is not None else self.client_id
+        if verify_aud and audience is None:
+            raise JwtAudienceError("An audience (the client id) is required to verify a token")
+        try:
+            return self._jwt.decode(token, self._key, algorithms=[ALGORITHM],
+                                    audience=audience if verify_aud else None,
+                                    leeway=self.leeway,
+                                    options={"verify_aud": verify_aud})
+        except jwt.InvalidTokenError as e:
+            for error, klass in _ERRORS:
+                if isinstance(e, error):
+                    raise klass(str(e))
+            raise JwtError(str(e))
+
+    def decode(self, token):
+        """
+        Verifies a user authorization token returned by PayPay
+        """
+        claims = self.decode_claims(token)
+        return AuthorizationResult(claims.get("userAuthorizationId"),
+                                   claims.get("referenceId"), claims)
@@ -1,36 +1,36 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from typing import Any
 
-from dataclasses_json import dataclass_json, config
+from paypayopa.objects.decoder import json_field, json_object
 
 
-@dataclass
+@dataclass(slots=True)
 class BaseAPIResponse:
     result_info: dict
     data: Any
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class BaseObj:
     status: str
-    accepted_at: int = field(metadata=config(field_name="acceptedAt"))
-    requested_at: int = field(metadata=config(field_name="requestedAt"))
-    payment_id: str = field(metadata=config(field_name="paymentId"))
+    accepted_at: int = json_field("acceptedAt")
+    requested_at: int = json_field("requestedAt")
+    payment_id: str = json_field("paymentId")
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class Amount:
     amount: int
     currency: str
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class OrderItem:
     name: str
     category: str
     quantity: int
-    product_id: str = field(metadata=config(field_name="productId"))
-    unit_price: Amount = field(metadata=config(field_name="unitPrice"))
+    product_id: str = json_field("productId")
+    unit_price: Amount = json_field("unitPrice")
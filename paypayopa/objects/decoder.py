@@ -0,0 +1,110 @@
+import json
+import typing
+from dataclasses import field, fields, is_dataclass, MISSING
+
+_DECODER = "_paypayopa_decoder"
+
+
+def json_field(name=None, decoder=None, **kwargs):
+    """
+    Declares a dataclass field read from the `name` key of a response
+    object, optionally converted by `decoder`
+    """
+    return field(metadata={'json_name': name, 'decoder': decoder}, **kwargs)
+
+
+def _optional_args(tp):
+    args = typing.get_args(tp)
+    if type(None) in args:
+        args = tuple(arg for arg in args if arg is not type(None))
+        if len(args) == 1:
+            return args[0]
+    return tp
+
+
+def _converter(tp):
+    """
+    Returns a function converting a decoded JSON value into tp, or None
+    when the value is used as-is
+    """
+    tp = _optional_args(tp)
+    if is_dataclass(tp):
+        return lambda value: tp.from_dict(value)
+    if typing.get_origin(tp) in (list, typing.List):
+        item = _converter(typing.get_args(tp)[0]) if typing.get_args(tp) else None
+        if item is not None:
+            return lambda value: [item(element) for element in value]
+    return None
+
+
+def _compile(cls):
+    """
+    Generates a decoder mapping the camelCase keys of a response object
+    straight onto the constructor arguments of cls
+    """
+    hints = typing.get_type_hints(cls)
+    namespace = {'cls': cls, 'MISSING': MISSING}
+    lines = ["def decode(d):"]
+    arguments = []
+    for index, f in enumerate(fields(cls)):
+        if not f.init:
+            continue
+        key = f.metadata.get('json_name') or f.name
+        convert = f.metadata.get('decoder') or _converter(hints[f.name])
+        if f.default is not MISSING:
+            namespace['default_{}'.format(index)] = f.default
+            default = "default_{}".format(index)
+        elif f.default_factory is not MISSING:
+            namespace['factory_{}'.format(index)] = f.default_factory
+            default = "factory_{}()".format(index)
+        else:
+            default = "None"
+        lines.append("    v = d.get({!r}, MISSING)".format(key))
+        if convert is None:
+            lines.append("    a{} = {} if v is MISSING else v".format(index, default))
+        else:
+            namespace['convert_{}'.format(index)] = convert
+            lines.append("    a{0} = {1} if v is MISSING else (None if v is None else convert_{0}(v))"
+                         .format(index, default))
+        arguments.append("{}=a{}".format(f.name, index))
+    lines.append("    return cls({})".format(", ".join(arguments)))
+    exec("\n".join(lines), namespace)
+    return namespace['decode']
+
+
+def _encode(value):
+    if is_dataclass(value):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_encode(element) for element in value]
+    return value
+
+
+def json_object(cls):
+    """
+    Class decorator giving a dataclass from_dict/from_json/to_dict/to_json.
+    The decoder of each class is generated once, on first use.
+    """
+    def from_dict(klass, data):
+        decoder = klass.__dict__.get(_DECODER)
+        if decoder is None:
+            decoder = _compile(klass)
+            setattr(klass, _DECODER, decoder)
+        return decoder(data)
+
+    def from_json(klass, data):
+        return klass.from_dict(json.loads(data))
+
+    def to_dict(self):
+        return {f.metadata.get('json_name') or f.name: _encode(getattr(self, f.name))
+                for f in fields(self)}
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    cls.from_dict = classmethod(from_dict)
+    cls.from_json = classmethod(from_json)
+    cls.to_dict = to_dict
+    cls.to_json = to_json
+    return cls
+
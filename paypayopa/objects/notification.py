@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from paypayopa.objects.decoder import json_field, json_object
+
+
+@json_object
+@dataclass(slots=True)
+class TransactionNotification:
+    """Payment state change pushed by PayPay"""
+    notification_type: str
+    merchant_id: str
+    store_id: str
+    pos_id: str
+    order_id: str
+    merchant_order_id: str
+    authorized_at: Optional[str]
+    expires_at: Optional[str]
+    paid_at: Optional[str]
+    order_amount: Any
+    state: str
+
+    @property
+    def notification_id(self):
+        return "{}:{}:{}".format(self.notification_type,
+                                 self.merchant_order_id or self.order_id, self.state)
+
+
+@json_object
+@dataclass(slots=True)
+class UserAuthorizationNotification:
+    """Result of an account link, delivered as a JWT signed with the API secret"""
+    result: str
+    user_authorization_id: str = json_field("userAuthorizationId")
+    reference_id: str = json_field("referenceId")
+    profile_identifier: str = json_field("profileIdentifier")
+    nonce: str
+
+    @property
+    def notification_id(self):
+        return "authorization:{}:{}:{}".format(self.reference_id, self.nonce, self.result)
@@ -1,27 +1,27 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
 
-from dataclasses_json import dataclass_json, config
+from paypayopa.objects.decoder import json_field, json_object
 
 from paypayopa.objects.base import BaseObj, BaseAPIResponse, Amount, OrderItem
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class Refund(BaseObj):
-    merchant_refund_id: str = field(metadata=config(field_name="merchantRefundId"))
+    merchant_refund_id: str = json_field("merchantRefundId")
     amount: Amount
     reason: str
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class Refunds:
     data: List[Refund]
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class PaymentMethod:
     amount: Amount
     type: str
@@ -32,22 +32,22 @@ def deserialize_refunds(refunds_data: Dict[str, Any]) -> List[Refund]:
     return [Refund.from_dict(refund) for refund in refunds_data.get('data', [])]
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class PaymentBody(BaseObj):
-    merchant_payment_id: str = field(metadata=config(field_name="merchantPaymentId"))
-    user_authorization_id: str = field(metadata=config(field_name="userAuthorizationId"))
+    merchant_payment_id: str = json_field("merchantPaymentId")
+    user_authorization_id: str = json_field("userAuthorizationId")
     amount: Amount
-    order_description: str = field(metadata=config(field_name="orderDescription"))
-    order_items: List[OrderItem] = field(metadata=config(field_name="orderItems"))
-    payment_methods: List[PaymentMethod] = field(metadata=config(field_name="paymentMethods"))
-    store_id: Optional[str] = field(default=None, metadata=config(field_name="storeId"))
-    terminal_id: Optional[str] = field(default=None, metadata=config(field_name="terminalId"))
-    order_receipt_number: Optional[str] = field(default=None, metadata=config(field_name="orderReceiptNumber"))
+    order_description: str = json_field("orderDescription")
+    order_items: List[OrderItem] = json_field("orderItems")
+    payment_methods: List[PaymentMethod] = json_field("paymentMethods")
+    store_id: Optional[str] = json_field("storeId", default=None)
+    terminal_id: Optional[str] = json_field("terminalId", default=None)
+    order_receipt_number: Optional[str] = json_field("orderReceiptNumber", default=None)
     metadata: Optional[Dict[str, Any]] = None
-    refunds: List[Refund] = field(default_factory=list, metadata=config(decoder=deserialize_refunds))
+    refunds: List[Refund] = json_field(decoder=deserialize_refunds, default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class PaymentAPIResponse(BaseAPIResponse):
     data: PaymentBody | None
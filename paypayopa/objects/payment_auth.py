@@ -1,53 +1,53 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from typing import List, Optional, Dict, Any
 
-from dataclasses_json import dataclass_json, config
+from paypayopa.objects.decoder import json_field, json_object
 
 from paypayopa.objects.base import BaseObj, BaseAPIResponse, Amount, OrderItem
 from paypayopa.objects.payment import PaymentMethod
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class RevertPaymentAuthBody(BaseObj):
     reason: str
 
 
-@dataclass
+@dataclass(slots=True)
 class RevertPaymentAuthAPIResponse(BaseAPIResponse):
     data: RevertPaymentAuthBody | None
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class _Refund:
     status: str
-    accepted_at: int = field(metadata=config(field_name="acceptedAt"))
-    merchant_refund_id: str = field(metadata=config(field_name="merchantRefundId"))
-    payment_id: str = field(metadata=config(field_name="paymentId"))
+    accepted_at: int = json_field("acceptedAt")
+    merchant_refund_id: str = json_field("merchantRefundId")
+    payment_id: str = json_field("paymentId")
     amount: Amount
-    requested_at: int = field(metadata=config(field_name="requestedAt"))
+    requested_at: int = json_field("requestedAt")
     reason: str
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class Capture:
-    accepted_at: int = field(metadata=config(field_name="acceptedAt"))
-    merchant_capture_id: str = field(metadata=config(field_name="merchantCaptureId"))
+    accepted_at: int = json_field("acceptedAt")
+    merchant_capture_id: str = json_field("merchantCaptureId")
     amount: Amount
-    order_description: str = field(metadata=config(field_name="orderDescription"))
-    requested_at: int = field(metadata=config(field_name="requestedAt"))
-    expires_at: int = field(metadata=config(field_name="expiresAt"))
+    order_description: str = json_field("orderDescription")
+    requested_at: int = json_field("requestedAt")
+    expires_at: int = json_field("expiresAt")
     status: str
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class Revert:
-    accepted_at: int = field(metadata=config(field_name="acceptedAt"))
-    merchant_revert_id: str = field(metadata=config(field_name="merchantRevertId"))
-    requested_at: int = field(metadata=config(field_name="requestedAt"))
+    accepted_at: int = json_field("acceptedAt")
+    merchant_revert_id: str = json_field("merchantRevertId")
+    requested_at: int = json_field("requestedAt")
     reason: str
 
 
@@ -61,27 +61,27 @@ def deserialize_captures(data: Dict[str, Any]) -> List[Capture]:
     return [Capture.from_dict(capture) for capture in data.get('data', [])]
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class PaymentAuthBody(BaseObj):
-    merchant_payment_id: str = field(metadata=config(field_name="merchantPaymentId"))
-    user_authorization_id: str = field(metadata=config(field_name="userAuthorizationId"))
+    merchant_payment_id: str = json_field("merchantPaymentId")
+    user_authorization_id: str = json_field("userAuthorizationId")
     amount: Amount
-    order_description: str = field(metadata=config(field_name="orderDescription"))
-    order_items: List[OrderItem] = field(metadata=config(field_name="orderItems"))
-    payment_methods: List[PaymentMethod] = field(metadata=config(field_name="paymentMethods"))
-    expires_at: int = field(metadata=config(field_name="expiresAt"))
-    store_id: Optional[str] = field(default=None, metadata=config(field_name="storeId"))
-    terminal_id: Optional[str] = field(default=None, metadata=config(field_name="terminalId"))
-    order_receipt_number: Optional[str] = field(default=None, metadata=config(field_name="orderReceiptNumber"))
+    order_description: str = json_field("orderDescription")
+    order_items: List[OrderItem] = json_field("orderItems")
+    payment_methods: List[PaymentMethod] = json_field("paymentMethods")
+    expires_at: int = json_field("expiresAt")
+    store_id: Optional[str] = json_field("storeId", default=None)
+    terminal_id: Optional[str] = json_field("terminalId", default=None)
+    order_receipt_number: Optional[str] = json_field("orderReceiptNumber", default=None)
     metadata: Optional[Dict[str, Any]] = None
     # noinspection PyUnresolvedReferences
-    refunds: List[_Refund] = field(default_factory=list, metadata=config(decoder=deserialize_refunds))
+    refunds: List[_Refund] = json_field(decoder=deserialize_refunds, default_factory=list)
     #  noinspection PyUnresolvedReferences
-    captures: List[Capture] = field(default_factory=list, metadata=config(decoder=deserialize_captures))
+    captures: List[Capture] = json_field(decoder=deserialize_captures, default_factory=list)
     revert: Optional[Revert] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class PaymentAuthAPIResponse(BaseAPIResponse):
     data: PaymentAuthBody | None
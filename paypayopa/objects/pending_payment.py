@@ -1,29 +1,29 @@
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from typing import List
 
-from dataclasses_json import dataclass_json, config
+from paypayopa.objects.decoder import json_field, json_object
 
 from paypayopa.objects.base import BaseAPIResponse, Amount, OrderItem
 
 
 # todo: validate with the actual API response. implemented based on the API documentation
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class CreatedPendingPaymentBody:
-    requested_at: int = field(metadata=config(field_name="requestedAt"))
-    merchant_payment_id: str = field(metadata=config(field_name="merchantPaymentId"))
-    user_authorization_id: str = field(metadata=config(field_name="userAuthorizationId"))
+    requested_at: int = json_field("requestedAt")
+    merchant_payment_id: str = json_field("merchantPaymentId")
+    user_authorization_id: str = json_field("userAuthorizationId")
     amount: Amount
-    expires_at: int = field(metadata=config(field_name="expiryDate"))
-    store_id: str = field(metadata=config(field_name="storeId"), default=None)
-    terminal_id: str = field(metadata=config(field_name="terminalId"), default=None)
-    order_receipt_number: str = field(metadata=config(field_name="orderReceiptNumber"), default=None)
-    order_description: str = field(metadata=config(field_name="orderDescription"), default=None)
-    order_items: List[OrderItem] = field(metadata=config(field_name="orderItems"), default=None)
-    metadata: dict = field(metadata=config(field_name="metadata"), default=None)
-    product_type: str = field(metadata=config(field_name="productType"), default=None)
+    expires_at: int = json_field("expiryDate")
+    store_id: str = json_field("storeId", default=None)
+    terminal_id: str = json_field("terminalId", default=None)
+    order_receipt_number: str = json_field("orderReceiptNumber", default=None)
+    order_description: str = json_field("orderDescription", default=None)
+    order_items: List[OrderItem] = json_field("orderItems", default=None)
+    metadata: dict = json_field("metadata", default=None)
+    product_type: str = json_field("productType", default=None)
 
 
-@dataclass
+@dataclass(slots=True)
 class CreatedPendingPaymentAPIResponse(BaseAPIResponse):
     data: CreatedPendingPaymentBody | None
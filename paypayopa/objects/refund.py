@@ -1,17 +1,18 @@
-from dataclasses import dataclass, field
-from dataclasses_json import dataclass_json, config
+from dataclasses import dataclass
+from paypayopa.objects.decoder import json_field, json_object
 
 from paypayopa.objects.base import BaseObj, BaseAPIResponse, Amount
 
 
-@dataclass_json
-@dataclass
+@json_object
+@dataclass(slots=True)
 class RefundBody(BaseObj):
-    merchant_payment_id: str = field(metadata=config(field_name="merchantPaymentId"))
+    merchant_payment_id: str = json_field("merchantPaymentId")
+    merchant_refund_id: str = json_field("merchantRefundId")
     amount: Amount
     reason: str
 
 
-@dataclass
+@dataclass(slots=True)
 class RefundAPIResponse(BaseAPIResponse):
     data: RefundBody | None
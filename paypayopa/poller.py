@@ -0,0 +1,213 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from . import timeouts
+from .constants import PaymentStatus
+from .errors import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PollResult:
+    """Final state of a watched payment"""
+    merchant_payment_id: str
+    status: Optional[str]
+    response: Any = None
+
+
+def _status_of(response):
+    if response is None:
+        return None
+    data = getattr(response, 'data', None)
+    if data is not None:
+        return data.status
+    return (response.get('data') or {}).get('status')
+
+
+class _Watch(object):
+
+    def __init__(self, merchant_payment_id, callback, expires_at, interval, deadline):
+        self.merchant_payment_id = merchant_payment_id
+        self.callback = callback
+        self.expires_at = expires_at
+        self.deadline = deadline
+        self.interval = interval
+        self.status = None
+        self.response = None
+        self.future = Future()
+        self.cancelled = False
+
+
+class PaymentPoller(object):
+    """Watches many payments on one shared scheduler
+
+    Each watched payment is checked quickly at first and then less and
+    less often (initial_interval growing by backoff up to max_interval).
+    Checks falling due within coalesce_window of each other are issued
+    together on a small worker pool. Watching stops when the payment
+    reaches one of stop_statuses or when its expires_at (epoch seconds)
+    passes, in which case it resolves as EXPIRED. A payment watched inside
+    a timeouts.deadline() block is checked within that deadline, and its
+    Future fails with DeadlineExceeded once it passes.
+    """
+
+    def __init__(self, client=None, fetch=None,
+                 initial_interval=1.0,
+                 max_interval=10.0,
+                 backoff=1.5,
+                 coalesce_window=0.05,
+                 max_workers=8,
+                 stop_statuses=PaymentStatus.TERMINAL):
+        if fetch is None:
+            fetch = client.Code.get_payment_details
+        self.fetch = fetch
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.coalesce_window = coalesce_window
+        self.stop_statuses = frozenset(stop_statuses)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._queue = []
+        self._watches = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._scheduler = threading.Thread(target=self._run,
+                                           name="paypayopa-poller",
+                                           daemon=True)
+        self._scheduler.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def watch(self, merchant_payment_id, callback=None, expires_at=None):
+        """
+        Starts watching a payment and returns a Future resolving to its
+        PollResult. callback(merchant_payment_id, old_status, new_status,
+        response) is invoked on every status transition.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("PaymentPoller is closed")
+            if merchant_payment_id in self._watches:
+                return self._watches[merchant_payment_id].future
+            watch = _Watch(merchant_payment_id, callback, expires_at,
+                           self.initial_interval, timeouts.current())
+            self._watches[merchant_payment_id] = watch
+            self._schedule(watch, time.monotonic())
+            return watch.future
+
+    def unwatch(self, merchant_payment_id):
+        """
+        Stops watching a payment and cancels its Future
+        """
+        with self._condition:
+            watch = self._watches.pop(merchant_payment_id, None)
+        if watch is not None:
+            watch.cancelled = True
+            watch.future.cancel()
+
+    def close(self):
+        """
+        Stops the scheduler and cancels every pending watch
+        """
+        with self._condition:
+            self._closed = True
+            watches = list(self._watches.values())
+            self._watches.clear()
+            self._condition.notify()
+        for watch in watches:
+            watch.cancelled = True
+            watch.future.cancel()
+        self._scheduler.join()
+        self._executor.shutdown(wait=True)
+
+    def _schedule(self, watch, due):
+        heapq.heappush(self._queue, (due, next(self._counter), watch))
+        self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._queue:
+                        delay = self._queue[0][0] - time.monotonic()
+                        if delay <= 0:
+                            break
+                        self._condition.wait(delay)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+                horizon = time.monotonic() + self.coalesce_window
+                batch = []
+                while self._queue and self._queue[0][0] <= horizon:
+                    batch.append(heapq.heappop(self._queue)[2])
+            for watch in batch:
+                if not watch.cancelled:
+                    self._executor.submit(self._check, watch)
+
+    def _check(self, watch):
+        if watch.expires_at is not None and time.time() >= watch.expires_at:
+            self._transition(watch, PaymentStatus.EXPIRED, watch.response)
+            self._finish(watch)
+            return
+        if watch.deadline is not None and time.monotonic() >= watch.deadline:
+            self._finish(watch, DeadlineExceeded())
+            return
+        try:
+            with timeouts.deadline_at(watch.deadline):
+                response = self.fetch(watch.merchant_payment_id)
+        except Exception as e:
+            logger.warning("Polling %s failed: %s", watch.merchant_payment_id, e)
+        else:
+            status = _status_of(response)
+            watch.response = response
+            if status != watch.status:
+                self._transition(watch, status, response)
+            if status in self.stop_statuses:
+                self._finish(watch)
+                return
+        watch.interval = min(watch.interval * self.backoff, self.max_interval)
+        due = time.monotonic() + watch.interval
+        if watch.expires_at is not None:
+            # check once more right at expiry rather than overshooting it
+            due = min(due, time.monotonic() + max(0.0, watch.expires_at - time.time()))
+        if watch.deadline is not None:
+            due = min(due, watch.deadline)
+        with self._condition:
+            if not watch.cancelled and not self._closed:
+                self._schedule(watch, due)
+
+    def _transition(self, watch, status, response):
+        old_status, watch.status = watch.status, status
+        if watch.callback is None:
+            return
+        try:
+            watch.callback(watch.merchant_payment_id, old_status, status, response)
+        except Exception:
+            logger.exception("Poller callback for %s failed", watch.merchant_payment_id)
+
+    def _finish(self, watch, error=None):
+        with self._condition:
+            if self._watches.get(watch.merchant_payment_id) is watch:
+                del self._watches[watch.merchant_payment_id]
+        try:
+            if error is not None:
+                watch.future.set_exception(error)
+            else:
+                watch.future.set_result(PollResult(watch.merchant_payment_id,
+                                                   watch.status, watch.response))
+        except InvalidStateError:
+            # unwatched or closed while the last check was running
+            pass
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket(object):
+    """Thread-safe token bucket refilled at `rate` tokens per second
+
+    Callers reserve a token and are told how long to wait for it, so one
+    bucket can be shared by threads and asyncio tasks alike.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate should be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """
+        Takes tokens from the bucket and returns the seconds to wait
+        until they are actually available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RateLimiter(object):
+    """Token buckets keyed by API_NAMES entry
+
+    limits maps an api_id to its rate in requests per second, or to a
+    (rate, burst) tuple. APIs without an entry use `default`, or are not
+    limited when no default is given. A RateLimiter may be shared by
+    several clients to enforce one quota across them.
+    """
+
+    def __init__(self, limits=None, default=None):
+        self._buckets = {api_id: self._bucket(limit)
+                         for api_id, limit in (limits or {}).items()}
+        self._default = default
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bucket(limit):
+        if isinstance(limit, TokenBucket):
+            return limit
+        if isinstance(limit, (tuple, list)):
+            return TokenBucket(*limit)
+        return TokenBucket(limit)
+
+    def bucket(self, api_id):
+        """
+        Returns the bucket of an API, or None when it is not limited
+        """
+        bucket = self._buckets.get(api_id)
+        if bucket is None and self._default is not None:
+            with self._lock:
+                bucket = self._buckets.get(api_id)
+                if bucket is None:
+                    bucket = self._buckets[api_id] = self._bucket(self._default)
+        return bucket
+
+    def reserve(self, api_id):
+        bucket = self.bucket(api_id)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def acquire(self, api_id):
+        delay = self.reserve(api_id)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, api_id):
+        delay = self.reserve(api_id)
+        if delay > 0:
+            await asyncio.sleep(delay)
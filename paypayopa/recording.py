@@ -0,0 +1,330 @@
+"""Records PayPay API traffic to disk and replays it without a network
+
+A recording is a gzip file of JSON lines, one per request and response.
+OPA-Auth API keys and signatures are never written, and the values of
+redact_fields are masked in request and response bodies.
+
+    session = record_session("traffic.jsonl.gz")
+    client = paypayopa.Client(auth=(API_KEY, API_SECRET), session=session)
+    ...
+    session.close()
+
+    replayer = Replayer("traffic.jsonl.gz", timing=True)
+    client = paypayopa.Client(auth=(API_KEY, API_SECRET), session=replayer.session())
+
+RecordingTransport and Replayer.transport() do the same one layer up, for
+any transports.Transport.
+"""
+import base64
+import datetime
+import gzip
+import threading
+import time
+import zlib
+from collections import defaultdict, deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from . import codec as _codec
+from .adapters import PoolingHTTPAdapter
+
+REDACTED = "REDACTED"
+REDACT_FIELDS = ("userAuthorizationId", "phoneNumber", "deviceId")
+RECORDED_REQUEST_HEADERS = ("Content-Type", "X-ASSUME-MERCHANT")
+# bodies are stored decoded
+DROPPED_RESPONSE_HEADERS = frozenset(("set-cookie", "content-encoding", "content-length",
+                                      "transfer-encoding"))
+
+
+class ReplayError(LookupError):
+    """A request has no recorded response left"""
+
+
+def redact_auth(header):
+    """
+    Masks the API key and signature of an OPA-Auth header, keeping the
+    nonce, timestamp and body hash
+    """
+    parts = (header or "").split(":")
+    if len(parts) != 6:
+        return REDACTED if header else header
+    parts[1] = parts[2] = REDACTED
+    return ":".join(parts)
+
+
+def _redact(value, fields):
+    if isinstance(value, dict):
+        return {key: REDACTED if key in fields and item is not None else _redact(item, fields)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact(item, fields) for item in value]
+    return value
+
+
+def _body(content, codec, fields):
+    """
+    Returns a body as stored in a recording: redacted JSON text, text, or
+    a {"base64": ...} object
+    """
+    if not content:
+        return None
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    if fields:
+        try:
+            return codec.dumps(_redact(codec.loads(content), fields)).decode("utf-8")
+        except ValueError:
+            pass
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode("ascii")}
+
+
+def _content(body):
+    if body is None:
+        return b""
+    if isinstance(body, dict):
+        return base64.b64decode(body["base64"])
+    return body.encode("utf-8")
+
+
+class RecordingWriter(object):
+    """Thread-safe appender of exchanges to a gzip JSON lines file"""
+
+    def __init__(self, path, redact_fields=REDACT_FIELDS, json_codec=None):
+        self.path = path
+        self.redact_fields = frozenset(redact_fields)
+        self.codec = _codec.get_codec(json_codec)
+        self.started = time.perf_counter()
+        self._file = gzip.open(path, "ab")
+        self._lock = threading.Lock()
+
+    def write(self, method, url, headers, body, response, elapsed):
+        """
+        Appends one request and its requests.Response
+        """
+        url = urlsplit(url)
+        exchange = {
+            "at": round(time.perf_counter() - self.started - elapsed, 6),
+            "elapsed": round(elapsed, 6),
+            "method": method,
+            "path": url.path,
+            "query": url.query,
+            "headers": dict({name: headers[name] for name in RECORDED_REQUEST_HEADERS
+                             if name in headers},
+                            Authorization=redact_auth(headers.get("Authorization"))),
+            "body": _body(body, self.codec, self.redact_fields),
+            "status": response.status_code,
+            "response_headers": {name: value for name, value in response.headers.items()
+                                 if name.lower() not in DROPPED_RESPONSE_HEADERS},
+            "response": _body(response.content, self.codec, self.redact_fields),
+        }
+        line = self.codec.dumps(exchange) + b"\n"
+        with self._lock:
+            self._file.write(line)
+            # keeps the recording readable when the process dies
+            self._file.flush(zlib.Z_SYNC_FLUSH)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def load(path, json_codec=None):
+    """
+    Returns the exchanges of a recording, ignoring a truncated tail
+    """
+    codec = _codec.get_codec(json_codec)
+    exchanges = []
+    with gzip.open(path, "rb") as f:
+        try:
+            for line in f:
+                if line.endswith(b"\n"):
+                    exchanges.append(codec.loads(line))
+        except (EOFError, zlib.error):
+            pass
+    return exchanges
+
+
+class RecordingAdapter(BaseAdapter):
+    """requests transport adapter recording every exchange of adapter"""
+
+    def __init__(self, writer, adapter=None):
+        super(RecordingAdapter, self).__init__()
+        self.writer = writer
+        self.adapter = adapter if adapter is not None else PoolingHTTPAdapter()
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        self.writer.write(request.method, request.url, request.headers, request.body,
+                          response, time.perf_counter() - started)
+        return response
+
+    def close(self):
+        self.adapter.close()
+        self.writer.close()
+
+
+def record_session(path, session=None, redact_fields=REDACT_FIELDS):
+    """
+    Returns session (a new pooled one by default) recording its traffic
+    to path; close the session to finish the recording
+    """
+    if session is None:
+        from .adapters import new_session
+        session = new_session()
+    writer = RecordingWriter(path, redact_fields)
+    # one adapter may be mounted on several prefixes
+    wrapped = {}
+    for prefix, adapter in list(session.adapters.items()):
+        if id(adapter) not in wrapped:
+            wrapped[id(adapter)] = RecordingAdapter(writer, adapter)
+        session.mount(prefix, wrapped[id(adapter)])
+    return session
+
+
+class RecordingTransport(object):
+    """Transport wrapper recording every exchange of another transport"""
+
+    def __init__(self, path, transport, redact_fields=REDACT_FIELDS):
+        self.writer = RecordingWriter(path, redact_fields)
+        self.transport = transport
+        self.errors = transport.errors
+
+    def request(self, method, url, headers, data=None, params=None, timeout=None):
+        from .transports import _url
+        started = time.perf_counter()
+        response = self.transport.request(method, url, headers, data=data, params=params,
+                                          timeout=timeout)
+        self.writer.write(method, _url(url, params), headers, data, response,
+                          time.perf_counter() - started)
+        return response
+
+    def warm_up(self, url):
+        self.transport.warm_up(url)
+
+    def pool_stats(self):
+        return self.transport.pool_stats()
+
+    def close(self):
+        self.transport.close()
+        self.writer.close()
+
+
+class Replayer(object):
+    """Answers requests with the responses of a recording
+
+    Requests are matched on method and path, in recorded order. With
+    timing=True every response is delayed by its recorded latency divided
+    by speed; otherwise responses return at once. loop=True starts over
+    once the responses of a request are used up, instead of raising
+    ReplayError.
+    """
+
+    def __init__(self, recording, timing=False, speed=1.0, loop=False):
+        self.exchanges = load(recording) if isinstance(recording, str) else list(recording)
+        self.timing = timing
+        self.speed = speed
+        self.loop = loop
+        self._queues = defaultdict(deque)
+        for exchange in self.exchanges:
+            self._queues[exchange["method"], exchange["path"]].append(exchange)
+        self._used = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def next(self, method, path):
+        """
+        Returns the next recorded exchange of a request
+        """
+        key = (method, path)
+        with self._lock:
+            queue = self._queues.get(key)
+            if not queue and self.loop and self._used[key]:
+                queue = self._queues[key] = self._used.pop(key)
+            if not queue:
+                raise ReplayError("No recorded response left for {} {}".format(method, path))
+            exchange = queue.popleft()
+            self._used[key].append(exchange)
+        return exchange
+
+    def delay(self, exchange):
+        return exchange["elapsed"] / self.speed if self.timing else 0
+
+    def respond(self, request):
+        """
+        Returns the recorded requests.Response of a PreparedRequest
+        """
+        exchange = self.next(request.method, urlsplit(request.url).path)
+        delay = self.delay(exchange)
+        if delay:
+            time.sleep(delay)
+        response = requests.Response()
+        response.status_code = exchange["status"]
+        response.headers = CaseInsensitiveDict(exchange["response_headers"])
+        response._content = _content(exchange["response"])
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.elapsed = datetime.timedelta(seconds=exchange["elapsed"])
+        return response
+
+    def session(self):
+        """
+        Returns a requests.Session answered from the recording
+        """
+        session = requests.Session()
+        adapter = ReplayAdapter(self)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def transport(self):
+        """
+        Returns a transports.InMemoryTransport answered from the recording
+        """
+        from .transports import InMemoryTransport
+
+        def handler(method, path, headers, body, query):
+            exchange = self.next(method, path)
+            delay = self.delay(exchange)
+            if delay:
+                time.sleep(delay)
+            return (exchange["status"], exchange["response_headers"],
+                    _content(exchange["response"]))
+        return InMemoryTransport(handler)
+
+    def httpx_transport(self):
+        """
+        Returns an httpx.MockTransport replaying the recording to
+        httpx.AsyncClient sessions
+        """
+        import asyncio
+        import httpx
+
+        async def handler(request):
+            exchange = self.next(request.method, request.url.path)
+            delay = self.delay(exchange)
+            if delay:
+                await asyncio.sleep(delay)
+            return httpx.Response(exchange["status"], headers=exchange["response_headers"],
+                                  content=_content(exchange["response"]))
+        return httpx.MockTransport(handler)
+
+
+class ReplayAdapter(BaseAdapter):
+    """requests transport adapter answering from a Replayer"""
+
+    def __init__(self, replayer):
+        super(ReplayAdapter, self).__init__()
+        self.replayer = replayer
+
+    def send(self, request, **kwargs):
+        return self.replayer.respond(request)
+
+    def close(self):
+        pass
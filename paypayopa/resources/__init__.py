@@ -1,10 +1,26 @@
-from .code import Code
-from .payment import Payment
-from .account import Account
-from .preauth import Preauth
-from .pending import Pending
-from .user import User
-from .cashback import Cashback
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # resolved by __getattr__ at runtime; imported here for linters and IDEs
+    from .account import Account
+    from .cashback import Cashback
+    from .code import Code
+    from .payment import Payment
+    from .pending import Pending
+    from .preauth import Preauth
+    from .user import User
+
+# resource modules are imported on first access
+_MODULES = {
+        'Code': '.code',
+        'Payment': '.payment',
+        'Account': '.account',
+        'Preauth': '.preauth',
+        'Pending': '.pending',
+        'User': '.user',
+        'Cashback': '.cashback',
+}
 
 __all__ = [
         'Code',
@@ -15,3 +31,15 @@ __all__ = [
         'User',
         'Cashback'
 ]
+
+
+def __getattr__(name):
+    if name not in _MODULES:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(_MODULES[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
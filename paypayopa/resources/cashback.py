@@ -13,6 +13,11 @@ class Cashback(Resource):
         if data is None:
             data = {}
         url = "{}".format(self.give_base_url)
+        self.validate_give_cashback(data)
+        return self.post_url(url, data, api_id=API_NAMES.CREATE_CASHBACK_REQUEST, **kwargs)
+
+    @staticmethod
+    def validate_give_cashback(data: dict):
         if "merchantCashbackId" not in data:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS "
                              "\x1b[0m for merchantCashbackId")
@@ -31,7 +36,6 @@ class Cashback(Resource):
         if "walletType" not in data:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS "
                              "\x1b[0m for walletType")
-        return self.post_url(url, data, api_id=API_NAMES.CREATE_CASHBACK_REQUEST, **kwargs)
 
     def check_cashback_detail(self, merchant_cashback_id, **kwargs):
         if merchant_cashback_id is None:
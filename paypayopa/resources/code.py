@@ -7,7 +7,7 @@ import datetime
 class Code(Resource):
     def __init__(self, client=None):
         super(Code, self).__init__(client)
-        Code.base_url = URL.CODE
+        self.base_url = URL.CODE
 
     def create_qr_code(self, data=None, **kwargs):
         if data is None:
@@ -50,6 +50,16 @@ class Code(Resource):
                              " \x1b[0m for merchantPaymentId")
         return self.fetch(None, url, None, api_id=API_NAMES.GET_QR_PAYMENT, **kwargs)
 
+    def get_many(self, ids, concurrency=8, rate=None, ordered=False, **kwargs):
+        """
+        Fetches the QR payment details of many merchantPaymentIds,
+        yielding a BulkResult per id
+        """
+        from ..bulk import fan_out
+        return fan_out(
+            self.client, lambda id: self.get_payment_details(id, **kwargs),
+            ids, concurrency=concurrency, rate=rate, ordered=ordered)
+
     def delete_qr_code(self, id=None, **kwargs):
         if id is None:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS"
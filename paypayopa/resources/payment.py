@@ -9,6 +9,25 @@ from ..constants.api_list import API_NAMES
 from ..constants.url import URL
 
 
+def _payment_response(raw_response) -> PaymentAPIResponse:
+    payment: PaymentBody = PaymentBody.from_dict(raw_response["data"])
+    return PaymentAPIResponse(result_info=raw_response["resultInfo"], data=payment)
+
+
+def _cancel_response(raw_response) -> PaymentAPIResponse:
+    return PaymentAPIResponse(result_info=raw_response["resultInfo"], data=None)
+
+
+def _payment_auth_response(raw_response) -> PaymentAuthAPIResponse:
+    payment: PaymentAuthBody = PaymentAuthBody.from_dict(raw_response["data"])
+    return PaymentAuthAPIResponse(result_info=raw_response["resultInfo"], data=payment)
+
+
+def _revert_response(raw_response) -> RevertPaymentAuthAPIResponse:
+    revert: RevertPaymentAuthBody = RevertPaymentAuthBody.from_dict(raw_response["data"])
+    return RevertPaymentAuthAPIResponse(result_info=raw_response["resultInfo"], data=revert)
+
+
 class Payment(Resource):
     def __init__(self, client=None):
         super(Payment, self).__init__(client)
@@ -30,26 +49,36 @@ class Payment(Resource):
         if "currency" not in data["amount"]:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS"
                              " \x1b[0m for currency")
-        raw_response = self.post_url(url, data, api_id=API_NAMES.CREATE_PAYMENT, **kwargs)
-        payment: PaymentBody = PaymentBody.from_json(raw_response["data"])
-        return PaymentAPIResponse(result_info=raw_response["resultInfo"], data=payment)
+        return self.post_url(url, data, api_id=API_NAMES.CREATE_PAYMENT,
+                             parser=_payment_response, **kwargs)
 
     def get_payment_details(self, merchant_payment_id: str, **kwargs) -> PaymentAPIResponse:
         url = "{}/{}".format(self.base_url, merchant_payment_id)
         if merchant_payment_id is None:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS"
                              " \x1b[0m for merchantPaymentId")
-        raw_response = self.fetch(None, url, None, api_id=API_NAMES.GET_PAYMENT, **kwargs)
-        payment: PaymentBody = PaymentBody.from_json(raw_response["data"])
-        return PaymentAPIResponse(result_info=raw_response["resultInfo"], data=payment)
+        return self.fetch(None, url, None, api_id=API_NAMES.GET_PAYMENT,
+                          parser=_payment_response, **kwargs)
+
+    def get_many(self, merchant_payment_ids, concurrency=8, rate=None, ordered=False, **kwargs):
+        """
+        Fetches the details of many payments, yielding a BulkResult per
+        merchantPaymentId whose response is a PaymentAPIResponse, or whose
+        error is the exception raised for that payment.
+        """
+        from ..bulk import fan_out
+        return fan_out(
+            self.client,
+            lambda merchant_payment_id: self.get_payment_details(merchant_payment_id, **kwargs),
+            merchant_payment_ids, concurrency=concurrency, rate=rate, ordered=ordered)
 
     def cancel_payment(self, merchant_payment_id: str, **kwargs) -> PaymentAPIResponse:
         url = "{}/{}".format(self.base_url, merchant_payment_id)
         if merchant_payment_id is None:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS"
                              " \x1b[0m for merchantPaymentId")
-        raw_response = self.delete(None, url, None, api_id=API_NAMES.CANCEL_PAYMENT, **kwargs)
-        return PaymentAPIResponse(result_info=raw_response["resultInfo"], data=None)
+        return self.delete(None, url, None, api_id=API_NAMES.CANCEL_PAYMENT,
+                           parser=_cancel_response, **kwargs)
 
     def refund_payment(self, data: dict, **kwargs) -> RefundAPIResponse:
         return self.client.Pending.refund_payment(data, **kwargs)
@@ -82,9 +111,8 @@ class Payment(Resource):
         if "currency" not in data["amount"]:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS "
                              "\x1b[0m for currency")
-        raw_response = self.post_url(url, data, api_id=API_NAMES.CAPTURE_PAYMENT, **kwargs)
-        payment: PaymentAuthBody = PaymentAuthBody.from_json(raw_response["data"])
-        return PaymentAuthAPIResponse(result_info=raw_response["resultInfo"], data=payment)
+        return self.post_url(url, data, api_id=API_NAMES.CAPTURE_PAYMENT,
+                             parser=_payment_auth_response, **kwargs)
 
     # todo: based on the document. not checked yet.
     def create_continuous_payment(self, data: dict, **kwargs) -> PaymentAPIResponse:
@@ -106,9 +134,8 @@ class Payment(Resource):
         if "currency" not in data["amount"]:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS "
                              "\x1b[0m for currency")
-        raw_response = self.post_url(url, data, api_id=API_NAMES.CREATE_CONTINUOUS_PAYMENT, **kwargs)
-        payment: PaymentBody = PaymentBody.from_json(raw_response["data"])
-        return PaymentAPIResponse(result_info=raw_response["resultInfo"], data=payment)
+        return self.post_url(url, data, api_id=API_NAMES.CREATE_CONTINUOUS_PAYMENT,
+                             parser=_payment_response, **kwargs)
 
     # todo: based on the document. not checked yet.
     def revert_payment(self, data=None, **kwargs) -> RevertPaymentAuthAPIResponse:
@@ -123,6 +150,5 @@ class Payment(Resource):
         if "paymentId" not in data:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS"
                              " \x1b[0m for merchantPaymentId")
-        raw_response = self.post_url(url, data, api_id=API_NAMES.REVERT_AUTHORIZE, **kwargs)
-        revert: RevertPaymentAuthBody = RevertPaymentAuthBody.from_json(raw_response["data"])
-        return RevertPaymentAuthAPIResponse(result_info=raw_response["resultInfo"], data=revert)
+        return self.post_url(url, data, api_id=API_NAMES.REVERT_AUTHORIZE,
+                             parser=_revert_response, **kwargs)
@@ -8,6 +8,25 @@ from ..constants.api_list import API_NAMES
 from ..constants.url import URL
 
 
+def _created_pending_payment_response(raw_response) -> CreatedPendingPaymentAPIResponse:
+    pending_payment = CreatedPendingPaymentBody.from_dict(raw_response["data"])
+    return CreatedPendingPaymentAPIResponse(result_info=raw_response["resultInfo"], data=pending_payment)
+
+
+def _pending_payment_response(raw_response) -> PaymentAPIResponse:
+    pending_payment = PaymentBody.from_dict(raw_response["data"])
+    return PaymentAPIResponse(result_info=raw_response["resultInfo"], data=pending_payment)
+
+
+def _cancel_response(raw_response) -> PaymentAPIResponse:
+    return PaymentAPIResponse(result_info=raw_response["resultInfo"], data=None)
+
+
+def _refund_response(raw_response) -> RefundAPIResponse:
+    refund: RefundBody = RefundBody.from_dict(raw_response["data"])
+    return RefundAPIResponse(result_info=raw_response["resultInfo"], data=refund)
+
+
 class Pending(Resource):
     def __init__(self, client=None):
         super(Pending, self).__init__(client)
@@ -32,34 +51,38 @@ class Pending(Resource):
         if "currency" not in data["amount"]:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS"
                              " \x1b[0m for currency")
-        raw_response = self.post_url(url, data, api_id=API_NAMES.CREATE_REQUEST_ORDER, **kwargs)
-        pending_payment = CreatedPendingPaymentBody.from_json(raw_response["data"])
-        return CreatedPendingPaymentAPIResponse(result_info=raw_response["resultInfo"], data=pending_payment)
+        return self.post_url(url, data, api_id=API_NAMES.CREATE_REQUEST_ORDER,
+                             parser=_created_pending_payment_response, **kwargs)
 
     def get_payment_details(self, merchant_payment_id: str, **kwargs) -> PaymentAPIResponse:
         url = "{}/{}".format(self.base_url, merchant_payment_id)
         if merchant_payment_id is None:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS"
                              " \x1b[0m for merchantPaymentId")
-        raw_response = self.fetch(None, url, None, api_id=API_NAMES.GET_REQUEST_ORDER, **kwargs)
-        pending_payment = PaymentBody.from_json(raw_response["data"])
-        return PaymentAPIResponse(result_info=raw_response["resultInfo"], data=pending_payment)
+        return self.fetch(None, url, None, api_id=API_NAMES.GET_REQUEST_ORDER,
+                          parser=_pending_payment_response, **kwargs)
 
     def cancel_payment(self, merchant_payment_id: str, **kwargs) -> PaymentAPIResponse:
         url = "{}/{}".format(self.base_url, merchant_payment_id)
         if merchant_payment_id is None:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS"
                              " \x1b[0m for merchantPaymentId")
-        raw_response = self.delete(None, url, None, api_id=API_NAMES.CANCEL_REQUEST_ORDER, **kwargs)
-        return PaymentAPIResponse(result_info=raw_response["resultInfo"], data=None)
+        return self.delete(None, url, None, api_id=API_NAMES.CANCEL_REQUEST_ORDER,
+                           parser=_cancel_response, **kwargs)
 
     def refund_payment(self, data: dict, **kwargs) -> RefundAPIResponse:
         url = "{}".format(URL.REFUNDS)
+        self.validate_refund_payment(data)
+        if "requestedAt" not in data:
+            data = dict(data, requestedAt=int(datetime.datetime.now().timestamp()))
+        return self.post_url(url, data, api_id=API_NAMES.REFUND_REQUEST_ORDER,
+                             parser=_refund_response, **kwargs)
+
+    @staticmethod
+    def validate_refund_payment(data: dict):
         if "merchantRefundId" not in data:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS "
                              "\x1b[0m for merchantRefundId")
-        if "requestedAt" not in data:
-            data['requestedAt'] = int(datetime.datetime.now().timestamp())
         if "paymentId" not in data:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS "
                              "\x1b[0m for paymentId")
@@ -72,15 +95,11 @@ class Pending(Resource):
         if "currency" not in data["amount"]:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS"
                              " \x1b[0m for currency")
-        raw_response = self.post_url(url, data,  api_id=API_NAMES.REFUND_REQUEST_ORDER, **kwargs)
-        refund: RefundBody = RefundBody.from_json(raw_response["data"])
-        return RefundAPIResponse(result_info=raw_response["resultInfo"], data=refund)
 
     def refund_details(self, merchant_refund_id: str, **kwargs) -> RefundAPIResponse:
         if merchant_refund_id is None:
             raise ValueError("\x1b[31m MISSING REQUEST PARAMS"
                              " \x1b[0m for merchantRefundId")
         url = "{}/{}".format('/v2/refunds', merchant_refund_id)
-        raw_response = self.fetch(None, url, None, api_id=API_NAMES.GET_REFUND, **kwargs)
-        refund: RefundBody = RefundBody.from_json(raw_response["data"])
-        return RefundAPIResponse(result_info=raw_response["resultInfo"], data=refund)
+        return self.fetch(None, url, None, api_id=API_NAMES.GET_REFUND,
+                          parser=_refund_response, **kwargs)
@@ -6,7 +6,7 @@ from ..constants.api_list import API_NAMES
 class User(Resource):
     def __init__(self, client=None):
         super(User, self).__init__(client)
-        User.base_url = URL.USER_AUTH
+        self.base_url = URL.USER_AUTH
 
     def get_authorization_status(self, id, **kwargs):
         url = self.base_url
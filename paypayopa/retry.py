@@ -0,0 +1,166 @@
+import email.utils
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+# body fields PayPay deduplicates requests on, making a POST safe to resend
+IDEMPOTENCY_KEYS = (
+    "merchantPaymentId",
+    "merchantRefundId",
+    "merchantCashbackId",
+    "merchantCashbackReversalId",
+    "merchantCaptureId",
+    "merchantRevertId",
+)
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE"])
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _retry_after(response):
+    """
+    Returns the Retry-After header of a response in seconds, if any
+    """
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryBudget(object):
+    """Caps retries to a fraction of recent requests
+
+    Every request deposits `ratio` tokens and every retry withdraws one,
+    on top of a floor of `min_retries_per_second`, so an outage cannot
+    multiply the traffic sent to PayPay.
+    """
+
+    def __init__(self, ratio=0.2, min_retries_per_second=1.0, max_balance=10.0):
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_balance = max_balance
+        self._balance = max_balance
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._balance = min(self.max_balance,
+                            self._balance + (now - self._updated) * self.min_retries_per_second)
+        self._updated = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill()
+            self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            self._refill()
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class RetryStats(object):
+    """Thread-safe retry counters per API_NAMES entry"""
+
+    def __init__(self):
+        self._counters = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record(self, api_id, event):
+        with self._lock:
+            self._counters[api_id][event] += 1
+
+    def snapshot(self):
+        """
+        Returns {api_id: {event: count}} where event is one of requests,
+        retries, exhausted, budget_denied
+        """
+        with self._lock:
+            return {api_id: dict(counter) for api_id, counter in self._counters.items()}
+
+
+class RetryPolicy(object):
+    """Decides whether and when a failed PayPay request is sent again
+
+    Only requests that cannot double-book are retried: idempotent HTTP
+    methods, and POSTs carrying one of IDEMPOTENCY_KEYS. Attempts are
+    spaced with exponential backoff and full jitter, honouring
+    Retry-After up to max_retry_after seconds.
+    """
+
+    def __init__(self, max_attempts=3,
+                 backoff_base=0.2,
+                 backoff_max=5.0,
+                 jitter=True,
+                 retry_statuses=RETRY_STATUSES,
+                 max_retry_after=30.0,
+                 budget=None,
+                 idempotency_keys=IDEMPOTENCY_KEYS):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.max_retry_after = max_retry_after
+        self.budget = budget if budget is not None else RetryBudget()
+        self.idempotency_keys = tuple(idempotency_keys)
+        self.stats = RetryStats()
+
+    def is_idempotent(self, method, data):
+        if method in IDEMPOTENT_METHODS:
+            return True
+        return isinstance(data, dict) and any(data.get(key) for key in self.idempotency_keys)
+
+    def backoff(self, method, api_id, data, attempt, response=None, error=None):
+        """
+        Returns how many seconds to wait before sending attempt + 1, or
+        None when the outcome of `attempt` is final
+        """
+        if attempt == 1:
+            self.budget.deposit()
+            self.stats.record(api_id, 'requests')
+        if error is None and response.status_code not in self.retry_statuses:
+            return None
+        if not self.is_idempotent(method, data):
+            return None
+        if attempt >= self.max_attempts:
+            self.stats.record(api_id, 'exhausted')
+            return None
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        retry_after = _retry_after(response)
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                self.stats.record(api_id, 'exhausted')
+                return None
+            delay = max(delay, retry_after)
+        if not self.budget.withdraw():
+            self.stats.record(api_id, 'budget_denied')
+            return None
+        self.stats.record(api_id, 'retries')
+        return delay
+
+
+def get_retry_policy(retry=None):
+    """
+    Resolves the retry client option: a RetryPolicy, True for the
+    default policy, or None/False to disable retries
+    """
+    if retry is True:
+        return RetryPolicy()
+    if not retry:
+        return None
+    return retry
@@ -0,0 +1,51 @@
+import base64
+import hashlib
+import hmac
+import os
+import time
+
+AUTH_TYPE = 'hmac OPA-Auth'
+EMPTY = "empty"
+
+
+def _nonce():
+    return os.urandom(4).hex()
+
+
+class Signer(object):
+    """Builds OPA-Auth headers for one API key
+
+    The keyed HMAC state is computed once and copied for every request,
+    and request bodies are hashed as the exact bytes sent on the wire.
+    """
+
+    def __init__(self, api_key, api_secret):
+        self.api_key = api_key
+        self._hmac = hmac.new(api_secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+    def body_hash(self, content_type, body):
+        """
+        Returns the base64 MD5 of content type and body, or "empty"
+        """
+        if body is None:
+            return EMPTY
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        hashed_body = hashlib.md5(content_type.encode("utf-8"))
+        hashed_body.update(body)
+        return base64.b64encode(hashed_body.digest()).decode("ascii")
+
+    def sign(self, method, resource, content_type=EMPTY, body=None,
+             nonce=None, timestamp=None):
+        """
+        Returns the Authorization header value for a request
+        """
+        nonce = nonce or _nonce()
+        timestamp = timestamp or str(int(time.time()))
+        body_hash = self.body_hash(content_type, body)
+        mac = self._hmac.copy()
+        mac.update("\n".join((resource, method, nonce, timestamp,
+                              content_type, body_hash)).encode("utf-8"))
+        signature = base64.b64encode(mac.digest()).decode("ascii")
+        return "{}:{}:{}:{}:{}:{}".format(AUTH_TYPE, self.api_key, signature,
+                                          nonce, timestamp, body_hash)
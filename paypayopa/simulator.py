@@ -0,0 +1,740 @@
+"""Offline simulator of the PayPay OPA API
+
+The simulator keeps payments, QR codes, pending payments, refunds,
+cashbacks and user authorizations in memory and moves them through the
+same states as PayPay. It verifies the OPA-Auth header of every request,
+and can add latency and inject error responses.
+
+It runs in process, as a requests adapter or httpx transport, or as a
+local HTTP server:
+
+    $ python -m paypayopa.simulator --port 8080
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from . import codec as _codec
+from .constants.api_list import API_NAMES
+from .constants.url import URL
+from .signing import AUTH_TYPE, EMPTY, Signer
+from .webhooks import LRUSet
+
+DEFAULT_CREDENTIALS = {"simulator_key": "simulator_secret"}
+
+SUCCESS = ("SUCCESS", "08100001", "Success")
+REQUEST_ACCEPTED = ("REQUEST_ACCEPTED", "08100001", "Request accepted")
+# status -> (code, codeId, message) of injected errors
+FAULTS = {
+    429: ("RATE_LIMIT", "08100998", "Too many requests"),
+    500: ("INTERNAL_SERVER_ERROR", "08101000", "Something went wrong on PayPay service side"),
+    503: ("MAINTENANCE_MODE", "08100999", "Sorry, we are down for scheduled maintenance"),
+}
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized",
+            404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+
+class SimulatorError(Exception):
+    """Error response of a simulated endpoint"""
+
+    def __init__(self, status, code, code_id, message=""):
+        super(SimulatorError, self).__init__(message)
+        self.status = status
+        self.code = code
+        self.code_id = code_id
+        self.message = message
+
+
+def _not_found(code="RESOURCE_NOT_FOUND", code_id="00200001", message="Order not found"):
+    return SimulatorError(404, code, code_id, message)
+
+
+def _invalid(message, code="INVALID_PARAMS", code_id="00200004"):
+    return SimulatorError(400, code, code_id, message)
+
+
+def _require(data, *keys):
+    if not isinstance(data, dict):
+        raise _invalid("Request body should be a JSON object")
+    for key in keys:
+        if key not in data:
+            raise _invalid("Missing {}".format(key), "MISSING_REQUEST_PARAMS", "08100024")
+
+
+def _amount(data):
+    amount = data.get("amount")
+    if not isinstance(amount, dict) or not isinstance(amount.get("amount"), int) or \
+            amount["amount"] < 0 or not amount.get("currency"):
+        raise _invalid("Invalid amount", "INVALID_REQUEST_PARAMS", "08100006")
+    return dict(amount)
+
+
+class Simulator(object):
+    """In-memory PayPay API
+
+    credentials maps API keys to secrets accepted in OPA-Auth headers.
+    latency is a delay in seconds, or a (low, high) range, added to every
+    response. error_rate is the share of requests answered with one of
+    error_statuses instead of being processed. A QR code payment is paid
+    by calling pay(), or automatically auto_pay_after seconds after the
+    code was created; refunds and cashbacks complete settle_after seconds
+    after they were accepted.
+    """
+
+    def __init__(self, credentials=None, verify_auth=True, max_clock_skew=300,
+                 latency=0.0, error_rate=0.0, error_statuses=(500,),
+                 auto_pay_after=None, settle_after=0.0, seed=None):
+        self.credentials = dict(credentials or DEFAULT_CREDENTIALS)
+        self.verify_auth = verify_auth
+        self.max_clock_skew = max_clock_skew
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.auto_pay_after = auto_pay_after
+        self.settle_after = settle_after
+        self.codec = _codec.get_codec()
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._signers = {key: Signer(key, secret) for key, secret in self.credentials.items()}
+        self._nonces = LRUSet(100000)
+        self._forced = []
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self.payments = {}
+        self.pending = {}
+        self.codes = {}
+        self.refunds = {}
+        self.cashbacks = {}
+        self.reversals = {}
+        self.users = {}
+        self._routes = [
+            ("POST", re.compile(URL.CODE + "$"), API_NAMES.CREATE_QRCODE, self._create_code),
+            ("GET", re.compile(URL.CODE + "/payments/([^/]+)$"), API_NAMES.GET_QR_PAYMENT,
+             self._get_code_payment),
+            ("DELETE", re.compile(URL.CODE + "/([^/]+)/?$"), API_NAMES.DELETE_QRCODE,
+             self._delete_code),
+            ("POST", re.compile(URL.PAYMENT + "$"), API_NAMES.CREATE_PAYMENT,
+             self._create_payment),
+            ("POST", re.compile(URL.PAYMENT + "/preauthorize$"), API_NAMES.PREAUTHORIZE_PAYMENT,
+             self._preauthorize),
+            ("POST", re.compile(URL.PAYMENT + "/preauthorize/revert$"),
+             API_NAMES.REVERT_AUTHORIZE, self._revert),
+            ("POST", re.compile(URL.PAYMENT + "/capture$"), API_NAMES.CAPTURE_PAYMENT,
+             self._capture),
+            ("GET", re.compile(URL.PAYMENT + "/([^/]+)$"), API_NAMES.GET_PAYMENT,
+             self._get_payment),
+            ("DELETE", re.compile(URL.PAYMENT + "/([^/]+)/?$"), API_NAMES.CANCEL_PAYMENT,
+             self._cancel_payment),
+            ("POST", re.compile("/v1/subscription/payments$"),
+             API_NAMES.CREATE_CONTINUOUS_PAYMENT, self._create_payment),
+            ("POST", re.compile(URL.PENDING_PAYMENT + "$"), API_NAMES.CREATE_REQUEST_ORDER,
+             self._create_pending),
+            ("GET", re.compile(URL.PENDING_PAYMENT + "/([^/]+)$"), API_NAMES.GET_REQUEST_ORDER,
+             self._get_pending),
+            ("DELETE", re.compile(URL.PENDING_PAYMENT + "/([^/]+)/?$"),
+             API_NAMES.CANCEL_REQUEST_ORDER, self._cancel_pending),
+            ("POST", re.compile(URL.REFUNDS + "/?$"), API_NAMES.REFUND_REQUEST_ORDER, self._refund),
+            ("GET", re.compile(URL.REFUNDS + "/([^/]+)$"), API_NAMES.GET_REFUND,
+             self._get_refund),
+            ("POST", re.compile(URL.GIVE_CASHBACK + "$"), API_NAMES.CREATE_CASHBACK_REQUEST,
+             self._give_cashback),
+            ("GET", re.compile(URL.GIVE_CASHBACK + "/([^/]+)$"), API_NAMES.GET_CASHBACK_DETAILS,
+             self._get_cashback),
+            ("POST", re.compile(URL.REVERSAL_CASHBACK + "$"),
+             API_NAMES.CREATE_REVERSE_CASHBACK_REQUEST, self._reverse_cashback),
+            ("GET", re.compile(URL.REVERSAL_CASHBACK + "/([^/]+)/([^/]+)$"),
+             API_NAMES.GET_REVERESED_CASHBACK_DETAILS, self._get_reversal),
+            ("GET", re.compile(URL.USER_AUTH + "$"), API_NAMES.GET_USER_AUTH_STATUS,
+             self._get_user),
+            ("DELETE", re.compile(URL.USER_AUTH + "/([^/]+)/?$"), API_NAMES.UNLINK_USER,
+             self._unlink_user),
+            ("POST", re.compile(URL.ACCOUNT_LINK + "$"), API_NAMES.CREATE_QR_SESSION,
+             self._create_session),
+        ]
+
+    # request handling
+
+    def handle(self, method, path, headers=None, body=b"", query=""):
+        """
+        Processes one request and returns (status, headers, body bytes)
+        """
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+        return self._handle(method, path, headers, body, query)
+
+    async def handle_async(self, method, path, headers=None, body=b"", query=""):
+        """
+        handle for event loops, sleeping the latency without blocking
+        """
+        delay = self._delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self._handle(method, path, headers, body, query)
+
+    def _handle(self, method, path, headers, body, query):
+        headers = CaseInsensitiveDict(headers or {})
+        body = body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        try:
+            route, args = self._route(method, path)
+            with self._lock:
+                self.stats[route[2]] += 1
+            self._inject(route[2])
+            if self.verify_auth:
+                self._authenticate(method, path, headers, body)
+            data = self.codec.loads(body) if body else None
+            if route[0] == "GET" and query:
+                data = {key: values[0] for key, values in parse_qs(query).items()}
+            with self._lock:
+                # serialized under the lock as handlers return live state
+                return self._respond(*route[3](data, *args))
+        except SimulatorError as e:
+            extra = {"Retry-After": "1"} if e.status == 429 else {}
+            return self._respond(e.status, (e.code, e.code_id, e.message), None, extra)
+        except ValueError:
+            return self._respond(400, ("INVALID_REQUEST_PARAMS", "08100006",
+                                       "Invalid request params"), None)
+
+    def _respond(self, status, result, data, extra_headers=None):
+        code, code_id, message = result
+        payload = self.codec.dumps({"resultInfo": {"code": code, "message": message,
+                                                   "codeId": code_id},
+                                    "data": data})
+        headers = {"Content-Type": "application/json;charset=UTF-8",
+                   "Content-Length": str(len(payload))}
+        headers.update(extra_headers or {})
+        return status, headers, payload
+
+    def _route(self, method, path):
+        for route in self._routes:
+            if route[0] == method:
+                match = route[1].match(path)
+                if match:
+                    return route, match.groups()
+        raise _not_found("API_NOT_FOUND", "08100404", "No such API {} {}".format(method, path))
+
+    def _delay(self):
+        if isinstance(self.latency, (tuple, list)):
+            return self._random.uniform(*self.latency)
+        return self.latency
+
+    def inject(self, status, count=1, api_id=None):
+        """
+        Answers the next count requests (of api_id, if given) with status
+        """
+        with self._lock:
+            self._forced.append([status, count, api_id])
+
+    def _inject(self, api_id):
+        status = None
+        with self._lock:
+            for forced in self._forced:
+                if forced[2] in (None, api_id):
+                    status = forced[0]
+                    forced[1] -= 1
+                    if not forced[1]:
+                        self._forced.remove(forced)
+                    break
+            if status is None and self.error_rate and self._random.random() < self.error_rate:
+                status = self._random.choice(self.error_statuses)
+            if status is not None:
+                self.stats["injected_errors"] += 1
+        if status is not None:
+            raise SimulatorError(status, *FAULTS.get(status, FAULTS[500]))
+
+    def _authenticate(self, method, path, headers, body):
+        try:
+            auth_type, api_key, signature, nonce, timestamp, body_hash = \
+                headers.get("Authorization", "").split(":")
+        except ValueError:
+            raise SimulatorError(401, "UNAUTHORIZED", "08100016", "Malformed OPA-Auth header")
+        signer = self._signers.get(api_key)
+        if auth_type != AUTH_TYPE or signer is None:
+            raise SimulatorError(401, "UNAUTHORIZED", "08100016", "Unknown API key")
+        try:
+            skew = abs(time.time() - int(timestamp))
+        except ValueError:
+            skew = None
+        if skew is None or skew > self.max_clock_skew:
+            raise SimulatorError(401, "UNAUTHORIZED", "08100016", "Stale OPA-Auth timestamp")
+        content_type = headers.get("Content-Type", EMPTY) if body else EMPTY
+        expected = signer.sign(method, path, content_type, body or None,
+                               nonce=nonce, timestamp=timestamp)
+        if expected.split(":")[2] != signature or expected.split(":")[5] != body_hash:
+            raise SimulatorError(401, "UNAUTHORIZED", "08100016", "OPA-Auth signature mismatch")
+        # the signature covers the request, so different requests sharing
+        # an 8 character nonce within a second are not taken for replays
+        if not self._nonces.add((api_key, timestamp, nonce, signature)):
+            raise SimulatorError(401, "UNAUTHORIZED", "08100016", "Nonce already used")
+
+    # state
+
+    def _payment_id(self):
+        return "{:020d}".format(next(self._ids))
+
+    def _refresh(self, payment):
+        now = time.time()
+        if payment["status"] == "CREATED":
+            expiry = payment.get("expiryDate")
+            if self.auto_pay_after is not None and \
+                    now - payment["acceptedAt"] >= self.auto_pay_after:
+                self._settle(payment)
+            elif expiry and now >= expiry:
+                payment["status"] = "EXPIRED"
+        for refund in payment["refunds"]["data"]:
+            if refund["status"] == "CREATED" and now - refund["acceptedAt"] >= self.settle_after:
+                refund["status"] = "COMPLETED"
+        return payment
+
+    def _settle(self, payment):
+        payment["status"] = "AUTHORIZED" if payment.pop("isAuthorization", False) else "COMPLETED"
+        payment.setdefault("paymentId", self._payment_id())
+        payment.setdefault("userAuthorizationId", "simulated_user")
+        payment["paymentMethods"] = [{"amount": payment["amount"], "type": "WALLET"}]
+
+    def pay(self, merchant_payment_id):
+        """
+        Simulates the user paying a QR code or pending payment
+        """
+        with self._lock:
+            payment = self.payments.get(merchant_payment_id) or \
+                self.pending.get(merchant_payment_id)
+            if payment is None:
+                raise KeyError(merchant_payment_id)
+            if payment["status"] == "CREATED":
+                self._settle(payment)
+            return dict(payment)
+
+    def _find_payment(self, merchant_payment_id, store=None):
+        payment = (store if store is not None else self.payments).get(merchant_payment_id)
+        if payment is None:
+            raise _not_found()
+        return self._refresh(payment)
+
+    def _by_payment_id(self, payment_id):
+        for store in (self.payments, self.pending):
+            for payment in store.values():
+                if payment.get("paymentId") == payment_id:
+                    return self._refresh(payment)
+        raise _not_found()
+
+    def _new_payment(self, data, status, **extra):
+        now = int(time.time())
+        payment = {
+            "merchantPaymentId": data["merchantPaymentId"],
+            "status": status,
+            "acceptedAt": now,
+            "requestedAt": data.get("requestedAt", now),
+            "amount": _amount(data),
+            "refunds": {"data": []},
+            "orderDescription": data.get("orderDescription"),
+            "orderItems": data.get("orderItems", []),
+            "storeId": data.get("storeId"),
+            "terminalId": data.get("terminalId"),
+            "orderReceiptNumber": data.get("orderReceiptNumber"),
+            "metadata": data.get("metadata", {}),
+        }
+        payment.update(extra)
+        return payment
+
+    # endpoints, each returning (status, resultInfo, data)
+
+    def _create_code(self, data):
+        _require(data, "merchantPaymentId", "amount", "codeType")
+        if data["merchantPaymentId"] in self.payments:
+            raise _invalid("Duplicate Dynamic QR request error",
+                           "DUPLICATE_DYNAMIC_QR_REQUEST", "01652073")
+        code_id = "04-{}".format(self._payment_id())
+        now = int(time.time())
+        payment = self._new_payment(data, "CREATED", codeId=code_id,
+                                    expiryDate=data.get("codeExpiryDate") or now + 300,
+                                    isAuthorization=bool(data.get("isAuthorization")))
+        self.payments[data["merchantPaymentId"]] = payment
+        self.codes[code_id] = data["merchantPaymentId"]
+        code = dict(data, codeId=code_id,
+                    url="https://qr-stg.sandbox.paypay.ne.jp/{}".format(code_id),
+                    deeplink="paypay://payment?link_key={}".format(code_id),
+                    expiryDate=payment["expiryDate"])
+        return 201, SUCCESS, code
+
+    def _get_code_payment(self, data, merchant_payment_id):
+        payment = self.payments.get(merchant_payment_id)
+        if payment is None or "codeId" not in payment:
+            raise _not_found("DYNAMIC_QR_PAYMENT_NOT_FOUND", "01652075",
+                             "Dynamic QR payment not found")
+        return 200, SUCCESS, self._refresh(payment)
+
+    def _delete_code(self, data, code_id):
+        merchant_payment_id = self.codes.pop(code_id, None)
+        if merchant_payment_id is None:
+            raise _not_found("DYNAMIC_QR_NOT_FOUND", "01652072", "Dynamic qr code not found")
+        payment = self._refresh(self.payments[merchant_payment_id])
+        if payment["status"] == "CREATED":
+            del self.payments[merchant_payment_id]
+        return 200, SUCCESS, None
+
+    def _create_payment(self, data):
+        _require(data, "merchantPaymentId", "userAuthorizationId", "amount")
+        existing = self.payments.get(data["merchantPaymentId"])
+        if existing is not None:
+            if existing["amount"] != data["amount"]:
+                raise _invalid("Duplicate merchantPaymentId", "DUPLICATE_REQUEST", "08100035")
+            return 200, SUCCESS, self._refresh(existing)
+        payment = self._new_payment(data, "COMPLETED", paymentId=self._payment_id(),
+                                    userAuthorizationId=data["userAuthorizationId"])
+        payment["paymentMethods"] = [{"amount": payment["amount"], "type": "WALLET"}]
+        self.payments[data["merchantPaymentId"]] = payment
+        return 201, SUCCESS, payment
+
+    def _preauthorize(self, data):
+        _require(data, "merchantPaymentId", "userAuthorizationId", "amount")
+        existing = self.payments.get(data["merchantPaymentId"])
+        if existing is not None:
+            return 200, SUCCESS, self._refresh(existing)
+        payment = self._new_payment(
+            data, "AUTHORIZED", paymentId=self._payment_id(),
+            userAuthorizationId=data["userAuthorizationId"],
+            expiresAt=data.get("expiresAt") or int(time.time()) + 7 * 86400,
+            captures={"data": []})
+        self.payments[data["merchantPaymentId"]] = payment
+        return 201, SUCCESS, payment
+
+    def _capture(self, data):
+        _require(data, "merchantPaymentId", "merchantCaptureId", "amount")
+        payment = self._find_payment(data["merchantPaymentId"])
+        captures = payment.setdefault("captures", {"data": []})["data"]
+        for capture in captures:
+            if capture["merchantCaptureId"] == data["merchantCaptureId"]:
+                return 200, SUCCESS, payment
+        if payment["status"] != "AUTHORIZED":
+            raise _invalid("Order is not capturable", "ORDER_NOT_CAPTURABLE", "00200035")
+        now = int(time.time())
+        captures.append({"merchantCaptureId": data["merchantCaptureId"],
+                         "amount": _amount(data), "orderDescription": data.get("orderDescription"),
+                         "requestedAt": data.get("requestedAt", now), "acceptedAt": now,
+                         "expiresAt": None, "status": "COMPLETED"})
+        payment["status"] = "COMPLETED"
+        payment["amount"] = _amount(data)
+        return 200, SUCCESS, payment
+
+    def _revert(self, data):
+        _require(data, "merchantRevertId", "paymentId")
+        payment = self._by_payment_id(data["paymentId"])
+        if payment["status"] not in ("AUTHORIZED", "CANCELED"):
+            raise _invalid("Order cannot be reversed", "ORDER_NOT_REVERSIBLE", "00200044")
+        payment["status"] = "CANCELED"
+        now = int(time.time())
+        payment["revert"] = {"merchantRevertId": data["merchantRevertId"], "acceptedAt": now,
+                             "requestedAt": data.get("requestedAt", now),
+                             "reason": data.get("reason")}
+        return 200, SUCCESS, {"status": "CANCELED", "acceptedAt": now,
+                              "paymentId": payment["paymentId"],
+                              "requestedAt": data.get("requestedAt", now),
+                              "reason": data.get("reason")}
+
+    def _get_payment(self, data, merchant_payment_id):
+        return 200, SUCCESS, self._find_payment(merchant_payment_id)
+
+    def _cancel_payment(self, data, merchant_payment_id):
+        payment = self._find_payment(merchant_payment_id)
+        if payment["status"] in ("REFUNDED", "EXPIRED", "FAILED"):
+            raise _invalid("Order is not cancelable", "ORDER_NOT_CANCELABLE", "00200042")
+        payment["status"] = "CANCELED"
+        return 202, REQUEST_ACCEPTED, None
+
+    def _create_pending(self, data):
+        _require(data, "merchantPaymentId", "userAuthorizationId", "amount")
+        existing = self.pending.get(data["merchantPaymentId"])
+        if existing is not None:
+            return 200, SUCCESS, self._refresh(existing)
+        payment = self._new_payment(data, "CREATED",
+                                    userAuthorizationId=data["userAuthorizationId"],
+                                    expiryDate=data.get("expiryDate"))
+        self.pending[data["merchantPaymentId"]] = payment
+        return 201, SUCCESS, payment
+
+    def _get_pending(self, data, merchant_payment_id):
+        return 200, SUCCESS, self._find_payment(merchant_payment_id, self.pending)
+
+    def _cancel_pending(self, data, merchant_payment_id):
+        payment = self._find_payment(merchant_payment_id, self.pending)
+        if payment["status"] != "CREATED":
+            raise _invalid("Order is not cancelable", "ORDER_NOT_CANCELABLE", "00200042")
+        payment["status"] = "CANCELED"
+        return 202, REQUEST_ACCEPTED, None
+
+    def _refund(self, data):
+        _require(data, "merchantRefundId", "paymentId", "amount")
+        existing = self.refunds.get(data["merchantRefundId"])
+        if existing is not None:
+            return 200, SUCCESS, existing
+        payment = self._by_payment_id(data["paymentId"])
+        if payment["status"] not in ("COMPLETED",):
+            raise _invalid("Order cannot be refunded", "UNACCEPTABLE_OP", "00200013")
+        amount = _amount(data)
+        refunded = sum(refund["amount"]["amount"] for refund in payment["refunds"]["data"])
+        if refunded + amount["amount"] > payment["amount"]["amount"]:
+            raise _invalid("Invalid refund amount", "INVALID_PARAMS", "00200015")
+        now = int(time.time())
+        refund = {"status": "CREATED", "acceptedAt": now,
+                  "merchantRefundId": data["merchantRefundId"],
+                  "paymentId": data["paymentId"], "amount": amount,
+                  "requestedAt": data.get("requestedAt", now), "reason": data.get("reason")}
+        payment["refunds"]["data"].append(refund)
+        if refunded + amount["amount"] == payment["amount"]["amount"]:
+            payment["status"] = "REFUNDED"
+        self.refunds[data["merchantRefundId"]] = refund
+        return 201, SUCCESS, refund
+
+    def _get_refund(self, data, merchant_refund_id):
+        refund = self.refunds.get(merchant_refund_id)
+        if refund is None:
+            raise _not_found("NO_SUCH_REFUND_ORDER", "00200018", "Refund not found")
+        if refund["status"] == "CREATED" and time.time() - refund["acceptedAt"] >= self.settle_after:
+            refund["status"] = "COMPLETED"
+        return 200, SUCCESS, refund
+
+    def _give_cashback(self, data):
+        _require(data, "merchantCashbackId", "userAuthorizationId", "amount",
+                 "requestedAt", "walletType")
+        if data["merchantCashbackId"] not in self.cashbacks:
+            self.cashbacks[data["merchantCashbackId"]] = dict(
+                data, amount=_amount(data), status="ACCEPTED", acceptedAt=int(time.time()),
+                cashbackId=self._payment_id(), merchantAlias="simulated_merchant")
+        return 202, REQUEST_ACCEPTED, None
+
+    def _settled(self, record):
+        if record["status"] == "ACCEPTED" and \
+                time.time() - record["acceptedAt"] >= self.settle_after:
+            record["status"] = "SUCCESS"
+        return record
+
+    def _get_cashback(self, data, merchant_cashback_id):
+        cashback = self.cashbacks.get(merchant_cashback_id)
+        if cashback is None:
+            raise _not_found("RESOURCE_NOT_FOUND", "00200001", "Cashback not found")
+        return 200, SUCCESS, self._settled(cashback)
+
+    def _reverse_cashback(self, data):
+        _require(data, "merchantCashbackReversalId", "merchantCashbackId", "amount",
+                 "requestedAt")
+        if data["merchantCashbackId"] not in self.cashbacks:
+            raise _not_found("RESOURCE_NOT_FOUND", "00200001", "Cashback not found")
+        key = (data["merchantCashbackReversalId"], data["merchantCashbackId"])
+        if key not in self.reversals:
+            self.reversals[key] = dict(data, amount=_amount(data), status="ACCEPTED",
+                                       acceptedAt=int(time.time()))
+        return 202, REQUEST_ACCEPTED, None
+
+    def _get_reversal(self, data, reversal_id, merchant_cashback_id):
+        reversal = self.reversals.get((reversal_id, merchant_cashback_id))
+        if reversal is None:
+            raise _not_found("RESOURCE_NOT_FOUND", "00200001", "Cashback reversal not found")
+        return 200, SUCCESS, self._settled(reversal)
+
+    def authorize_user(self, user_authorization_id, scopes=("direct_debit",)):
+        """
+        Registers a linked user; unknown users are linked on first use
+        """
+        with self._lock:
+            now = int(time.time())
+            return self.users.setdefault(user_authorization_id, {
+                "userAuthorizationId": user_authorization_id, "referenceIds": [],
+                "status": "ACTIVE", "scopes": list(scopes),
+                "issuedAt": now, "expireAt": now + 365 * 86400})
+
+    def _get_user(self, data):
+        _require(data, "userAuthorizationId")
+        user = self.users.get(data["userAuthorizationId"]) or \
+            self.authorize_user(data["userAuthorizationId"])
+        return 200, SUCCESS, user
+
+    def _unlink_user(self, data, user_authorization_id):
+        user = self.authorize_user(user_authorization_id)
+        user["status"] = "INACTIVE"
+        return 200, SUCCESS, None
+
+    def _create_session(self, data):
+        _require(data, "scopes", "nonce", "redirectUrl", "referenceId")
+        return 201, SUCCESS, {"linkQRCodeURL": "https://stg-www.sandbox.paypay.ne.jp/link/{}".format(
+            data["nonce"])}
+
+    # front ends
+
+    def session(self):
+        """
+        Returns a requests.Session answered by the simulator in process
+        """
+        session = requests.Session()
+        adapter = SimulatorAdapter(self)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def transport(self):
+        """
+        Returns a transports.InMemoryTransport answered by the simulator
+        """
+        from .transports import InMemoryTransport
+        return InMemoryTransport(self.handle)
+
+    def async_transport(self):
+        """
+        Returns a transports.AsyncInMemoryTransport for AsyncClient
+        """
+        from .transports import AsyncInMemoryTransport
+        return AsyncInMemoryTransport(self.handle_async)
+
+    def client(self, **options):
+        """
+        Returns a Client talking to the simulator in process
+        """
+        from .client import Client
+        options.setdefault('transport', self.transport())
+        return Client(auth=next(iter(self.credentials.items())), **options)
+
+    def httpx_transport(self):
+        """
+        Returns an httpx.MockTransport for httpx.AsyncClient sessions
+        """
+        import httpx
+
+        async def handler(request):
+            status, headers, body = await self.handle_async(
+                request.method, request.url.path, request.headers,
+                await request.aread(), request.url.query.decode("ascii"))
+            return httpx.Response(status, headers=headers, content=body)
+        return httpx.MockTransport(handler)
+
+    def async_client(self, **options):
+        """
+        Returns an AsyncClient talking to the simulator in process
+        """
+        from .async_client import AsyncClient
+        options.setdefault('transport', self.async_transport())
+        return AsyncClient(auth=next(iter(self.credentials.items())), **options)
+
+    def serve(self, host="127.0.0.1", port=0):
+        """
+        Starts serving the simulator over HTTP on a background thread and
+        returns the SimulatorServer
+        """
+        return SimulatorServer(self, host, port)
+
+
+class SimulatorAdapter(BaseAdapter):
+    """requests transport adapter answering from a Simulator"""
+
+    def __init__(self, simulator):
+        super(SimulatorAdapter, self).__init__()
+        self.simulator = simulator
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        status, headers, body = self.simulator.handle(
+            request.method, url.path, request.headers, request.body, url.query)
+        response = requests.Response()
+        response.status_code = status
+        response.reason = _REASONS.get(status, "")
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are separate writes on kept-alive connections
+    disable_nagle_algorithm = True
+
+    def _handle(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        status, headers, payload = self.server.simulator.handle(
+            self.command, url.path, dict(self.headers.items()), body, url.query)
+        self.send_response(status, _REASONS.get(status))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+
+    do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = do_HEAD = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """Local HTTP server of a Simulator, use url as the client base_url"""
+    daemon_threads = True
+
+    def __init__(self, simulator, host="127.0.0.1", port=0):
+        super(SimulatorServer, self).__init__((host, port), _Handler)
+        self.simulator = simulator
+        self.url = "http://{}:{}".format(*self.server_address[:2])
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def handle_error(self, request, client_address):
+        # clients hanging up after a timeout are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super(SimulatorServer, self).handle_error(request, client_address)
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline PayPay OPA API simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of requests answered with a 500")
+    parser.add_argument("--auto-pay-after", type=float, default=None,
+                        help="seconds after which QR code payments complete")
+    args = parser.parse_args(argv)
+    simulator = Simulator(latency=args.latency, error_rate=args.error_rate,
+                          auto_pay_after=args.auto_pay_after)
+    server = SimulatorServer(simulator, args.host, args.port)
+    api_key, api_secret = next(iter(simulator.credentials.items()))
+    print("Simulating PayPay at {} (API key {!r}, secret {!r})".format(
+        server.url, api_key, api_secret))
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
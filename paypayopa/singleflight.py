@@ -0,0 +1,127 @@
+import threading
+from collections import Counter
+
+from . import timeouts
+from .errors import DeadlineExceeded
+
+
+def copy_json(value):
+    """
+    Returns a copy of a decoded JSON value sharing no dict or list
+    """
+    if isinstance(value, dict):
+        return {key: copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_json(item) for item in value]
+    return value
+
+
+class _Call(object):
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Flight(object):
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """Shares one in-flight call between concurrent identical requests
+
+    The first caller of a key runs the call; callers arriving while it is
+    in flight wait for it and get a copy of its result (see copy_json) or
+    the same exception, or raise errors.DeadlineExceeded when their
+    deadline passes first. A call may pass its own copy function. Keys are tuples starting with the api_id, which
+    the counters are grouped by.
+    """
+
+    def __init__(self, copy=copy_json):
+        self.copy = copy
+        self._calls = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def do(self, key, fn, copy=None):
+        """
+        Runs fn() unless a call of key is in flight, and returns its result
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._counters[(key[0], 'calls')] += 1
+            else:
+                self._counters[(key[0], 'coalesced')] += 1
+        if not leader:
+            if not call.event.wait(timeouts.remaining()):
+                raise DeadlineExceeded(key[0])
+            if call.error is not None:
+                raise call.error
+            return (copy or self.copy)(call.result)
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key, fn, copy=None):
+        """
+        Asyncio counterpart of do for a coroutine function. The call runs
+        in its own task, so a caller cancelled while waiting does not
+        cancel it for the others; it is cancelled once no caller waits.
+        """
+        import asyncio
+        flight = self._futures.get(key)
+        if flight is None:
+            flight = self._futures[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda task: self._forget(key, flight))
+            event = 'calls'
+        else:
+            event = 'coalesced'
+        with self._lock:
+            self._counters[(key[0], event)] += 1
+        flight.waiters += 1
+        try:
+            left = timeouts.remaining()
+            if left is None:
+                result = await asyncio.shield(flight.task)
+            else:
+                try:
+                    result = await asyncio.wait_for(asyncio.shield(flight.task), max(left, 0))
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded(key[0])
+            return result if event == 'calls' else (copy or self.copy)(result)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key, flight):
+        if self._futures.get(key) is flight:
+            del self._futures[key]
+
+    def stats(self):
+        """
+        Returns {api_id: {"calls": sent, "coalesced": shared}}
+        """
+        stats = {}
+        with self._lock:
+            for (api_id, event), count in self._counters.items():
+                stats.setdefault(api_id, {'calls': 0, 'coalesced': 0})[event] = count
+        return stats
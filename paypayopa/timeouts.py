@@ -0,0 +1,136 @@
+"""Request timeouts and deadlines
+
+Timeouts bound each HTTP attempt. A deadline bounds a whole unit of work,
+such as a checkout, across every request, retry, poll and batch call made
+inside it:
+
+    with deadline(3.0):
+        client.Payment.create(payload)
+        client.Payment.get_payment_details(merchant_payment_id)
+
+Work that can no longer finish in time raises errors.DeadlineExceeded.
+Deadlines live in a context variable, so they follow asyncio tasks and
+the thread pools of the bulk and batch helpers.
+"""
+import contextlib
+import contextvars
+import time
+
+from .errors import DeadlineExceeded
+
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 30.0
+
+_deadline = contextvars.ContextVar('paypayopa_deadline', default=None)
+
+
+class Timeouts(object):
+    """Connect and read timeouts in seconds, per API_NAMES entry
+
+    overrides maps an api_id to its (connect, read) tuple, or to one
+    number used as the read timeout. None disables a timeout.
+    """
+
+    def __init__(self, connect=DEFAULT_CONNECT_TIMEOUT, read=DEFAULT_READ_TIMEOUT,
+                 overrides=None):
+        self.connect = connect
+        self.read = read
+        self.overrides = {api_id: self._pair(timeout)
+                          for api_id, timeout in (overrides or {}).items()}
+
+    def _pair(self, timeout):
+        if isinstance(timeout, (tuple, list)):
+            return tuple(timeout)
+        return self.connect, timeout
+
+    def get(self, api_id):
+        """
+        Returns the (connect, read) timeouts of an API
+        """
+        return self.overrides.get(api_id, (self.connect, self.read))
+
+
+def get_timeouts(timeout=None):
+    """
+    Resolves the timeout client option: a Timeouts instance, a read
+    timeout in seconds, a (connect, read) tuple, None for the defaults,
+    or False for no timeouts at all
+    """
+    if isinstance(timeout, Timeouts):
+        return timeout
+    if timeout is None:
+        return Timeouts()
+    if timeout is False:
+        return Timeouts(None, None)
+    if isinstance(timeout, (tuple, list)):
+        return Timeouts(*timeout)
+    return Timeouts(min(DEFAULT_CONNECT_TIMEOUT, timeout), timeout)
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    """
+    Sets a deadline seconds from now for the enclosed block; an earlier
+    deadline already in effect is kept
+    """
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None and current < expires:
+        expires = current
+    token = _deadline.set(expires)
+    try:
+        yield expires
+    finally:
+        _deadline.reset(token)
+
+
+@contextlib.contextmanager
+def deadline_at(expires):
+    """
+    Sets the time.monotonic() deadline expires (or none) for the enclosed
+    block, to carry a deadline into work scheduled elsewhere
+    """
+    token = _deadline.set(expires)
+    try:
+        yield expires
+    finally:
+        _deadline.reset(token)
+
+
+def current():
+    """
+    Returns the time.monotonic() deadline in effect, or None
+    """
+    return _deadline.get()
+
+
+def remaining():
+    """
+    Returns the seconds left before the deadline, or None without one
+    """
+    expires = _deadline.get()
+    if expires is None:
+        return None
+    return expires - time.monotonic()
+
+
+def check(api_id=None, needed=0.0):
+    """
+    Raises DeadlineExceeded unless more than needed seconds are left
+    """
+    left = remaining()
+    if left is not None and left <= needed:
+        raise DeadlineExceeded(api_id)
+
+
+def clamp(timeouts, api_id=None):
+    """
+    Returns (connect, read) timeouts shortened to the time left before the
+    deadline, or raises DeadlineExceeded when none is left
+    """
+    left = remaining()
+    if left is None:
+        return timeouts
+    if left <= 0:
+        raise DeadlineExceeded(api_id)
+    return tuple(left if timeout is None else min(timeout, left) for timeout in timeouts)
@@ -0,0 +1,407 @@
+"""HTTP stacks the clients send signed requests over
+
+A transport has one method, request(method, url, headers, data=None,
+params=None, timeout=None), taking the upper case HTTP method, the
+absolute url, the signed headers, the encoded body or query parameters,
+and a timeout in seconds or a (connect, read) tuple. It returns a response with status_code,
+headers, content and elapsed. Transports own their connection pools;
+errors lists the exceptions worth retrying. Async transports implement
+the same methods as coroutines.
+"""
+import datetime
+import socket
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 32
+WARM_UP_TIMEOUT = 5
+
+
+def _keepalive_socket_options(idle=None, interval=None, count=None):
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    # TCP keep-alive tuning knobs are platform specific
+    for name, value in (('TCP_KEEPIDLE', idle),
+                        ('TCP_KEEPINTVL', interval),
+                        ('TCP_KEEPCNT', count)):
+        if value is not None and hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+def socket_options(tcp_keepalive):
+    """
+    Returns urllib3 socket options enabling TCP keep-alive, tuned by the
+    idle, interval and count keys of tcp_keepalive (or True)
+    """
+    from urllib3.connection import HTTPConnection
+    if tcp_keepalive is True:
+        tcp_keepalive = {}
+    return HTTPConnection.default_socket_options + _keepalive_socket_options(**tcp_keepalive)
+
+
+def pool_manager_stats(pool_manager):
+    """
+    Returns the connection usage of every host pool of a urllib3.PoolManager
+    """
+    stats = {}
+    pools = pool_manager.pools
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        stats["{}://{}:{}".format(pool.scheme, pool.host, pool.port)] = {
+            'maxsize': pool.pool.maxsize,
+            'idle': idle,
+            'connections_opened': pool.num_connections,
+            'requests': pool.num_requests,
+        }
+    return stats
+
+
+class Headers(dict):
+    """Case-insensitive response headers"""
+
+    def __init__(self, headers=()):
+        super(Headers, self).__init__()
+        for name, value in dict(headers).items():
+            self[name] = value
+
+    def __setitem__(self, name, value):
+        super(Headers, self).__setitem__(name.lower(), value)
+
+    def __getitem__(self, name):
+        return super(Headers, self).__getitem__(name.lower())
+
+    def __contains__(self, name):
+        return super(Headers, self).__contains__(name.lower())
+
+    def get(self, name, default=None):
+        return super(Headers, self).get(name.lower(), default)
+
+
+class Response(object):
+    """Response of the transports not built on requests or httpx"""
+    __slots__ = ('status_code', 'headers', 'content', 'elapsed')
+
+    def __init__(self, status_code, headers, content, elapsed=0.0):
+        self.status_code = status_code
+        self.headers = Headers(headers)
+        self.content = content
+        self.elapsed = datetime.timedelta(seconds=elapsed)
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+
+def _url(url, params):
+    if not params:
+        return url
+    return "{}{}{}".format(url, '&' if '?' in url else '?', urlencode(params))
+
+
+class Transport(object):
+    """Blocking transport base class"""
+    errors = ()
+
+    def request(self, method, url, headers, data=None, params=None, timeout=None):
+        raise NotImplementedError
+
+    def warm_up(self, url):
+        """
+        Establishes a pooled connection (and TLS session) to url
+        """
+        try:
+            self.request('HEAD', url, {}, timeout=WARM_UP_TIMEOUT)
+        except self.errors:
+            pass
+
+    def pool_stats(self):
+        """
+        Returns per host connection pool statistics
+        """
+        return {}
+
+    def close(self):
+        pass
+
+
+class RequestsTransport(Transport):
+    """Transport over a requests.Session
+
+    When no session is given a pooled one is created from the
+    pool_connections, pool_maxsize, pool_block, keep_alive and
+    tcp_keepalive options, see adapters.new_session.
+    """
+
+    def __init__(self, session=None, **options):
+        import requests
+        if session is None:
+            from .adapters import new_session
+            session = new_session(**options)
+        self.session = session
+        self.errors = (requests.ConnectionError, requests.Timeout)
+
+    def request(self, method, url, headers, data=None, params=None, timeout=None):
+        return self.session.request(method, url, headers=headers, data=data, params=params,
+                                    timeout=timeout)
+
+    def pool_stats(self):
+        from .adapters import pool_stats
+        return pool_stats(self.session)
+
+    def close(self):
+        self.session.close()
+
+
+class Urllib3Transport(Transport):
+    """Transport over a urllib3.PoolManager, skipping the requests layer
+
+    Takes the same pool options as RequestsTransport.
+    """
+
+    def __init__(self, pool_manager=None, **options):
+        import urllib3
+        from urllib3.exceptions import (MaxRetryError, NewConnectionError, ProtocolError,
+                                        SSLError, TimeoutError)
+        if pool_manager is None:
+            pool_options = {}
+            if options.get('tcp_keepalive') is not None:
+                pool_options['socket_options'] = socket_options(options['tcp_keepalive'])
+            pool_manager = urllib3.PoolManager(
+                num_pools=options.get('pool_connections', DEFAULT_POOL_CONNECTIONS),
+                maxsize=options.get('pool_maxsize', DEFAULT_POOL_MAXSIZE),
+                block=options.get('pool_block', False),
+                retries=False,
+                **pool_options)
+        self.pool_manager = pool_manager
+        self.keep_alive = options.get('keep_alive', True)
+        self.errors = (NewConnectionError, ProtocolError, SSLError, TimeoutError, MaxRetryError)
+
+    def request(self, method, url, headers, data=None, params=None, timeout=None):
+        if not self.keep_alive:
+            headers = dict(headers, Connection='close')
+        started = time.perf_counter()
+        response = self.pool_manager.urlopen(method, _url(url, params), body=data,
+                                             headers=headers, redirect=False,
+                                             timeout=self._timeout(timeout))
+        return Response(response.status, response.headers, response.data,
+                        time.perf_counter() - started)
+
+    @staticmethod
+    def _timeout(timeout):
+        import urllib3
+        if timeout is None:
+            return urllib3.Timeout.DEFAULT_TIMEOUT
+        if isinstance(timeout, tuple):
+            return urllib3.Timeout(connect=timeout[0], read=timeout[1])
+        return timeout
+
+    def pool_stats(self):
+        return pool_manager_stats(self.pool_manager)
+
+    def close(self):
+        self.pool_manager.clear()
+
+
+def _httpx_limits(options):
+    import httpx
+    return httpx.Limits(
+        max_connections=options.get('max_connections', 100),
+        max_keepalive_connections=options.get('max_keepalive_connections', 20),
+        keepalive_expiry=options.get('keepalive_expiry', 5.0))
+
+
+def _import_httpx():
+    try:
+        import httpx
+    except ImportError:
+        raise ImportError("The httpx transport requires httpx. "
+                          "Install it with `pip install paypayopa[async]`")
+    return httpx
+
+
+def _httpx_timeout(timeout):
+    # httpx reads timeout=None as no timeout at all
+    if timeout is None:
+        return {}
+    if isinstance(timeout, tuple):
+        import httpx
+        connect, read = timeout
+        return {'timeout': httpx.Timeout(connect=connect, read=read, write=read, pool=connect)}
+    return {'timeout': timeout}
+
+
+def _httpx_pool_stats(client):
+    stats = {}
+    pool = getattr(getattr(client, '_transport', None), '_pool', None)
+    for conn in getattr(pool, 'connections', []):
+        origin = str(conn._origin) if hasattr(conn, '_origin') else repr(conn)
+        host = stats.setdefault(origin, {'connections': 0, 'idle': 0})
+        host['connections'] += 1
+        if conn.is_idle():
+            host['idle'] += 1
+    return stats
+
+
+class HttpxTransport(Transport):
+    """Transport over a blocking httpx.Client
+
+    When no client is given a pooled one is created from the
+    max_connections, max_keepalive_connections, keepalive_expiry and
+    http2 options.
+    """
+
+    def __init__(self, client=None, **options):
+        httpx = _import_httpx()
+        if client is None:
+            client = httpx.Client(limits=_httpx_limits(options),
+                                  http2=options.get('http2', False))
+        self.session = client
+        self.errors = (httpx.TransportError,)
+
+    def request(self, method, url, headers, data=None, params=None, timeout=None):
+        return self.session.request(method, url, headers=headers, content=data, params=params,
+                                    **_httpx_timeout(timeout))
+
+    def pool_stats(self):
+        return _httpx_pool_stats(self.session)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHttpxTransport(object):
+    """Transport over an httpx.AsyncClient, the AsyncClient default"""
+
+    def __init__(self, client=None, **options):
+        httpx = _import_httpx()
+        if client is None:
+            client = httpx.AsyncClient(limits=_httpx_limits(options),
+                                       http2=options.get('http2', False))
+        self.session = client
+        self.errors = (httpx.TransportError,)
+
+    async def request(self, method, url, headers, data=None, params=None, timeout=None):
+        return await self.session.request(method, url, headers=headers, content=data,
+                                          params=params, **_httpx_timeout(timeout))
+
+    async def warm_up(self, url):
+        try:
+            await self.request('HEAD', url, {}, timeout=WARM_UP_TIMEOUT)
+        except self.errors:
+            pass
+
+    def pool_stats(self):
+        return _httpx_pool_stats(self.session)
+
+    async def aclose(self):
+        await self.session.aclose()
+
+
+class InMemoryTransport(Transport):
+    """Transport answering from a function, for tests
+
+    handler(method, path, headers, body, query) returns a (status,
+    headers, body bytes) tuple, like simulator.Simulator.handle.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def request(self, method, url, headers, data=None, params=None, timeout=None):
+        started = time.perf_counter()
+        url = urlsplit(_url(url, params))
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        status, response_headers, content = self.handler(method, url.path, headers,
+                                                         data or b"", url.query)
+        return Response(status, response_headers, content, time.perf_counter() - started)
+
+
+class AsyncInMemoryTransport(object):
+    """InMemoryTransport for AsyncClient, with a coroutine handler"""
+    errors = ()
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    async def request(self, method, url, headers, data=None, params=None, timeout=None):
+        started = time.perf_counter()
+        url = urlsplit(_url(url, params))
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        status, response_headers, content = await self.handler(method, url.path, headers,
+                                                               data or b"", url.query)
+        return Response(status, response_headers, content, time.perf_counter() - started)
+
+    async def warm_up(self, url):
+        pass
+
+    def pool_stats(self):
+        return {}
+
+    async def aclose(self):
+        pass
+
+
+TRANSPORTS = {
+    'requests': RequestsTransport,
+    'urllib3': Urllib3Transport,
+    'httpx': HttpxTransport,
+}
+
+ASYNC_TRANSPORTS = {
+    'httpx': AsyncHttpxTransport,
+}
+
+# transport name -> module and class of the session it wraps
+SESSION_TYPES = {
+    'requests': ('requests', 'Session'),
+    'urllib3': ('urllib3', 'PoolManager'),
+    'httpx': ('httpx', 'Client'),
+}
+
+ASYNC_SESSION_TYPES = {
+    'httpx': ('httpx', 'AsyncClient'),
+}
+
+
+def _check_session(session, transport, asynchronous=False):
+    """
+    Raises TypeError when session is the session of another HTTP library
+    than the named transport wraps
+    """
+    expected = (ASYNC_SESSION_TYPES if asynchronous else SESSION_TYPES)[transport]
+    for module_name, class_name in set(SESSION_TYPES.values()) | set(ASYNC_SESSION_TYPES.values()):
+        # a library that was never imported cannot have made the session
+        klass = getattr(sys.modules.get(module_name), class_name, None)
+        if (module_name, class_name) != expected and klass is not None and \
+                isinstance(session, klass):
+            raise TypeError("The {} transport takes a {}.{} session, not a {}.{}".format(
+                transport, expected[0], expected[1], module_name, class_name))
+
+
+def get_transport(session=None, asynchronous=False, **options):
+    """
+    Resolves the transport client option: a transport instance, or the
+    name of a built-in one ("requests" by default, "httpx" for
+    AsyncClient), created with the pool options. A session given to the
+    client is wrapped by the named transport.
+    """
+    transports = ASYNC_TRANSPORTS if asynchronous else TRANSPORTS
+    transport = options.get('transport')
+    if transport is None:
+        transport = 'httpx' if asynchronous else 'requests'
+    if not isinstance(transport, str):
+        return transport
+    if transport not in transports:
+        raise ValueError("Unknown transport {!r}, expected one of {}".format(
+            transport, ", ".join(transports)))
+    if session is not None:
+        _check_session(session, transport, asynchronous)
+        return transports[transport](session, **options)
+    return transports[transport](**options)
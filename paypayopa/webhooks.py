@@ -0,0 +1,309 @@
+import asyncio
+import inspect
+import logging
+import threading
+from collections import OrderedDict
+
+from . import codec as _codec
+from .errors import SignatureVerificationError
+from .jwt_codec import JwtCodec
+from .objects.notification import TransactionNotification, UserAuthorizationNotification
+
+logger = logging.getLogger(__name__)
+
+# notification_type of a JSON body -> notification class
+NOTIFICATION_TYPES = {
+    "Transaction": TransactionNotification,
+}
+
+
+class WebhookError(ValueError):
+    """Notification body that cannot be parsed"""
+
+
+class LRUSet(object):
+    """Thread-safe set remembering the last maxsize keys added"""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        """
+        Adds key and returns True, or returns False when it is present
+        """
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                return False
+            self._keys[key] = None
+            if len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+            return True
+
+    def discard(self, key):
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class ApiVerifier(object):
+    """Confirms a transaction notification against get_payment_details
+
+    PayPay does not sign transaction notifications, so their state is
+    checked with a signed API call before handlers run. With an
+    async_client.AsyncClient the verifier is asynchronous: it returns an
+    awaitable, and notifications are received with handle_async or asgi.
+    """
+
+    def __init__(self, client):
+        from .async_client import AsyncClient
+        self.client = client
+        self.asynchronous = isinstance(client, AsyncClient)
+
+    def __call__(self, notification):
+        if not isinstance(notification, TransactionNotification):
+            return True
+        # a cached read may hold a state the notification moved past
+        response = self.client.Payment.get_payment_details(notification.merchant_order_id,
+                                                           cache=False)
+        if self.asynchronous:
+            return self._confirm_async(response, notification)
+        return self._confirm(response, notification)
+
+    @staticmethod
+    def _confirm(response, notification):
+        return response is not None and response.data is not None and \
+            response.data.status == notification.state
+
+    async def _confirm_async(self, response, notification):
+        return self._confirm(await response, notification)
+
+
+def _is_async(verifier):
+    return (getattr(verifier, "asynchronous", False) or
+            inspect.iscoroutinefunction(verifier) or
+            inspect.iscoroutinefunction(getattr(verifier, "__call__", None)))
+
+
+class WebhookReceiver(object):
+    """Parses, verifies, deduplicates and dispatches PayPay notifications
+
+    JSON notifications are decoded into the class of their
+    notification_type (see NOTIFICATION_TYPES). Account link results
+    arrive as HS256 JWTs and are verified by a jwt_codec.JwtCodec of the
+    API secret. PayPay does not sign transaction notifications, so a
+    verifier is required: it is called with every notification and
+    rejects it by returning False. Given a client instead, ApiVerifier
+    checks transaction states through the API. verify=False accepts
+    notifications unverified, and is logged as a warning. Notifications
+    seen in the last dedupe_size are acknowledged without being
+    dispatched again.
+
+    handle() is framework agnostic; wsgi and asgi adapt it to those
+    interfaces. handle_async() awaits asynchronous verifiers and runs
+    blocking ones in a thread, so asgi does not block the event loop.
+    """
+
+    def __init__(self, secret=None, client_id=None, verifier=None, client=None,
+                 verify=True, dedupe_size=10000, json_codec=None):
+        self._jwt = JwtCodec(client_id, secret) if secret else None
+        if verifier is None and client is not None:
+            verifier = ApiVerifier(client)
+        if not verify:
+            logger.warning("WebhookReceiver accepts notifications without verifying them")
+        elif verifier is None:
+            raise ValueError("A verifier or client is required to verify notifications, "
+                             "pass verify=False to accept them unverified")
+        self.verifier = verifier
+        self._unverified = not verify
+        self.seen = LRUSet(dedupe_size)
+        self.codec = _codec.get_codec(json_codec)
+        self._handlers = {}
+
+    def on(self, notification_class):
+        """
+        Decorator registering a handler for a notification class; a
+        handler of a base class (or object) receives its subclasses
+        """
+        def register(handler):
+            self._handlers.setdefault(notification_class, []).append(handler)
+            return handler
+        return register
+
+    def parse(self, body, content_type=None):
+        """
+        Decodes a notification body, checking the signature of JWTs
+        """
+        if isinstance(body, str):
+            body = body.encode()
+        body = body.strip()
+        if (content_type or "").startswith("application/jwt") or body[:3] == b"eyJ":
+            notification = UserAuthorizationNotification.from_dict(self._decode_jwt(body))
+        else:
+            try:
+                payload = self.codec.loads(body)
+            except ValueError as e:
+                raise WebhookError("Notification body is not JSON: {}".format(e))
+            if not isinstance(payload, dict):
+                raise WebhookError("Notification body is not a JSON object")
+            klass = NOTIFICATION_TYPES.get(payload.get("notification_type"))
+            if klass is None:
+                raise WebhookError("Unknown notification_type {!r}".format(
+                    payload.get("notification_type")))
+            notification = klass.from_dict(payload)
+        return notification
+
+    def verify(self, notification):
+        if self.verifier is None:
+            if self._unverified:
+                return
+            raise SignatureVerificationError("No verifier is configured")
+        if _is_async(self.verifier):
+            raise TypeError("The verifier is asynchronous, receive notifications "
+                            "with handle_async or asgi")
+        if not self.verifier(notification):
+            raise SignatureVerificationError("Notification could not be verified")
+
+    async def verify_async(self, notification):
+        """
+        verify() awaiting an asynchronous verifier, or running a blocking
+        one in the default executor
+        """
+        if self.verifier is None:
+            return self.verify(notification)
+        if _is_async(self.verifier):
+            verified = self.verifier(notification)
+            if inspect.isawaitable(verified):
+                verified = await verified
+        else:
+            loop = asyncio.get_running_loop()
+            verified = await loop.run_in_executor(None, self.verifier, notification)
+        if not verified:
+            raise SignatureVerificationError("Notification could not be verified")
+
+    def _decode_jwt(self, token):
+        if self._jwt is None:
+            raise SignatureVerificationError("A secret is required to verify JWT notifications")
+        return self._jwt.decode_claims(token)
+
+    def dispatch(self, notification):
+        """
+        Calls the handlers registered for the notification's class and
+        its bases, returning how many ran
+        """
+        count = 0
+        for klass in type(notification).__mro__:
+            for handler in self._handlers.get(klass, ()):
+                handler(notification)
+                count += 1
+        return count
+
+    def handle(self, body, content_type=None):
+        """
+        Processes one notification and returns the HTTP (status, body)
+        to answer PayPay with: 200 when handled or a duplicate, 400 for
+        unparseable bodies, 401 when verification fails and 500 when a
+        handler fails, so that PayPay delivers it again
+        """
+        try:
+            notification = self._parse_new(body, content_type)
+            if notification is not None:
+                # verified before being remembered, so a forged
+                # notification cannot shadow the genuine one
+                self.verify(notification)
+        except Exception as e:
+            return self._rejected(e)
+        return self._deliver(notification)
+
+    async def handle_async(self, body, content_type=None):
+        """
+        handle() verifying the notification with verify_async
+        """
+        try:
+            notification = self._parse_new(body, content_type)
+            if notification is not None:
+                await self.verify_async(notification)
+        except Exception as e:
+            return self._rejected(e)
+        return self._deliver(notification)
+
+    def _parse_new(self, body, content_type):
+        """
+        Parses a notification, returning None for one already handled
+        """
+        notification = self.parse(body, content_type)
+        if notification.notification_id in self.seen:
+            return None
+        return notification
+
+    @staticmethod
+    def _rejected(error):
+        if isinstance(error, WebhookError):
+            logger.warning("Rejected notification: %s", error)
+            return 400, b'{"status":"invalid"}'
+        if isinstance(error, SignatureVerificationError):
+            logger.warning("Rejected notification: %s", error)
+            return 401, b'{"status":"unverified"}'
+        logger.error("Notification could not be processed", exc_info=error)
+        return 500, b'{"status":"error"}'
+
+    def _deliver(self, notification):
+        if notification is None:
+            return 200, b'{"status":"duplicate"}'
+        notification_id = notification.notification_id
+        if not self.seen.add(notification_id):
+            return 200, b'{"status":"duplicate"}'
+        try:
+            self.dispatch(notification)
+        except Exception:
+            self.seen.discard(notification_id)
+            logger.exception("Notification handler failed for %s", notification_id)
+            return 500, b'{"status":"error"}'
+        return 200, b'{"status":"ok"}'
+
+    def wsgi(self, environ, start_response):
+        """
+        WSGI application receiving notifications
+        """
+        try:
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        body = environ["wsgi.input"].read(length) if length else b""
+        status, payload = self.handle(body, environ.get("CONTENT_TYPE"))
+        start_response("{} {}".format(status, _REASONS[status]),
+                       [("Content-Type", "application/json"),
+                        ("Content-Length", str(len(payload)))])
+        return [payload]
+
+    async def asgi(self, scope, receive, send):
+        """
+        ASGI application receiving notifications
+        """
+        if scope["type"] != "http":
+            return
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        content_type = None
+        for name, value in scope.get("headers", ()):
+            if name == b"content-type":
+                content_type = value.decode("latin-1")
+        status, payload = await self.handle_async(b"".join(chunks), content_type)
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(payload)).encode())]})
+        await send({"type": "http.response.body", "body": payload})
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 500: "Internal Server Error"}
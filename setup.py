@@ -28,16 +28,20 @@ setup(
     },
     install_requires=[
         "requests >= 2.32.3",
-        "pyjwt >= 2.8.0",
-        "dataclasses-json >= 0.6.7"],
+        "pyjwt >= 2.8.0"],
     extras_require={
-        'test': ['responses'],
+        'async': ['httpx'],
+        'orjson': ['orjson'],
+        'prometheus': ['prometheus-client'],
+        'opentelemetry': ['opentelemetry-api'],
+        'test': ['responses', 'httpx'],
     },
     include_package_data=True,
     package_dir={'paypayopa': 'paypayopa',
+                 'paypayopa.objects': 'paypayopa/objects',
                  'paypayopa.resources': 'paypayopa/resources',
                  'paypayopa.constants': 'paypayopa/constants'},
-    packages=['paypayopa', 'paypayopa.resources', 'paypayopa.constants'],
+    packages=['paypayopa', 'paypayopa.objects', 'paypayopa.resources', 'paypayopa.constants'],
     keywords='paypay payment gateway japan',
     classifiers=[
         "Intended Audience :: Developers",
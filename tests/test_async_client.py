@@ -0,0 +1,131 @@
+import asyncio
+import json
+import unittest
+
+import httpx
+
+import paypayopa
+from paypayopa.objects.payment import PaymentAPIResponse
+
+from .helpers import mock_file
+
+
+class TestAsyncClient(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.requests = []
+
+    def client_for(self, result, status=200, **options):
+        def handler(request):
+            self.requests.append(request)
+            return httpx.Response(status, content=json.dumps(result))
+        session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return paypayopa.AsyncClient(session=session,
+                                     auth=('key_id', 'key_secret'), **options)
+
+    async def test_cancel_payment(self):
+        """Test cancel payment through the async client."""
+        result = mock_file('cancel_payment')
+        async with self.client_for(result) as client:
+            response = await client.Payment.cancel_payment('fake_payment_id')
+        self.assertIsInstance(response, PaymentAPIResponse)
+        self.assertEqual(response.result_info, result['resultInfo'])
+        request = self.requests[0]
+        self.assertEqual(request.method, 'DELETE')
+        self.assertEqual(
+            str(request.url),
+            'https://stg-api.sandbox.paypay.ne.jp/v2/payments/fake_payment_id')
+        self.assertTrue(
+            request.headers['Authorization'].startswith('hmac OPA-Auth:key_id:'))
+
+    async def test_signs_request_body(self):
+        """Test the POST body is sent and hashed into the auth header."""
+        init = mock_file('give_cashback_payload')
+        result = mock_file('give_cashback_response')
+        async with self.client_for(result) as client:
+            response = await client.Cashback.give_cashback(init)
+        self.assertEqual(response, result)
+        request = self.requests[0]
+        self.assertEqual(json.loads(request.content), init)
+        self.assertNotEqual(request.headers['Authorization'].split(':')[-1],
+                            'empty')
+
+    async def test_concurrent_requests(self):
+        """Test many requests share one event loop."""
+        result = mock_file('cancel_payment')
+        async with self.client_for(result) as client:
+            responses = await asyncio.gather(*[
+                client.Payment.cancel_payment('id_{}'.format(i))
+                for i in range(50)])
+        self.assertEqual(len(responses), 50)
+        self.assertEqual(len(self.requests), 50)
+
+    async def test_validation(self):
+        """Test request validation is shared with the blocking client."""
+        async with self.client_for({}) as client:
+            with self.assertRaises(ValueError):
+                await client.Cashback.give_cashback({"amount": {}})
+        self.assertEqual(self.requests, [])
+
+    async def test_response_cache(self):
+        """Test the response cache serves repeated async reads."""
+        result = mock_file('get_payment_details_completed')
+        async with self.client_for(result, cache=True) as client:
+            first = await client.Payment.get_payment_details('fake_payment_id')
+            second = await client.Payment.get_payment_details('fake_payment_id')
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_concurrent_reads_share_a_request(self):
+        """Test concurrent identical async GETs send a single request."""
+        result = mock_file('get_payment_details_completed')
+
+        async def handler(request):
+            self.requests.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, content=json.dumps(result))
+        session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with paypayopa.AsyncClient(session=session,
+                                         auth=('key_id', 'key_secret')) as client:
+            responses = await asyncio.gather(*[
+                client.Payment.get_payment_details('fake_payment_id')
+                for _ in range(10)])
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(len(responses), 10)
+        stats = client.single_flight.stats()
+        self.assertEqual(stats['v2_getPaymentDetail'], {'calls': 1, 'coalesced': 9})
+
+    async def test_cancelled_reader_does_not_cancel_others(self):
+        """Test cancelling one of the coalesced readers leaves the others alone."""
+        result = mock_file('get_payment_details_completed')
+        cancelled = []
+
+        async def handler(request):
+            self.requests.append(request)
+            try:
+                await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                cancelled.append(request)
+                raise
+            return httpx.Response(200, content=json.dumps(result))
+        session = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with paypayopa.AsyncClient(session=session,
+                                         auth=('key_id', 'key_secret')) as client:
+            leader = asyncio.ensure_future(client.Payment.get_payment_details('fake_payment_id'))
+            await asyncio.sleep(0.01)
+            follower = asyncio.ensure_future(
+                client.Payment.get_payment_details('fake_payment_id'))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            response = await follower
+            self.assertTrue(leader.cancelled())
+            self.assertEqual(response.data.merchant_payment_id,
+                             result['data']['merchantPaymentId'])
+
+            # with every reader gone the request is cancelled
+            lone = asyncio.ensure_future(client.Payment.get_payment_details('fake_payment_id'))
+            await asyncio.sleep(0.01)
+            lone.cancel()
+            await asyncio.sleep(0.01)
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(cancelled, self.requests[1:])
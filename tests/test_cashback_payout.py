@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+
+import responses
+
+from paypayopa.batch import CashbackPayout, Journal
+
+from .helpers import mock_file, ClientTestCase
+
+
+class TestCashbackPayout(ClientTestCase):
+
+    def setUp(self):
+        super(TestCashbackPayout, self).setUp()
+        self.cashback_url = '{}/cashback'.format(self.base_url)
+        fd, self.journal_path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        os.remove(self.journal_path)
+
+    def tearDown(self):
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def cashbacks(self, count):
+        for i in range(count):
+            data = mock_file('give_cashback_payload')
+            data['merchantCashbackId'] = 'cashback_{}'.format(i)
+            yield data
+
+    def add_details(self, cashback_id):
+        result = mock_file('check_cashback_detail_response')
+        result['data']['merchantCashbackId'] = cashback_id
+        responses.add(responses.GET, '{}/{}'.format(self.cashback_url, cashback_id),
+                      body=json.dumps(result))
+
+    @responses.activate
+    def test_run(self):
+        """Test payouts are sent once each and counted."""
+        responses.add(responses.POST, self.cashback_url,
+                      body=json.dumps(mock_file('give_cashback_response')))
+        payout = CashbackPayout(self.client, concurrency=4)
+        cashbacks = list(self.cashbacks(10)) + list(self.cashbacks(3))
+        results = list(payout.run(iter(cashbacks)))
+        self.assertEqual(sorted(result.key for result in results),
+                         sorted('cashback_{}'.format(i) for i in range(10)))
+        self.assertEqual(len(responses.calls), 10)
+        summary = payout.stats.summary()
+        self.assertEqual(summary['sent'], 10)
+        self.assertEqual(summary['succeeded'], 10)
+        self.assertEqual(summary['duplicates'], 3)
+        self.assertGreater(summary['throughput'], 0)
+        self.assertGreaterEqual(summary['max'], summary['p50'])
+
+    @responses.activate
+    def test_invalid_request(self):
+        """Test an invalid payout fails alone."""
+        responses.add(responses.POST, self.cashback_url,
+                      body=json.dumps(mock_file('give_cashback_response')))
+        cashbacks = list(self.cashbacks(2))
+        del cashbacks[1]['walletType']
+        results = {result.key: result
+                   for result in CashbackPayout(self.client).run(cashbacks)}
+        self.assertTrue(results['cashback_0'].ok)
+        self.assertIsInstance(results['cashback_1'].error, ValueError)
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_resume_and_verify(self):
+        """Test a resumed run skips journaled payouts and verifies them."""
+        with Journal(self.journal_path) as journal:
+            journal.record('cashback_0', 'done')
+            journal.record('cashback_1', 'started')
+        for i in range(3):
+            self.add_details('cashback_{}'.format(i))
+        responses.add(responses.POST, self.cashback_url,
+                      body=json.dumps(mock_file('give_cashback_response')))
+        payout = CashbackPayout(self.client, journal=self.journal_path)
+        results = {result.key: result for result in payout.run(self.cashbacks(3))}
+        self.assertTrue(results['cashback_0'].skipped)
+        self.assertTrue(results['cashback_1'].skipped)
+        self.assertFalse(results['cashback_2'].skipped)
+        posts = [call for call in responses.calls if call.request.method == 'POST']
+        self.assertEqual(len(posts), 1)
+        self.assertEqual(payout.stats.skipped, 2)
+
+        verified = list(payout.verify())
+        payout.journal.close()
+        self.assertEqual(len(verified), 3)
+        self.assertEqual(payout.stats.verified, {'SUCCESS': 3})
+        self.assertEqual(Journal(self.journal_path).counts(), {'verified': 3})
@@ -0,0 +1,160 @@
+import time
+import unittest
+
+from paypayopa.circuit import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                               CircuitBreakers)
+from paypayopa.constants.api_list import API_NAMES
+from paypayopa.errors import CircuitOpenError, MaintenanceError, ServerError
+from paypayopa.retry import RetryPolicy
+from paypayopa.simulator import Simulator
+from paypayopa.transports import InMemoryTransport
+
+
+class Outage(Exception):
+    pass
+
+
+class FlakyTransport(InMemoryTransport):
+    errors = (Outage,)
+
+    def __init__(self, handler):
+        super(FlakyTransport, self).__init__(handler)
+        self.down = False
+
+    def request(self, method, url, headers, data=None, params=None, timeout=None):
+        if self.down:
+            raise Outage(url)
+        return super(FlakyTransport, self).request(method, url, headers, data, params)
+
+
+def cashback(i):
+    return {"merchantCashbackId": "cashback_{}".format(i),
+            "userAuthorizationId": "user_1",
+            "amount": {"amount": 100, "currency": "JPY"},
+            "requestedAt": int(time.time()),
+            "walletType": "PREPAID"}
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = Simulator()
+        self.breakers = CircuitBreakers(min_requests=4, failure_rate=0.5, open_for=0.1)
+        self.client = self.simulator.client(circuit_breaker=self.breakers)
+
+    def trip(self):
+        self.simulator.inject(500, count=4, api_id=API_NAMES.GET_PAYMENT)
+        for _ in range(4):
+            with self.assertRaises(ServerError):
+                self.client.Payment.get_payment_details('order_1')
+
+    def test_opens_and_fails_fast(self):
+        """Test an open circuit raises without sending the request."""
+        self.trip()
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.client.Payment.get_payment_details('order_1')
+        self.assertEqual(raised.exception.api_id, API_NAMES.GET_PAYMENT)
+        self.assertGreater(raised.exception.retry_after, 0)
+        self.assertEqual(self.simulator.stats[API_NAMES.GET_PAYMENT], 4)
+
+    def test_failure_rate_below_threshold_stays_closed(self):
+        """Test occasional failures do not open the circuit."""
+        self.simulator.inject(500, count=1, api_id=API_NAMES.GET_PAYMENT)
+        with self.assertRaises(ServerError):
+            self.client.Payment.get_payment_details('order_1')
+        for _ in range(4):
+            self.client.Payment.get_payment_details('order_1')
+        self.assertEqual(self.breakers.get(API_NAMES.GET_PAYMENT, self.client.base_url).state,
+                         CLOSED)
+
+    def test_circuits_are_per_endpoint(self):
+        """Test a degraded API does not block the others."""
+        self.simulator.inject(503, count=4, api_id=API_NAMES.CREATE_CASHBACK_REQUEST)
+        for i in range(4):
+            with self.assertRaises(MaintenanceError):
+                self.client.Cashback.give_cashback(cashback(i))
+        with self.assertRaises(CircuitOpenError):
+            self.client.Cashback.give_cashback(cashback(5))
+        self.client.Payment.get_payment_details('order_1')
+
+    def test_half_open_probe_closes(self):
+        """Test a successful probe closes the circuit."""
+        self.trip()
+        time.sleep(0.1)
+        breaker = self.breakers.get(API_NAMES.GET_PAYMENT, self.client.base_url)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.client.Payment.get_payment_details('order_1')
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_half_open_probe_failure_reopens(self):
+        """Test a failed probe opens the circuit again."""
+        self.trip()
+        time.sleep(0.1)
+        self.simulator.inject(500, count=1, api_id=API_NAMES.GET_PAYMENT)
+        with self.assertRaises(ServerError):
+            self.client.Payment.get_payment_details('order_1')
+        with self.assertRaises(CircuitOpenError):
+            self.client.Payment.get_payment_details('order_1')
+
+    def test_half_open_admits_limited_probes(self):
+        """Test only half_open_probes requests are let through at once."""
+        breaker = CircuitBreaker(min_requests=1, open_for=0, half_open_probes=2)
+        breaker.record(breaker.acquire(), False)
+        first, second = breaker.acquire(), breaker.acquire()
+        with self.assertRaises(CircuitOpenError):
+            breaker.acquire()
+        breaker.record(first, True)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        breaker.record(second, True)
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_transport_errors_count_as_failures(self):
+        """Test connection errors and timeouts open the circuit."""
+        transport = FlakyTransport(self.simulator.handle)
+        client = self.simulator.client(transport=transport, circuit_breaker=self.breakers)
+        transport.down = True
+        for _ in range(4):
+            with self.assertRaises(Outage):
+                client.Payment.get_payment_details('order_1')
+        with self.assertRaises(CircuitOpenError):
+            client.Payment.get_payment_details('order_1')
+
+    def test_open_circuit_stops_retries(self):
+        """Test a request is not retried once its circuit opened."""
+        client = self.simulator.client(
+            circuit_breaker=self.breakers,
+            retry=RetryPolicy(max_attempts=10, backoff_base=0.001, jitter=False))
+        self.simulator.inject(503, count=10, api_id=API_NAMES.GET_PAYMENT)
+        with self.assertRaises(MaintenanceError):
+            client.Payment.get_payment_details('order_1')
+        self.assertEqual(self.simulator.stats[API_NAMES.GET_PAYMENT], 4)
+
+    def test_snapshot_and_state_changes(self):
+        """Test the breaker state is exposed for dashboards."""
+        changes = []
+        self.breakers.defaults['on_state_change'] = \
+            lambda breaker, old, new: changes.append((breaker.api_id, old, new))
+        self.trip()
+        snapshot = self.breakers.snapshot()[self.client.base_url][API_NAMES.GET_PAYMENT]
+        self.assertEqual(snapshot['state'], OPEN)
+        self.assertEqual((snapshot['requests'], snapshot['failures']), (4, 4))
+        self.assertEqual(snapshot['failure_rate'], 1.0)
+        self.assertEqual(changes, [(API_NAMES.GET_PAYMENT, CLOSED, OPEN)])
+        self.breakers.reset()
+        self.client.Payment.get_payment_details('order_1')
+
+
+class TestAsyncCircuitBreaker(unittest.IsolatedAsyncioTestCase):
+
+    async def test_opens_and_fails_fast(self):
+        """Test the AsyncClient fails fast on an open circuit."""
+        simulator = Simulator()
+        simulator.inject(500, count=2, api_id=API_NAMES.GET_PAYMENT)
+        breakers = CircuitBreakers(min_requests=2)
+        async with simulator.async_client(circuit_breaker=breakers) as client:
+            for _ in range(2):
+                with self.assertRaises(ServerError):
+                    await client.Payment.get_payment_details('order_1')
+            with self.assertRaises(CircuitOpenError):
+                await client.Payment.get_payment_details('order_1')
+        self.assertEqual(simulator.stats[API_NAMES.GET_PAYMENT], 2)
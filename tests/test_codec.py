@@ -0,0 +1,91 @@
+import json
+import unittest
+
+import responses
+
+import paypayopa
+from paypayopa.codec import JSONCodec, StdlibCodec, get_codec
+from paypayopa.objects.payment import PaymentAPIResponse, PaymentBody
+from paypayopa.signing import Signer
+
+from .helpers import mock_file, ClientTestCase
+
+
+class CountingCodec(StdlibCodec):
+
+    def __init__(self):
+        self.dumped = 0
+        self.loaded = 0
+
+    def dumps(self, obj):
+        self.dumped += 1
+        return super(CountingCodec, self).dumps(obj)
+
+    def loads(self, data):
+        self.loaded += 1
+        return super(CountingCodec, self).loads(data)
+
+
+class TestCodec(unittest.TestCase):
+
+    def test_codecs_round_trip(self):
+        """Test every installed codec round trips to bytes."""
+        payload = {"orderDescription": "ムーンケーキ", "redirectUrl": "https://a/b",
+                   "amount": {"amount": 1, "currency": "JPY"}}
+        for name in ("json", "orjson", "ujson"):
+            try:
+                codec = get_codec(name)
+            except ImportError:
+                continue
+            encoded = codec.dumps(payload)
+            self.assertIsInstance(encoded, bytes)
+            self.assertEqual(json.loads(encoded), payload)
+            self.assertEqual(codec.loads(encoded), payload)
+
+    def test_get_codec(self):
+        """Test codec resolution."""
+        self.assertIsInstance(get_codec(), JSONCodec)
+        codec = CountingCodec()
+        self.assertIs(get_codec(codec), codec)
+        with self.assertRaises(ValueError):
+            get_codec("yaml")
+
+
+class TestClientCodec(ClientTestCase):
+
+    def setUp(self):
+        super(TestClientCodec, self).setUp()
+        self.codec = CountingCodec()
+        self.client = paypayopa.Client(auth=('key_id', 'key_secret'),
+                                       json_codec=self.codec)
+
+    @responses.activate
+    def test_body_is_encoded_once(self):
+        """Test the signed bytes are the bytes sent on the wire."""
+        init = mock_file('give_cashback_payload')
+        result = mock_file('give_cashback_response')
+        responses.add(responses.POST, '{}/cashback'.format(self.base_url),
+                      status=200, body=json.dumps(result))
+        self.assertEqual(self.client.Cashback.give_cashback(init), result)
+        self.assertEqual(self.codec.dumped, 1)
+        self.assertEqual(self.codec.loaded, 1)
+        request = responses.calls[0].request
+        body_hash = request.headers['Authorization'].split(':')[-1]
+        self.assertEqual(body_hash, Signer('key_id', 'key_secret').body_hash(
+            "application/json;charset=UTF-8", request.body))
+        self.assertEqual(json.loads(request.body), init)
+
+    @responses.activate
+    def test_response_is_decoded_once(self):
+        """Test payment details are built from the decoded response."""
+        result = mock_file('get_payment_details_completed')
+        responses.add(responses.GET,
+                      '{}/payments/fake_merchant_payment_id'.format(self.base_url),
+                      status=200, body=json.dumps(result))
+        response = self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        self.assertIsInstance(response, PaymentAPIResponse)
+        self.assertIsInstance(response.data, PaymentBody)
+        self.assertEqual(response.data.status, 'COMPLETED')
+        self.assertEqual(response.data.refunds[0].amount.amount, 100)
+        self.assertEqual(response.result_info, result['resultInfo'])
+        self.assertEqual(self.codec.loaded, 1)
@@ -0,0 +1,69 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import paypayopa
+
+from .helpers import mock_file
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_DELETE(self):
+        body = json.dumps(mock_file('cancel_payment')).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = 'http://127.0.0.1:{}'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_pool_options(self):
+        """Test pool options are applied to the session adapters."""
+        client = paypayopa.Client(auth=('key_id', 'key_secret'),
+                                  pool_connections=4, pool_maxsize=64,
+                                  pool_block=True, tcp_keepalive=True)
+        adapter = client.session.get_adapter('https://api.paypay.ne.jp')
+        self.assertEqual(adapter._pool_connections, 4)
+        self.assertEqual(adapter._pool_maxsize, 64)
+        self.assertTrue(adapter._pool_block)
+        self.assertIn('socket_options', adapter.poolmanager.connection_pool_kw)
+
+    def test_connections_are_reused(self):
+        """Test keep-alive connections are reused and reported."""
+        client = paypayopa.Client(auth=('key_id', 'key_secret'),
+                                  base_url=self.base_url, warm_up=True)
+        for i in range(5):
+            client.Payment.cancel_payment('id_{}'.format(i))
+        stats = client.pool_stats()
+        host = stats['http://127.0.0.1:{}'.format(self.server.server_port)]
+        self.assertEqual(host['connections_opened'], 1)
+        self.assertEqual(host['requests'], 6)
+        self.assertEqual(host['idle'], 1)
+
+    def test_keep_alive_disabled(self):
+        """Test keep_alive=False asks the server to close connections."""
+        client = paypayopa.Client(auth=('key_id', 'key_secret'),
+                                  keep_alive=False)
+        self.assertEqual(client.session.headers['Connection'], 'close')
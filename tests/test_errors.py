@@ -0,0 +1,67 @@
+import json
+
+import responses
+
+from paypayopa import errors
+from paypayopa.constants.api_list import API_NAMES
+
+from .helpers import ClientTestCase
+
+
+class TestErrors(ClientTestCase):
+
+    def setUp(self):
+        super(TestErrors, self).setUp()
+        self.payment_url = '{}/payments/fake_merchant_payment_id'.format(self.base_url)
+
+    def error_for(self, status, body):
+        responses.add(responses.GET, self.payment_url, status=status, body=body)
+        with self.assertRaises(errors.PayPayError) as cm:
+            self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        return cm.exception
+
+    @responses.activate
+    def test_result_code(self):
+        """Test the resultInfo code selects the exception class."""
+        error = self.error_for(400, json.dumps({'resultInfo': {
+            'code': 'UNACCEPTABLE_OP', 'codeId': '00200013',
+            'message': 'Order cannot be refunded'}}))
+        self.assertIsInstance(error, errors.UnacceptableOpError)
+        self.assertIsInstance(error, errors.ClientError)
+        self.assertEqual(error.api_id, API_NAMES.GET_PAYMENT)
+        self.assertEqual(error.status, 400)
+        self.assertEqual(error.code, 'UNACCEPTABLE_OP')
+        self.assertEqual(error.code_id, '00200013')
+        self.assertIn('Order cannot be refunded', str(error))
+        self.assertIn('code_id=00200013', error.resolve_url)
+
+    @responses.activate
+    def test_unauthorized(self):
+        """Test 401 raises UnauthorizedError."""
+        error = self.error_for(401, json.dumps({'resultInfo': {
+            'code': 'UNAUTHORIZED', 'codeId': '08100016'}}))
+        self.assertIsInstance(error, errors.UnauthorizedError)
+        self.assertIsInstance(error, ValueError)
+
+    @responses.activate
+    def test_server_error(self):
+        """Test 5xx without a JSON body raises ServerError."""
+        error = self.error_for(502, '<html>Bad Gateway</html>')
+        self.assertIsInstance(error, errors.ServerError)
+        self.assertEqual(error.status, 502)
+        self.assertIsNone(error.code)
+
+    @responses.activate
+    def test_no_stdout(self):
+        """Test error responses are logged rather than printed."""
+        with self.assertLogs('paypayopa.client', 'DEBUG') as logs:
+            self.error_for(429, json.dumps({'resultInfo': {
+                'code': 'RATE_LIMIT', 'codeId': '08100998'}}))
+        self.assertIn('developer.paypay.ne.jp', logs.output[0])
+
+    def test_error_class(self):
+        """Test unknown codes fall back to the HTTP class."""
+        self.assertIs(errors.error_class(409, 'SOMETHING_NEW'), errors.ClientError)
+        self.assertIs(errors.error_class(500, 'TRANSACTION_FAILED'),
+                      errors.TransactionFailedError)
+        self.assertIs(errors.error_class(504), errors.ServerError)
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+import paypayopa
+from paypayopa.bulk import run_concurrent
+
+from .helpers import ClientTestCase
+
+
+class TestGetMany(ClientTestCase):
+
+    def setUp(self):
+        super(TestGetMany, self).setUp()
+        self.ids = ['fake_merchant_payment_id_{}'.format(i) for i in range(20)]
+
+    def fake_details(self, merchant_payment_id, **kwargs):
+        if merchant_payment_id.endswith('_3'):
+            raise ValueError("500 Server error")
+        return {'id': merchant_payment_id}
+
+    def test_get_many(self):
+        """Test every payment is fetched and failures are reported."""
+        with mock.patch.object(self.client.Payment, 'get_payment_details',
+                               side_effect=self.fake_details):
+            results = list(self.client.Payment.get_many(self.ids, concurrency=4))
+        self.assertEqual(sorted(r.key for r in results), sorted(self.ids))
+        failed = [r for r in results if not r.ok]
+        self.assertEqual([r.key for r in failed], ['fake_merchant_payment_id_3'])
+        self.assertIsInstance(failed[0].error, ValueError)
+        for result in results:
+            if result.ok:
+                self.assertEqual(result.response, {'id': result.key})
+
+    def test_get_many_ordered(self):
+        """Test ordered results follow the input order."""
+        with mock.patch.object(self.client.Payment, 'get_payment_details',
+                               side_effect=self.fake_details):
+            results = self.client.Payment.get_many(self.ids, concurrency=4,
+                                                   ordered=True)
+            self.assertEqual([r.key for r in results], self.ids)
+
+    def test_bounded_concurrency(self):
+        """Test no more than `concurrency` calls run at once."""
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def call(key):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.005)
+            with lock:
+                state['running'] -= 1
+            return key
+
+        results = list(run_concurrent(call, range(40), concurrency=3))
+        self.assertEqual(len(results), 40)
+        self.assertLessEqual(state['peak'], 3)
+
+    def test_rate(self):
+        """Test calls are spaced by the rate limit."""
+        start = time.monotonic()
+        list(run_concurrent(lambda key: key, range(6), concurrency=6, rate=50))
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+class TestAsyncGetMany(unittest.IsolatedAsyncioTestCase):
+
+    async def test_get_many(self):
+        """Test get_many streams results on the event loop."""
+        client = paypayopa.AsyncClient(session=mock.Mock(),
+                                       auth=('key_id', 'key_secret'))
+
+        async def details(merchant_payment_id, **kwargs):
+            await asyncio.sleep(0)
+            return {'id': merchant_payment_id}
+
+        ids = ['id_{}'.format(i) for i in range(10)]
+        with mock.patch.object(client.Payment, 'get_payment_details',
+                               side_effect=details):
+            results = [r async for r in client.Payment.get_many(
+                ids, concurrency=3, ordered=True)]
+        self.assertEqual([r.response['id'] for r in results], ids)
@@ -0,0 +1,176 @@
+import importlib.util
+import json
+import time
+import unittest
+
+import responses
+
+import paypayopa
+from paypayopa import timeouts
+from paypayopa.circuit import CircuitBreakers
+from paypayopa.constants.api_list import API_NAMES
+from paypayopa.errors import CircuitOpenError, DeadlineExceeded, ServerError
+from paypayopa.instrumentation import MetricsHook, PHASES
+from paypayopa.simulator import Simulator
+
+from .helpers import mock_file, ClientTestCase
+
+
+class TestInstrumentation(ClientTestCase):
+
+    def setUp(self):
+        super(TestInstrumentation, self).setUp()
+        self.events = []
+        self.metrics = MetricsHook()
+        self.client = paypayopa.Client(auth=('key_id', 'key_secret'),
+                                       hooks=[self.events.append, self.metrics])
+        self.payment_url = '{}/payments/fake_merchant_payment_id'.format(self.base_url)
+
+    @responses.activate
+    def test_phase_timings(self):
+        """Test every phase of a request is timed and tagged."""
+        responses.add(responses.GET, self.payment_url,
+                      body=json.dumps(mock_file('get_payment_details_completed')))
+        self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        event, = self.events
+        self.assertEqual(event.api_id, API_NAMES.GET_PAYMENT)
+        self.assertEqual(event.status, 200)
+        self.assertEqual(event.code, 'SUCCESS')
+        self.assertEqual(set(event.phases), set(PHASES))
+        self.assertGreaterEqual(event.duration, sum(event.phases.values()))
+
+    @responses.activate
+    def test_errors(self):
+        """Test failed requests are reported with their error."""
+        responses.add(responses.GET, self.payment_url, status=500, body='{}')
+        with self.assertRaises(Exception):
+            self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        event, = self.events
+        self.assertEqual(event.status, 500)
+        self.assertIsNotNone(event.error)
+
+    @responses.activate
+    def test_error_code(self):
+        """Test error responses are tagged with their resultInfo code."""
+        responses.add(responses.GET, self.payment_url, status=400, body=json.dumps(
+            {"resultInfo": {"code": "INVALID_PARAMS", "message": "Invalid params",
+                            "codeId": "08100006"}}))
+        with self.assertRaises(Exception):
+            self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        event, = self.events
+        self.assertEqual((event.status, event.code), (400, 'INVALID_PARAMS'))
+        self.assertIn('code="INVALID_PARAMS"', self.metrics.render())
+
+    @responses.activate
+    def test_parser_is_timed(self):
+        """Test the decode phase includes the resource's parser."""
+        responses.add(responses.GET, self.payment_url,
+                      body=json.dumps(mock_file('get_payment_details_completed')))
+
+        def slow_parser(response):
+            time.sleep(0.02)
+            return response
+        self.client.get('/v2/payments/fake_merchant_payment_id', None,
+                        api_id=API_NAMES.GET_PAYMENT, parser=slow_parser)
+        event, = self.events
+        self.assertGreaterEqual(event.phases['decode'], 0.02)
+
+    @responses.activate
+    def test_cache_hits(self):
+        """Test reads answered by the cache are reported."""
+        responses.add(responses.GET, self.payment_url,
+                      body=json.dumps(mock_file('get_payment_details_completed')))
+        client = paypayopa.Client(auth=('key_id', 'key_secret'), cache=True,
+                                  hooks=[self.events.append])
+        for _ in range(2):
+            client.Payment.get_payment_details('fake_merchant_payment_id')
+        sent, hit = self.events
+        self.assertEqual((sent.cached, sent.attempt), (False, 1))
+        self.assertEqual((hit.cached, hit.attempt, hit.status), (True, 0, None))
+        self.assertEqual(hit.code, 'SUCCESS')
+        self.assertIn('decode', hit.phases)
+
+    @responses.activate
+    def test_unsent_requests(self):
+        """Test requests failing before they are sent are reported."""
+        responses.add(responses.GET, self.payment_url, status=500, body='{}')
+        with timeouts.deadline(0):
+            with self.assertRaises(DeadlineExceeded):
+                self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        client = paypayopa.Client(auth=('key_id', 'key_secret'), hooks=[self.events.append],
+                                  circuit_breaker=CircuitBreakers(min_requests=1))
+        for error in (ServerError, CircuitOpenError):
+            with self.assertRaises(error):
+                client.Payment.get_payment_details('fake_merchant_payment_id')
+        deadline, _, circuit = self.events
+        self.assertIsInstance(deadline.error, DeadlineExceeded)
+        self.assertIsInstance(circuit.error, CircuitOpenError)
+        self.assertIsNone(circuit.status)
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_metrics_render(self):
+        """Test the metrics hook renders Prometheus text."""
+        responses.add(responses.GET, self.payment_url,
+                      body=json.dumps(mock_file('get_payment_details_completed')))
+        for _ in range(3):
+            self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        text = self.metrics.render()
+        self.assertIn('paypayopa_requests_total{api_id="v2_getPaymentDetail",'
+                      'status="200",code="SUCCESS"} 3', text)
+        self.assertIn('paypayopa_phase_seconds_count{api_id="v2_getPaymentDetail",'
+                      'phase="sign"} 3', text)
+
+    @responses.activate
+    def test_failing_hook(self):
+        """Test a failing hook does not fail the request."""
+        responses.add(responses.GET, self.payment_url,
+                      body=json.dumps(mock_file('get_payment_details_completed')))
+
+        def broken(event):
+            raise RuntimeError("broken hook")
+        client = paypayopa.Client(auth=('key_id', 'key_secret'), hooks=[broken])
+        with self.assertLogs('paypayopa.instrumentation', 'ERROR'):
+            response = client.Payment.get_payment_details('fake_merchant_payment_id')
+        self.assertEqual(response.data.status, 'COMPLETED')
+
+    @unittest.skipUnless(importlib.util.find_spec('prometheus_client'),
+                         'prometheus_client is not installed')
+    @responses.activate
+    def test_prometheus_hook(self):
+        """Test the Prometheus adapter exports counters and histograms."""
+        import prometheus_client
+        from paypayopa.instrumentation import PrometheusHook
+        registry = prometheus_client.CollectorRegistry()
+        client = paypayopa.Client(auth=('key_id', 'key_secret'),
+                                  hooks=[PrometheusHook(registry)])
+        responses.add(responses.GET, self.payment_url,
+                      body=json.dumps(mock_file('get_payment_details_completed')))
+        client.Payment.get_payment_details('fake_merchant_payment_id')
+        self.assertEqual(registry.get_sample_value(
+            'paypayopa_requests_total',
+            {'api_id': API_NAMES.GET_PAYMENT, 'status': '200', 'code': 'SUCCESS'}), 1)
+
+
+class TestAsyncInstrumentation(unittest.IsolatedAsyncioTestCase):
+
+    async def test_every_exit_is_reported(self):
+        """Test the AsyncClient reports cache hits and unsent requests."""
+        events = []
+        simulator = Simulator()
+        simulator.inject(500, count=1, api_id=API_NAMES.GET_PAYMENT)
+        async with simulator.async_client(hooks=[events.append], cache=True,
+                                          circuit_breaker=CircuitBreakers(min_requests=1)) \
+                as client:
+            with self.assertRaises(ServerError):
+                await client.Payment.get_payment_details('order_1')
+            with self.assertRaises(CircuitOpenError):
+                await client.Payment.get_payment_details('order_1')
+            client.circuit_breaker.reset()
+            await client.Code.create_qr_code({"merchantPaymentId": "order_1",
+                                              "codeType": "ORDER_QR",
+                                              "amount": {"amount": 1, "currency": "JPY"}})
+            for _ in range(2):
+                await client.Code.get_payment_details('order_1')
+        self.assertIsInstance(events[1].error, CircuitOpenError)
+        self.assertTrue(events[-1].cached)
@@ -0,0 +1,93 @@
+import base64
+import time
+import unittest
+
+import jwt
+
+import paypayopa
+from paypayopa import errors
+from paypayopa.jwt_codec import JwtCodec
+
+SECRET = base64.b64encode(b'fake_secret_fake_secret_fake_sec').decode()
+KEY = base64.b64decode(SECRET)
+
+
+class TestJwtCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = JwtCodec('fake_client_id', SECRET)
+
+    def token(self, **claims):
+        claims.setdefault('aud', 'fake_client_id')
+        claims.setdefault('exp', int(time.time()) + 300)
+        return jwt.encode(claims, KEY, algorithm='HS256')
+
+    def test_encode_matches_pyjwt(self):
+        """Test tokens verify with pyjwt and carry the account link claims."""
+        token = self.codec.encode(redirect_url='https://example.com', reference_id='ref')
+        claims = jwt.decode(token, KEY, algorithms=['HS256'])
+        self.assertEqual(claims['referenceId'], 'ref')
+        self.assertEqual(claims['redirectUrl'], 'https://example.com')
+        self.assertEqual(claims['scope'], 'direct_debit')
+        self.assertEqual(len(claims['nonce']), 8)
+
+    def test_reference_id_default(self):
+        """Test every token gets a fresh reference id by default."""
+        first, second = (self.codec.decode_claims(token, verify_aud=False)['referenceId']
+                         for token in self.codec.encode_many([None, None]))
+        self.assertNotEqual(first, second)
+
+    def test_encode_many(self):
+        """Test batch encoding one token per reference id."""
+        tokens = self.codec.encode_many(['a', 'b', 'c'], redirect_url='https://example.com')
+        self.assertEqual([self.codec.decode_claims(token, verify_aud=False)['referenceId']
+                          for token in tokens], ['a', 'b', 'c'])
+
+    def test_decode(self):
+        """Test decoding a PayPay token into a typed result."""
+        result = self.codec.decode(self.token(userAuthorizationId='user', referenceId='ref'))
+        self.assertEqual(result.user_authorization_id, 'user')
+        self.assertEqual(result.reference_id, 'ref')
+
+    def test_errors(self):
+        """Test invalid tokens raise typed errors."""
+        with self.assertRaises(errors.JwtSignatureError):
+            self.codec.decode(jwt.encode({'aud': 'fake_client_id'},
+                                         b'other_secret_other_secret_other_', algorithm='HS256'))
+        with self.assertRaises(errors.JwtExpiredError):
+            self.codec.decode(self.token(exp=int(time.time()) - 10))
+        with self.assertRaises(errors.JwtAudienceError):
+            self.codec.decode(self.token(aud='other_client_id'))
+        with self.assertRaises(errors.JwtSignatureError):
+            self.codec.decode(jwt.encode({'aud': 'fake_client_id'}, None, algorithm='none'))
+        with self.assertRaises(errors.JwtError):
+            self.codec.decode('not.a token')
+        self.assertTrue(issubclass(errors.JwtError, errors.SignatureVerificationError))
+
+    def test_audience_is_required(self):
+        """Test tokens are not accepted without an audience to check."""
+        token = self.token(userAuthorizationId='user')
+        codec = JwtCodec(None, SECRET)
+        with self.assertRaises(errors.JwtAudienceError):
+            codec.decode(token)
+        self.assertEqual(codec.decode_claims(token, audience='fake_client_id')
+                         ['userAuthorizationId'], 'user')
+        with self.assertLogs('paypayopa.client', 'WARNING'):
+            self.assertIsNone(paypayopa.Client.decode_jwt(None, SECRET, token))
+
+    def test_client_helpers(self):
+        """Test Client.encode_jwt and decode_jwt use the codec."""
+        token = paypayopa.Client.encode_jwt(SECRET, reference_id='ref')
+        self.assertEqual(jwt.decode(token, KEY, algorithms=['HS256'])['referenceId'], 'ref')
+        self.assertEqual(paypayopa.Client.decode_jwt(
+            'fake_client_id', SECRET, self.token(userAuthorizationId='user', referenceId='ref')),
+            ('user', 'ref'))
+        with self.assertLogs('paypayopa.client', 'WARNING'):
+            self.assertIsNone(paypayopa.Client.decode_jwt('fake_client_id', SECRET, 'x.y.z'))
+        with self.assertLogs('paypayopa.client', 'WARNING'):
+            self.assertIsNone(paypayopa.Client.decode_jwt('fake_client_id', 'not base64!',
+                                                          'x.y.z'))
+        with self.assertRaises(errors.JwtError):
+            JwtCodec('fake_client_id', 'not base64!')
+        self.assertIs(paypayopa.Client.jwt_codec('fake_client_id', SECRET),
+                      paypayopa.Client.jwt_codec('fake_client_id', SECRET))
@@ -0,0 +1,43 @@
+import subprocess
+import sys
+import unittest
+
+import paypayopa
+
+
+def loaded_modules(code):
+    """Runs code in a fresh interpreter and returns the modules it loaded."""
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        code + "\nimport sys\nprint(' '.join(sorted(sys.modules)))"])
+    return set(output.decode().split())
+
+
+class TestLazyImport(unittest.TestCase):
+
+    def test_cold_start_imports(self):
+        """Test import and construction do not load heavy dependencies."""
+        modules = loaded_modules(
+            "import paypayopa\nclient = paypayopa.Client(auth=('key_id', 'key_secret'))")
+        for module in ('requests', 'jwt', 'pkg_resources', 'asyncio',
+                       'paypayopa.resources.payment', 'paypayopa.objects.payment'):
+            self.assertNotIn(module, modules)
+
+    def test_resource_access_loads_models(self):
+        """Test resources and their models load on first access."""
+        modules = loaded_modules(
+            "import paypayopa\nclient = paypayopa.Client(auth=('key_id', 'key_secret'))\n"
+            "client.Payment")
+        self.assertIn('paypayopa.resources.payment', modules)
+        self.assertIn('paypayopa.objects.payment', modules)
+        self.assertNotIn('paypayopa.resources.cashback', modules)
+
+    def test_lazy_attributes(self):
+        """Test lazily loaded names behave like regular attributes."""
+        client = paypayopa.Client(auth=('key_id', 'key_secret'))
+        self.assertIs(client.Payment, client.Payment)
+        self.assertIs(client.Payment.client, client)
+        self.assertIsInstance(client.Code, paypayopa.Code)
+        self.assertIn('AsyncClient', dir(paypayopa))
+        with self.assertRaises(AttributeError):
+            paypayopa.NotAClient
@@ -0,0 +1,68 @@
+import json
+import unittest
+
+from paypayopa.objects.base import Amount
+from paypayopa.objects.payment import PaymentBody, Refund
+from paypayopa.objects.payment_auth import PaymentAuthBody, Capture, Revert
+from paypayopa.objects.pending_payment import CreatedPendingPaymentBody
+
+from .helpers import mock_file
+
+
+class TestObjects(unittest.TestCase):
+
+    def setUp(self):
+        self.payment = mock_file('get_payment_details_completed')['data']
+
+    def test_payment_body(self):
+        """Test camelCase keys and nested objects are decoded."""
+        payment = PaymentBody.from_dict(self.payment)
+        self.assertEqual(payment.merchant_payment_id, 'fake_merchant_payment_id')
+        self.assertEqual(payment.accepted_at, 1609749561)
+        self.assertEqual(payment.amount, Amount(amount=1000, currency='JPY'))
+        self.assertEqual(payment.order_items[0].unit_price.amount, 1000)
+        self.assertEqual(payment.payment_methods[0].type, 'WALLET')
+        self.assertIsInstance(payment.refunds[0], Refund)
+        self.assertEqual(payment.refunds[0].merchant_refund_id, 'fake_merchant_refund_id')
+        self.assertEqual(PaymentBody.from_json(json.dumps(self.payment)), payment)
+
+    def test_missing_keys(self):
+        """Test missing keys fall back to field defaults."""
+        payment = PaymentBody.from_dict({"status": "CREATED", "amount": None})
+        self.assertEqual(payment.status, 'CREATED')
+        self.assertIsNone(payment.amount)
+        self.assertIsNone(payment.store_id)
+        self.assertEqual(payment.refunds, [])
+        pending = CreatedPendingPaymentBody.from_dict({"expiryDate": 1609749559})
+        self.assertEqual(pending.expires_at, 1609749559)
+
+    def test_payment_auth_body(self):
+        """Test captures and revert are decoded."""
+        data = dict(self.payment,
+                    expiresAt=1609749999,
+                    captures={"data": [{"merchantCaptureId": "fake_capture_id",
+                                        "amount": {"amount": 1, "currency": "JPY"},
+                                        "status": "COMPLETED"}]},
+                    revert={"merchantRevertId": "fake_revert_id", "reason": "r"})
+        payment = PaymentAuthBody.from_dict(data)
+        self.assertEqual(payment.expires_at, 1609749999)
+        self.assertIsInstance(payment.captures[0], Capture)
+        self.assertEqual(payment.captures[0].amount.currency, 'JPY')
+        self.assertEqual(payment.revert, Revert(accepted_at=None,
+                                                merchant_revert_id='fake_revert_id',
+                                                requested_at=None, reason='r'))
+
+    def test_to_dict(self):
+        """Test objects encode back to camelCase keys."""
+        payment = PaymentBody.from_dict(self.payment)
+        encoded = payment.to_dict()
+        self.assertEqual(encoded['merchantPaymentId'], 'fake_merchant_payment_id')
+        self.assertEqual(encoded['orderItems'], self.payment['orderItems'])
+        self.assertEqual(json.loads(payment.to_json()), json.loads(json.dumps(encoded)))
+        self.assertEqual(Amount.from_json(payment.amount.to_json()), payment.amount)
+
+    def test_slots(self):
+        """Test objects do not carry a per-instance __dict__."""
+        payment = PaymentBody.from_dict(self.payment)
+        self.assertFalse(hasattr(payment, '__dict__'))
+        self.assertFalse(hasattr(payment.amount, '__dict__'))
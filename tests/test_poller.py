@@ -0,0 +1,68 @@
+import threading
+import time
+import unittest
+
+from paypayopa.poller import PaymentPoller
+
+
+def payment(status):
+    return {"resultInfo": {"code": "SUCCESS"}, "data": {"status": status}}
+
+
+class TestPaymentPoller(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.statuses = {}
+
+    def fetch(self, merchant_payment_id):
+        with self.lock:
+            self.calls[merchant_payment_id] = self.calls.get(merchant_payment_id, 0) + 1
+            sequence = self.statuses[merchant_payment_id]
+            return payment(sequence.pop(0) if len(sequence) > 1 else sequence[0])
+
+    def poller(self, **options):
+        options.setdefault('initial_interval', 0.01)
+        options.setdefault('max_interval', 0.05)
+        return PaymentPoller(fetch=self.fetch, **options)
+
+    def test_completed(self):
+        """Test transitions are reported until the payment completes."""
+        self.statuses['order_1'] = ['CREATED', 'CREATED', 'COMPLETED']
+        transitions = []
+        with self.poller() as poller:
+            future = poller.watch('order_1', callback=lambda *args: transitions.append(args[:3]))
+            result = future.result(timeout=2)
+        self.assertEqual(result.status, 'COMPLETED')
+        self.assertEqual(result.response, payment('COMPLETED'))
+        self.assertEqual(transitions, [('order_1', None, 'CREATED'),
+                                       ('order_1', 'CREATED', 'COMPLETED')])
+        self.assertEqual(self.calls['order_1'], 3)
+
+    def test_expired(self):
+        """Test watching stops at expiry."""
+        self.statuses['order_2'] = ['CREATED']
+        with self.poller() as poller:
+            future = poller.watch('order_2', expires_at=time.time() + 0.1)
+            result = future.result(timeout=2)
+        self.assertEqual(result.status, 'EXPIRED')
+
+    def test_many_payments_and_backoff(self):
+        """Test many payments share the scheduler and back off."""
+        ids = ['order_{}'.format(i) for i in range(50)]
+        for merchant_payment_id in ids:
+            self.statuses[merchant_payment_id] = ['CREATED'] * 4 + ['FAILED']
+        with self.poller(backoff=2.0) as poller:
+            futures = [poller.watch(i) for i in ids]
+            results = [f.result(timeout=5) for f in futures]
+        self.assertTrue(all(r.status == 'FAILED' for r in results))
+        self.assertTrue(all(self.calls[i] == 5 for i in ids))
+
+    def test_unwatch(self):
+        """Test unwatching cancels the future."""
+        self.statuses['order_3'] = ['CREATED']
+        with self.poller() as poller:
+            future = poller.watch('order_3')
+            poller.unwatch('order_3')
+            self.assertTrue(future.cancelled())
@@ -0,0 +1,81 @@
+import json
+import threading
+import unittest
+from unittest import mock
+
+import responses
+
+import paypayopa
+from paypayopa.constants import API_NAMES
+from paypayopa.ratelimit import RateLimiter, TokenBucket
+
+from .helpers import mock_file, ClientTestCase
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        """Test the burst is free and later tokens are spaced by the rate."""
+        bucket = TokenBucket(rate=10, capacity=2)
+        delays = [bucket.reserve() for _ in range(4)]
+        self.assertEqual(delays[:2], [0.0, 0.0])
+        self.assertAlmostEqual(delays[2], 0.1, places=2)
+        self.assertAlmostEqual(delays[3], 0.2, places=2)
+
+    def test_shared_between_threads(self):
+        """Test concurrent reservations never hand out the same slot."""
+        bucket = TokenBucket(rate=1000, capacity=1)
+        delays = []
+        lock = threading.Lock()
+
+        def reserve():
+            for _ in range(50):
+                delay = bucket.reserve()
+                with lock:
+                    delays.append(delay)
+
+        threads = [threading.Thread(target=reserve) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(delays), 200)
+        self.assertGreaterEqual(max(delays), 0.19)
+
+    def test_limiter_keys(self):
+        """Test limits apply per API and unlisted APIs use the default."""
+        limiter = RateLimiter({API_NAMES.CREATE_CASHBACK_REQUEST: (1, 1)})
+        self.assertEqual(limiter.reserve(API_NAMES.CREATE_CASHBACK_REQUEST), 0.0)
+        self.assertGreater(limiter.reserve(API_NAMES.CREATE_CASHBACK_REQUEST), 0.9)
+        self.assertEqual(limiter.reserve(API_NAMES.GET_PAYMENT), 0.0)
+        self.assertIsNone(limiter.bucket(API_NAMES.GET_PAYMENT))
+        limiter = RateLimiter(default=5)
+        self.assertIs(limiter.bucket(API_NAMES.GET_PAYMENT), limiter.bucket(API_NAMES.GET_PAYMENT))
+        self.assertIsNot(limiter.bucket(API_NAMES.GET_PAYMENT), limiter.bucket(API_NAMES.GET_REFUND))
+
+
+class TestClientRateLimit(ClientTestCase):
+
+    @responses.activate
+    def test_requests_wait_for_tokens(self):
+        """Test the client waits for the bucket of each API."""
+        limiter = RateLimiter({API_NAMES.CREATE_CASHBACK_REQUEST: (10, 1)})
+        client = paypayopa.Client(auth=('key_id', 'key_secret'), rate_limiter=limiter)
+        responses.add(responses.POST, '{}/cashback'.format(self.base_url), status=200,
+                      body=json.dumps(mock_file('give_cashback_response')))
+        with mock.patch('paypayopa.ratelimit.time.sleep') as sleep:
+            for _ in range(3):
+                client.Cashback.give_cashback(mock_file('give_cashback_payload'))
+        self.assertEqual(len(responses.calls), 3)
+        self.assertEqual(sleep.call_count, 2)
+
+
+class TestAsyncRateLimit(unittest.IsolatedAsyncioTestCase):
+
+    async def test_acquire_async(self):
+        """Test asyncio tasks wait on the same bucket without blocking."""
+        limiter = RateLimiter(default=(100, 1))
+        with mock.patch('paypayopa.ratelimit.asyncio.sleep', new=mock.AsyncMock()) as sleep:
+            for _ in range(3):
+                await limiter.acquire_async(API_NAMES.GET_PAYMENT)
+        self.assertEqual(sleep.call_count, 2)
@@ -0,0 +1,102 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import httpx
+
+import paypayopa
+from paypayopa.objects.payment import PaymentAPIResponse
+from paypayopa.recording import REDACTED, ReplayError, Replayer, load, record_session
+from paypayopa.simulator import Simulator
+
+from .helpers import mock_file
+
+
+def payment(merchant_payment_id):
+    return {"merchantPaymentId": merchant_payment_id,
+            "userAuthorizationId": "fake_user_authorization_id",
+            "amount": {"amount": 100, "currency": "JPY"},
+            "requestedAt": int(time.time())}
+
+
+class TestRecording(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'traffic.jsonl.gz')
+        self.simulator = Simulator(latency=0.02)
+        self.auth = next(iter(self.simulator.credentials.items()))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def record(self):
+        session = record_session(self.path, self.simulator.session())
+        client = paypayopa.Client(auth=self.auth, session=session)
+        created = client.Payment.create(payment('order_1'))
+        details = client.Payment.get_payment_details('order_1')
+        missing = client.Payment.get_payment_details('order_2')
+        session.close()
+        return created, details, missing
+
+    def test_recording_redacts_secrets(self):
+        """Test recordings keep no API key, signature or user ids."""
+        self.record()
+        exchanges = load(self.path)
+        self.assertEqual([(e['method'], e['path'], e['status']) for e in exchanges],
+                         [('POST', '/v2/payments', 201),
+                          ('GET', '/v2/payments/order_1', 200),
+                          ('GET', '/v2/payments/order_2', 404)])
+        with gzip.open(self.path) as f:
+            raw = f.read()
+        self.assertNotIn(self.auth[0].encode(), raw)
+        self.assertNotIn(b'fake_user_authorization_id', raw)
+        auth = exchanges[0]['headers']['Authorization'].split(':')
+        self.assertEqual(auth[1:3], [REDACTED, REDACTED])
+        self.assertGreaterEqual(exchanges[0]['elapsed'], 0.02)
+
+    def test_replay(self):
+        """Test replayed responses decode like the recorded ones."""
+        created, details, missing = self.record()
+        client = paypayopa.Client(auth=('other_key', 'other_secret'),
+                                  session=Replayer(self.path).session())
+        replayed = client.Payment.create(payment('order_1'))
+        self.assertIsInstance(replayed, PaymentAPIResponse)
+        self.assertEqual(replayed.data.payment_id, created.data.payment_id)
+        self.assertEqual(client.Payment.get_payment_details('order_1').data.status,
+                         details.data.status)
+        self.assertIsNone(client.Payment.get_payment_details('order_2'))
+        with self.assertRaises(ReplayError):
+            client.Payment.get_payment_details('order_1')
+
+    def test_replay_timing_and_loop(self):
+        """Test timed replays keep the recorded latency and loops repeat."""
+        self.record()
+        replayer = Replayer(self.path, loop=True)
+        client = paypayopa.Client(auth=self.auth, session=replayer.session(),
+                                  coalesce=False)
+        started = time.perf_counter()
+        for _ in range(5):
+            client.Payment.get_payment_details('order_1')
+        self.assertLess(time.perf_counter() - started, 0.05)
+        replayer.timing = True
+        started = time.perf_counter()
+        client.Payment.get_payment_details('order_1')
+        self.assertGreaterEqual(time.perf_counter() - started, 0.02)
+
+
+class TestAsyncReplay(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_replay(self):
+        """Test the AsyncClient replaying a recording."""
+        exchanges = [{'method': 'GET', 'path': '/v2/payments/order_1', 'status': 200,
+                      'elapsed': 0.001, 'response_headers': {},
+                      'response': json.dumps(mock_file('get_payment_details_completed'))}]
+        session = httpx.AsyncClient(transport=Replayer(exchanges, timing=True).httpx_transport())
+        async with paypayopa.AsyncClient(auth=('key', 'secret'), session=session) as client:
+            response = await client.Payment.get_payment_details('order_1')
+        self.assertEqual(response.data.status, 'COMPLETED')
@@ -0,0 +1,115 @@
+import io
+import json
+import os
+import tempfile
+
+import responses
+
+from paypayopa.batch import Journal, RefundBatch
+
+from .helpers import mock_file, ClientTestCase
+
+CSV = """merchantRefundId,paymentId,amount,currency,reason
+refund_1,payment_1,100,JPY,damaged
+refund_2,payment_2,200,,
+refund_3,payment_3,300,JPY,
+"""
+
+
+class TestRefundBatch(ClientTestCase):
+
+    def setUp(self):
+        super(TestRefundBatch, self).setUp()
+        self.refunds_url = '{}/refunds'.format(self.base_url)
+        fd, self.journal_path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        os.remove(self.journal_path)
+
+    def tearDown(self):
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def refund_callback(self, request):
+        body = json.loads(request.body)
+        result = mock_file('refund_payment_response')
+        result['data']['merchantRefundId'] = body['merchantRefundId']
+        return 200, {}, json.dumps(result)
+
+    def test_read_csv(self):
+        """Test CSV rows become refund requests."""
+        rows = list(RefundBatch.read_csv(io.StringIO(CSV)))
+        self.assertEqual(rows[0], {'merchantRefundId': 'refund_1',
+                                   'paymentId': 'payment_1',
+                                   'amount': {'amount': 100, 'currency': 'JPY'},
+                                   'reason': 'damaged'})
+        self.assertEqual(rows[1]['amount']['currency'], 'JPY')
+        self.assertNotIn('reason', rows[1])
+
+    def test_validate_reports_every_row(self):
+        """Test all invalid rows are reported before anything is sent."""
+        rows = list(RefundBatch.read_csv(io.StringIO(CSV + "refund_1,payment_4,1,JPY,\n"
+                                                         "refund_5,payment_5,abc,JPY,\n")))
+        with self.assertRaises(ValueError) as cm:
+            RefundBatch(self.client).validate(rows)
+        message = str(cm.exception)
+        self.assertIn('2 invalid refund requests', message)
+        self.assertIn('row 3: duplicate merchantRefundId refund_1', message)
+        self.assertIn('row 4:', message)
+
+    @responses.activate
+    def test_run(self):
+        """Test every refund is sent once and checkpointed."""
+        responses.add_callback(responses.POST, self.refunds_url,
+                               callback=self.refund_callback)
+        batch = RefundBatch(self.client, journal=self.journal_path, concurrency=2)
+        rows = list(RefundBatch.read_csv(io.StringIO(CSV)))
+        results = list(batch.run(rows))
+        batch.journal.close()
+        # the rows passed in are left as they were
+        self.assertEqual(rows, list(RefundBatch.read_csv(io.StringIO(CSV))))
+        self.assertTrue(all('requestedAt' in json.loads(call.request.body)
+                            for call in responses.calls))
+        self.assertTrue(all(result.ok and not result.skipped for result in results))
+        self.assertEqual(sorted(result.response.data.merchant_refund_id
+                                for result in results),
+                         ['refund_1', 'refund_2', 'refund_3'])
+        self.assertEqual(len(responses.calls), 3)
+        self.assertEqual(Journal(self.journal_path).counts(), {'done': 3})
+
+    @responses.activate
+    def test_resume(self):
+        """Test a resumed run does not refund twice."""
+        with Journal(self.journal_path) as journal:
+            journal.record('refund_1', 'done')
+            journal.record('refund_2', 'started')
+        result = mock_file('refund_details')
+        result['data']['merchantRefundId'] = 'refund_2'
+        responses.add(responses.GET, '{}/refund_2'.format(self.refunds_url),
+                      body=json.dumps(result))
+        responses.add_callback(responses.POST, self.refunds_url,
+                               callback=self.refund_callback)
+        batch = RefundBatch(self.client, journal=self.journal_path)
+        results = {result.key: result
+                   for result in batch.run(RefundBatch.read_csv(io.StringIO(CSV)))}
+        batch.journal.close()
+        self.assertTrue(results['refund_1'].skipped)
+        self.assertTrue(results['refund_2'].skipped)
+        self.assertFalse(results['refund_3'].skipped)
+        # only the refund left in flight is looked up
+        gets = [call for call in responses.calls if call.request.method == 'GET']
+        self.assertEqual([call.request.url for call in gets],
+                         ['{}/refund_2'.format(self.refunds_url)])
+        posts = [call for call in responses.calls if call.request.method == 'POST']
+        self.assertEqual([json.loads(call.request.body)['merchantRefundId'] for call in posts],
+                         ['refund_3'])
+        self.assertEqual(Journal(self.journal_path).counts(), {'done': 3})
+
+    @responses.activate
+    def test_failure_is_checkpointed(self):
+        """Test a failed refund is recorded and retried on the next run."""
+        responses.add(responses.POST, self.refunds_url, status=500, body='{}')
+        batch = RefundBatch(self.client, journal=self.journal_path)
+        results = list(batch.run([mock_file('refund_payment_payload')]))
+        batch.journal.close()
+        self.assertFalse(results[0].ok)
+        self.assertEqual(Journal(self.journal_path).state('fakeId'), 'failed')
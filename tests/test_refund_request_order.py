@@ -18,3 +18,22 @@ class TestRefundRequestOrder(ClientTestCase):
         url = "https://stg-api.sandbox.paypay.ne.jp/v2/refunds"
         responses.add(responses.POST, url, status=200, body=json.dumps(result))
         self.assertEqual(self.client.Pending.refund_payment(init), result)
+
+    @responses.activate
+    def test_refund_request_order_keeps_payload(self):
+        """Test refund request order does not modify the payload."""
+        init = mock_file('refund_request_order_payload')
+        init.pop('requestedAt', None)
+        result = mock_file('refund_request_order_response')
+        url = "https://stg-api.sandbox.paypay.ne.jp/v2/refunds"
+        responses.add(responses.POST, url, status=200, body=json.dumps(result))
+        self.client.Pending.refund_payment(dict(init))
+        sent = json.loads(responses.calls[0].request.body)
+        self.assertIn('requestedAt', sent)
+        invalid = dict(init)
+        del invalid['paymentId']
+        with self.assertRaises(ValueError):
+            self.client.Pending.refund_payment(invalid)
+        self.assertNotIn('requestedAt', invalid)
+        self.client.Pending.refund_payment(init)
+        self.assertNotIn('requestedAt', init)
@@ -0,0 +1,117 @@
+import json
+import time
+import unittest
+
+import responses
+
+import paypayopa
+from paypayopa.cache import ResponseCache
+from paypayopa.constants.api_list import API_NAMES
+from paypayopa.errors import InvalidParamsError
+
+from .helpers import mock_file, ClientTestCase
+
+
+class TestResponseCacheUnit(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted first."""
+        cache = ResponseCache(maxsize=2)
+        keys = [cache.key(API_NAMES.GET_PAYMENT, '/v2/payments/{}'.format(i)) for i in range(3)]
+        cache.set(keys[0], {'data': {}})
+        cache.set(keys[1], {'data': {}})
+        self.assertIsNotNone(cache.get(keys[0]))
+        cache.set(keys[2], {'data': {}})
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_status_ttl(self):
+        """Test the status of the data overrides the API ttl."""
+        cache = ResponseCache(status_ttls={'CREATED': 0.01})
+        key = cache.key(API_NAMES.GET_PAYMENT, '/v2/payments/id')
+        cache.set(key, {'data': {'status': 'CREATED'}})
+        time.sleep(0.02)
+        self.assertIsNone(cache.get(key))
+        cache.set(key, {'data': {'status': 'COMPLETED'}})
+        time.sleep(0.02)
+        self.assertIsNotNone(cache.get(key))
+
+    def test_callers_get_their_own_copy(self):
+        """Test modifying a stored or returned response leaves the entry intact."""
+        cache = ResponseCache()
+        key = cache.key(API_NAMES.GET_QR_PAYMENT, '/v2/codes/payments/id')
+        response = {'data': {'status': 'COMPLETED', 'refunds': {'data': []}}}
+        cache.set(key, response)
+        response['data']['status'] = 'CANCELED'
+        cache.get(key)['data']['refunds']['data'].append({})
+        self.assertEqual(cache.get(key), {'data': {'status': 'COMPLETED',
+                                                   'refunds': {'data': []}}})
+
+    def test_uncached_api(self):
+        """Test APIs without a ttl are not cached."""
+        cache = ResponseCache(ttls={API_NAMES.GET_PAYMENT: 5})
+        self.assertFalse(cache.cacheable(API_NAMES.GET_REFUND))
+
+
+class TestResponseCache(ClientTestCase):
+
+    def setUp(self):
+        super(TestResponseCache, self).setUp()
+        self.client = paypayopa.Client(auth=('key_id', 'key_secret'), cache=True)
+        self.payment_url = '{}/payments/fake_merchant_payment_id'.format(self.base_url)
+        self.details = mock_file('get_payment_details_completed')
+        responses.start()
+        responses.add(responses.GET, self.payment_url, body=json.dumps(self.details))
+
+    def tearDown(self):
+        responses.stop()
+        responses.reset()
+
+    def test_repeated_reads(self):
+        """Test repeated reads are served from the cache."""
+        first = self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        second = self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        self.assertEqual(first, second)
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(self.client.cache.stats()['hits'], 1)
+
+    def test_cache_bypass(self):
+        """Test cache=False reads anew and refreshes the cached response."""
+        self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        self.client.Payment.get_payment_details('fake_merchant_payment_id', cache=False)
+        self.assertEqual(len(responses.calls), 2)
+        self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        self.assertEqual(len(responses.calls), 2)
+
+    def test_cancel_invalidates(self):
+        """Test cancelling a payment drops its cached details."""
+        responses.add(responses.DELETE, self.payment_url,
+                      body=json.dumps(mock_file('cancel_payment')))
+        self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        self.client.Payment.cancel_payment('fake_merchant_payment_id')
+        self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        gets = [call for call in responses.calls if call.request.method == 'GET']
+        self.assertEqual(len(gets), 2)
+
+    def test_refund_invalidates(self):
+        """Test refunding a payment drops details cached by its paymentId."""
+        responses.add(responses.POST, '{}/refunds'.format(self.base_url),
+                      body=json.dumps(mock_file('refund_payment_response')))
+        self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        refund = mock_file('refund_payment_payload')
+        refund['paymentId'] = self.details['data']['paymentId']
+        self.client.Payment.refund_payment(refund)
+        self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        gets = [call for call in responses.calls if call.request.method == 'GET']
+        self.assertEqual(len(gets), 2)
+
+    def test_errors_not_cached(self):
+        """Test error responses are not cached."""
+        responses.replace(responses.GET, self.payment_url, status=400,
+                          body=json.dumps({'resultInfo': {'code': 'INVALID_PARAMS',
+                                                          'codeId': '00200004'}}))
+        for _ in range(2):
+            with self.assertRaises(InvalidParamsError):
+                self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        self.assertEqual(len(responses.calls), 2)
@@ -0,0 +1,135 @@
+import json
+import unittest
+from unittest import mock
+
+import requests
+import responses
+
+import paypayopa
+from paypayopa.constants import API_NAMES
+from paypayopa.retry import RetryBudget, RetryPolicy
+
+from .helpers import mock_file, ClientTestCase
+
+
+class TestRetry(ClientTestCase):
+
+    def setUp(self):
+        super(TestRetry, self).setUp()
+        self.policy = RetryPolicy(max_attempts=3, backoff_base=0, jitter=False)
+        self.client = paypayopa.Client(auth=('key_id', 'key_secret'),
+                                       retry=self.policy)
+        self.sleep = mock.patch('paypayopa.client.time.sleep').start()
+        self.addCleanup(mock.patch.stopall)
+        self.cashback_url = '{}/cashback'.format(self.base_url)
+
+    @responses.activate
+    def test_retries_get(self):
+        """Test GETs are resent after server errors, signed afresh."""
+        result = mock_file('check_cashback_detail_response')
+        url = '{}/cashback/fake_cashback_id'.format(self.base_url)
+        responses.add(responses.GET, url, status=503, body='{}')
+        responses.add(responses.GET, url, status=500, body='{}')
+        responses.add(responses.GET, url, status=200, body=json.dumps(result))
+        self.assertEqual(self.client.Cashback.check_cashback_detail('fake_cashback_id'), result)
+        self.assertEqual(len(responses.calls), 3)
+        nonces = {call.request.headers['Authorization'].split(':')[3]
+                  for call in responses.calls}
+        self.assertEqual(len(nonces), 3)
+        stats = self.policy.stats.snapshot()[API_NAMES.GET_CASHBACK_DETAILS]
+        self.assertEqual(stats, {'requests': 1, 'retries': 2})
+
+    @responses.activate
+    def test_retries_idempotent_post(self):
+        """Test POSTs keyed by merchantCashbackId are resent."""
+        result = mock_file('give_cashback_response')
+        responses.add(responses.POST, self.cashback_url, status=500, body='{}')
+        responses.add(responses.POST, self.cashback_url, status=200, body=json.dumps(result))
+        self.assertEqual(self.client.Cashback.give_cashback(mock_file('give_cashback_payload')), result)
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_does_not_retry_unkeyed_post(self):
+        """Test POSTs without an idempotency key are sent once."""
+        responses.add(responses.POST, 'https://stg-api.sandbox.paypay.ne.jp/v1/qr/sessions',
+                      status=500, body='{}')
+        with self.assertRaises(ValueError):
+            self.client.Account.create_qr_session({
+                "scopes": ["direct_debit"], "nonce": "n", "redirectUrl": "https://example.com",
+                "referenceId": "r"})
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_gives_up_after_max_attempts(self):
+        """Test the last error surfaces once attempts are exhausted."""
+        url = '{}/cashback/fake_cashback_id'.format(self.base_url)
+        responses.add(responses.GET, url, status=500, body='{}')
+        with self.assertRaises(ValueError):
+            self.client.Cashback.check_cashback_detail('fake_cashback_id')
+        self.assertEqual(len(responses.calls), 3)
+        stats = self.policy.stats.snapshot()[API_NAMES.GET_CASHBACK_DETAILS]
+        self.assertEqual(stats['exhausted'], 1)
+
+    @responses.activate
+    def test_retry_after(self):
+        """Test Retry-After is honoured on 429."""
+        result = mock_file('check_cashback_detail_response')
+        url = '{}/cashback/fake_cashback_id'.format(self.base_url)
+        responses.add(responses.GET, url, status=429, body='{}', headers={'Retry-After': '2'})
+        responses.add(responses.GET, url, status=200, body=json.dumps(result))
+        self.client.Cashback.check_cashback_detail('fake_cashback_id')
+        self.sleep.assert_called_once_with(2.0)
+
+    @responses.activate
+    def test_retries_connection_errors(self):
+        """Test transport errors are retried."""
+        result = mock_file('check_cashback_detail_response')
+        url = '{}/cashback/fake_cashback_id'.format(self.base_url)
+        responses.add(responses.GET, url, body=requests.ConnectionError("reset"))
+        responses.add(responses.GET, url, status=200, body=json.dumps(result))
+        self.assertEqual(self.client.Cashback.check_cashback_detail('fake_cashback_id'), result)
+
+    @responses.activate
+    def test_budget(self):
+        """Test an empty retry budget stops retries."""
+        self.policy.budget = RetryBudget(ratio=0, min_retries_per_second=0, max_balance=1)
+        url = '{}/cashback/fake_cashback_id'.format(self.base_url)
+        responses.add(responses.GET, url, status=500, body='{}')
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                self.client.Cashback.check_cashback_detail('fake_cashback_id')
+        self.assertEqual(len(responses.calls), 3)
+        stats = self.policy.stats.snapshot()[API_NAMES.GET_CASHBACK_DETAILS]
+        self.assertEqual(stats['budget_denied'], 2)
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_backoff(self):
+        """Test exponential backoff is capped."""
+        policy = RetryPolicy(max_attempts=10, backoff_base=1, backoff_max=5, jitter=False,
+                             budget=RetryBudget(max_balance=100))
+        error = requests.Timeout()
+        delays = [policy.backoff("GET", "api", None, attempt, error=error)
+                  for attempt in range(1, 6)]
+        self.assertEqual(delays, [1, 2, 4, 5, 5])
+
+
+class TestAsyncRetry(unittest.IsolatedAsyncioTestCase):
+
+    async def test_retries_get(self):
+        """Test the async client follows the same retry policy."""
+        import httpx
+        statuses = [500, 200]
+
+        def handler(request):
+            return httpx.Response(statuses.pop(0), content=b'{"resultInfo": {}}')
+
+        client = paypayopa.AsyncClient(
+            session=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+            auth=('key_id', 'key_secret'),
+            retry=RetryPolicy(backoff_base=0, jitter=False))
+        async with client:
+            result = await client.Cashback.check_cashback_detail('fake_cashback_id')
+        self.assertEqual(result, {"resultInfo": {}})
+        self.assertEqual(statuses, [])
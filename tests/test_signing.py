@@ -0,0 +1,60 @@
+import base64
+import hashlib
+import hmac
+import unittest
+
+from paypayopa import Client
+from paypayopa.signing import Signer
+
+
+def legacy_auth_header(api_key, api_secret, method, resource, nonce, timestamp,
+                       content_type="empty", request_body=None):
+    body_hash = "empty"
+    if request_body is not None:
+        hashed_body = hashlib.md5()
+        hashed_body.update(content_type.encode("utf-8"))
+        hashed_body.update(request_body.encode("utf-8"))
+        body_hash = base64.b64encode(hashed_body.digest()).decode()
+    signature_list = "\n".join([resource, method, nonce, timestamp,
+                                content_type, body_hash])
+    hmac_data = hmac.new(api_secret.encode("utf-8"),
+                         signature_list.encode("utf-8"),
+                         digestmod=hashlib.sha256)
+    hmac_base64 = base64.b64encode(hmac_data.digest())
+    header = ":".join([api_key, hmac_base64.decode("utf-8"), nonce, timestamp,
+                       body_hash])
+    return "{}:{}".format('hmac OPA-Auth', header)
+
+
+class TestSigner(unittest.TestCase):
+
+    def setUp(self):
+        self.signer = Signer('key_id', 'key_secret')
+        self.body = '{"merchantPaymentId": "fake_merchant_payment_id"}'
+
+    def test_matches_legacy_header(self):
+        """Test signer output is identical to the original algorithm."""
+        for method, body, content_type in (
+                ("GET", None, "empty"),
+                ("POST", self.body, "application/json;charset=UTF-8")):
+            expected = legacy_auth_header('key_id', 'key_secret', method,
+                                          '/v2/payments', 'abcd1234',
+                                          '1700000000', content_type, body)
+            signed = self.signer.sign(method, '/v2/payments', content_type,
+                                      body, nonce='abcd1234',
+                                      timestamp='1700000000')
+            self.assertEqual(signed, expected)
+            signed_bytes = self.signer.sign(
+                method, '/v2/payments', content_type,
+                body.encode("utf-8") if body else None,
+                nonce='abcd1234', timestamp='1700000000')
+            self.assertEqual(signed_bytes, expected)
+
+    def test_header_format(self):
+        """Test nonces are fresh 8 character hex strings."""
+        first = Client.auth_header('key_id', 'key_secret', 'GET', '/v2/payments')
+        second = self.signer.sign('GET', '/v2/payments')
+        pattern = r'^hmac OPA-Auth:key_id:[A-Za-z0-9+/=]{44}:[0-9a-f]{8}:\d+:empty$'
+        self.assertRegex(first, pattern)
+        self.assertRegex(second, pattern)
+        self.assertNotEqual(first.split(':')[3], second.split(':')[3])
@@ -0,0 +1,167 @@
+import time
+import unittest
+
+import paypayopa
+from paypayopa.constants.api_list import API_NAMES
+from paypayopa.errors import (BadRequestError, InvalidParamsError, ServerError,
+                              UnacceptableOpError, UnauthorizedError)
+from paypayopa.retry import RetryPolicy
+from paypayopa.simulator import Simulator
+
+
+def amount(value):
+    return {"amount": value, "currency": "JPY"}
+
+
+def payment(merchant_payment_id, value=100):
+    return {"merchantPaymentId": merchant_payment_id,
+            "userAuthorizationId": "fake_user_authorization_id",
+            "amount": amount(value),
+            "requestedAt": int(time.time())}
+
+
+def refund(merchant_refund_id, payment_id, value):
+    return {"merchantRefundId": merchant_refund_id,
+            "paymentId": payment_id,
+            "amount": amount(value),
+            "requestedAt": int(time.time())}
+
+
+class TestSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = Simulator()
+        self.client = self.simulator.client()
+
+    def test_payment_refund_flow(self):
+        """Test a payment moves to REFUNDED once fully refunded."""
+        created = self.client.Payment.create(payment("order_1"))
+        self.assertEqual(created.data.status, "COMPLETED")
+        payment_id = created.data.payment_id
+        self.client.Pending.refund_payment(refund("refund_1", payment_id, 40))
+        with self.assertRaises(InvalidParamsError):
+            self.client.Pending.refund_payment(refund("refund_2", payment_id, 70))
+        self.client.Pending.refund_payment(refund("refund_3", payment_id, 60))
+        details = self.client.Payment.get_payment_details("order_1")
+        self.assertEqual(details.data.status, "REFUNDED")
+        self.assertEqual([r.status for r in details.data.refunds], ["COMPLETED"] * 2)
+        self.assertEqual(self.client.Pending.refund_details("refund_3").data.status,
+                         "COMPLETED")
+
+    def test_create_payment_is_idempotent(self):
+        """Test resending a payment returns the original one."""
+        first = self.client.Payment.create(payment("order_1"))
+        second = self.client.Payment.create(payment("order_1"))
+        self.assertEqual(first.data.payment_id, second.data.payment_id)
+        self.assertEqual(len(self.simulator.payments), 1)
+
+    def test_unknown_payment(self):
+        """Test details of an unknown payment are None."""
+        self.assertIsNone(self.client.Payment.get_payment_details("missing"))
+
+    def test_preauthorize_capture_and_revert(self):
+        """Test authorized payments can be captured but not reverted."""
+        authorized = self.client.Preauth.pre_authorize_create(payment("order_1"))
+        self.assertEqual(authorized["data"]["status"], "AUTHORIZED")
+        captured = self.client.Payment.capture_payment({
+            "merchantPaymentId": "order_1", "merchantCaptureId": "capture_1",
+            "amount": amount(100), "requestedAt": int(time.time()),
+            "orderDescription": "capture"})
+        self.assertEqual(captured.data.status, "COMPLETED")
+        with self.assertRaises(BadRequestError):
+            self.client.Payment.revert_payment({
+                "merchantRevertId": "revert_1", "paymentId": authorized["data"]["paymentId"],
+                "requestedAt": int(time.time())})
+
+    def test_qr_code_payment(self):
+        """Test a QR code payment completes when the user pays."""
+        self.client.post("/v2/codes", dict(payment("order_1"), codeType="ORDER_QR"),
+                         api_id=API_NAMES.CREATE_QRCODE)
+        self.assertEqual(self.simulator.payments["order_1"]["status"], "CREATED")
+        self.simulator.pay("order_1")
+        details = self.client.get("/v2/codes/payments/order_1", None,
+                                  api_id=API_NAMES.GET_QR_PAYMENT)
+        self.assertEqual(details["data"]["status"], "COMPLETED")
+        self.assertTrue(details["data"]["paymentId"])
+
+    def test_refund_of_canceled_payment_rejected(self):
+        """Test refunding a canceled payment fails."""
+        payment_id = self.client.Payment.create(payment("order_1")).data.payment_id
+        self.client.Payment.cancel_payment("order_1")
+        with self.assertRaises(UnacceptableOpError):
+            self.client.Pending.refund_payment(refund("refund_1", payment_id, 10))
+
+    def test_cashback(self):
+        """Test a cashback is accepted and then succeeds."""
+        response = self.client.Cashback.give_cashback({
+            "merchantCashbackId": "cashback_1",
+            "userAuthorizationId": "fake_user_authorization_id",
+            "amount": amount(10), "requestedAt": int(time.time()),
+            "walletType": "PREPAID"})
+        self.assertEqual(response["resultInfo"]["code"], "REQUEST_ACCEPTED")
+        details = self.client.Cashback.check_cashback_detail("cashback_1")
+        self.assertEqual(details["data"]["status"], "SUCCESS")
+
+    def test_rejects_bad_signature(self):
+        """Test requests signed with an unknown secret are rejected."""
+        client = paypayopa.Client(session=self.simulator.session(),
+                                  auth=("simulator_key", "wrong_secret"))
+        with self.assertRaises(UnauthorizedError):
+            client.Payment.create(payment("order_1"))
+        self.assertEqual(self.simulator.payments, {})
+
+    def test_rejects_replayed_nonce(self):
+        """Test an OPA-Auth header cannot be used twice."""
+        signer = self.client.signer
+        header = signer.sign("GET", "/v2/payments/order_1")
+        headers = {"Authorization": header}
+        self.assertEqual(self.simulator.handle("GET", "/v2/payments/order_1", headers)[0], 404)
+        self.assertEqual(self.simulator.handle("GET", "/v2/payments/order_1", headers)[0], 401)
+
+    def test_nonce_collisions_are_not_replays(self):
+        """Test different requests may share a nonce and timestamp."""
+        signer = self.client.signer
+        timestamp = str(int(time.time()))
+        for path in ("/v2/payments/order_1", "/v2/payments/order_2"):
+            headers = {"Authorization": signer.sign("GET", path, nonce="abcd1234",
+                                                    timestamp=timestamp)}
+            self.assertEqual(self.simulator.handle("GET", path, headers)[0], 404)
+
+    def test_injected_faults_are_retried(self):
+        """Test injected errors surface as typed errors and retries."""
+        self.simulator.inject(503, count=2, api_id=API_NAMES.GET_PAYMENT)
+        with self.assertRaises(ServerError):
+            self.client.Payment.get_payment_details("order_1")
+        client = self.simulator.client(retry=RetryPolicy(backoff_base=0.001))
+        self.assertIsNone(client.Payment.get_payment_details("order_1"))
+        self.assertEqual(self.simulator.stats["injected_errors"], 2)
+        self.assertEqual(self.simulator.stats[API_NAMES.GET_PAYMENT], 3)
+
+    def test_injected_refund_faults(self):
+        """Test faults injected for the SDK's refund api_id hit refunds."""
+        payment_id = self.client.Payment.create(payment("order_1")).data.payment_id
+        self.simulator.inject(500, count=1, api_id=API_NAMES.REFUND_REQUEST_ORDER)
+        with self.assertRaises(ServerError):
+            self.client.Pending.refund_payment(refund("refund_1", payment_id, 40))
+        self.client.Payment.refund_payment(refund("refund_1", payment_id, 40))
+        self.assertEqual(self.simulator.stats[API_NAMES.REFUND_REQUEST_ORDER], 2)
+
+    def test_http_server(self):
+        """Test the simulator served over HTTP."""
+        with self.simulator.serve() as server:
+            client = paypayopa.Client(auth=("simulator_key", "simulator_secret"),
+                                      base_url=server.url)
+            created = client.Payment.create(payment("order_1"))
+            details = client.Payment.get_payment_details("order_1")
+        self.assertEqual(created.data.payment_id, details.data.payment_id)
+
+
+class TestAsyncSimulator(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_client(self):
+        """Test the AsyncClient against the simulator transport."""
+        simulator = Simulator(latency=0.001)
+        async with simulator.async_client() as client:
+            created = await client.Payment.create(payment("order_1"))
+            details = await client.Payment.get_payment_details("order_1")
+        self.assertEqual(created.data.payment_id, details.data.payment_id)
@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import responses
+
+import paypayopa
+from paypayopa.constants.api_list import API_NAMES
+
+from .helpers import mock_file, ClientTestCase
+
+
+class TestSingleFlight(ClientTestCase):
+
+    def setUp(self):
+        super(TestSingleFlight, self).setUp()
+        self.payment_url = '{}/payments/fake_merchant_payment_id'.format(self.base_url)
+        self.barrier = threading.Barrier(8)
+
+    def slow(self, status, body):
+        def callback(request):
+            time.sleep(0.2)
+            return status, {}, json.dumps(body)
+        return callback
+
+    def fetch(self, client):
+        self.barrier.wait()
+        return client.Payment.get_payment_details('fake_merchant_payment_id')
+
+    @responses.activate
+    def test_concurrent_reads_share_a_request(self):
+        """Test concurrent identical GETs send a single request."""
+        responses.add_callback(responses.GET, self.payment_url,
+                               callback=self.slow(200, mock_file('get_payment_details_completed')))
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda _: self.fetch(self.client), range(8)))
+        self.assertEqual(len(responses.calls), 1)
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(self.client.single_flight.stats(),
+                         {API_NAMES.GET_PAYMENT: {'calls': 1, 'coalesced': 7}})
+
+    @responses.activate
+    def test_callers_get_their_own_results(self):
+        """Test coalesced callers cannot see each other's changes to a result."""
+        responses.add_callback(responses.GET, self.payment_url,
+                               callback=self.slow(200, mock_file('get_payment_details_completed')))
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda _: self.fetch(self.client), range(8)))
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(len({id(result) for result in results}), 8)
+        results[0].result_info['code'] = 'CHANGED'
+        self.assertTrue(all(result.result_info['code'] != 'CHANGED' for result in results[1:]))
+
+    @responses.activate
+    def test_errors_are_shared(self):
+        """Test waiting callers get the error of the shared request."""
+        responses.add_callback(responses.GET, self.payment_url,
+                               callback=self.slow(500, {}))
+        errors = []
+
+        def fetch(_):
+            try:
+                self.fetch(self.client)
+            except ValueError as e:
+                errors.append(e)
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(fetch, range(8)))
+        self.assertEqual(len(errors), 8)
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_sequential_reads_are_sent(self):
+        """Test reads that do not overlap are not coalesced."""
+        responses.add(responses.GET, self.payment_url,
+                      body=json.dumps(mock_file('get_payment_details_completed')))
+        self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        self.client.Payment.get_payment_details('fake_merchant_payment_id')
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_disabled(self):
+        """Test coalesce=False sends every read."""
+        responses.add_callback(responses.GET, self.payment_url,
+                               callback=self.slow(200, mock_file('get_payment_details_completed')))
+        client = paypayopa.Client(auth=('key_id', 'key_secret'), coalesce=False)
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(lambda _: self.fetch(client), range(8)))
+        self.assertEqual(len(responses.calls), 8)
@@ -0,0 +1,100 @@
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import paypayopa
+from paypayopa.cache import ResponseCache
+from paypayopa.simulator import Simulator
+from paypayopa.transports import InMemoryTransport
+
+THREADS = 200
+MERCHANTS = ["merchant_{}".format(i) for i in range(8)]
+
+
+class MerchantCheckingTransport(InMemoryTransport):
+    """Records requests whose X-ASSUME-MERCHANT is not the one they name"""
+
+    def __init__(self, handler):
+        super(MerchantCheckingTransport, self).__init__(handler)
+        self.mismatches = []
+
+    def request(self, method, url, headers, data=None, params=None, timeout=None):
+        merchant = headers['X-ASSUME-MERCHANT']
+        named = "{}{}{}".format(url, data or "", params or "")
+        if merchant not in named:
+            self.mismatches.append((merchant, method, url))
+        return super(MerchantCheckingTransport, self).request(method, url, headers, data, params)
+
+
+class TestThreadSafety(unittest.TestCase):
+
+    def setUp(self):
+        self.switch_interval = sys.getswitchinterval()
+        # switch threads as often as possible to surface races
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def test_shared_client_under_load(self):
+        """Test one client serves many threads acting for different merchants."""
+        simulator = Simulator()
+        transport = MerchantCheckingTransport(simulator.handle)
+        client = simulator.client(transport=transport, cache=ResponseCache())
+        resources = [client.Code, client.Payment, client.User]
+        state = [dict(vars(resource)) for resource in resources]
+
+        def checkout(i):
+            merchant = MERCHANTS[i % len(MERCHANTS)]
+            order = "{}-order-{}".format(merchant, i)
+            client.Code.create_qr_code({"merchantPaymentId": order, "codeType": "ORDER_QR",
+                                        "amount": {"amount": i + 1, "currency": "JPY"}},
+                                       assume_merchant=merchant)
+            details = client.Code.get_payment_details(order, assume_merchant=merchant)
+            client.Payment.get_payment_details(order, assume_merchant=merchant)
+            client.User.get_authorization_status(merchant, assume_merchant=merchant)
+            return order, details
+
+        with ThreadPoolExecutor(max_workers=THREADS) as executor:
+            results = list(executor.map(checkout, range(THREADS * 3)))
+        self.assertEqual(transport.mismatches, [])
+        # calls leave no state behind on the shared resources
+        self.assertEqual([dict(vars(resource)) for resource in resources], state)
+        for order, details in results:
+            self.assertEqual(details["data"]["merchantPaymentId"], order)
+
+    def test_concurrent_first_use(self):
+        """Test resources and the transport are created once per client."""
+        created = []
+
+        class CountingClient(paypayopa.Client):
+            def _new_transport(self):
+                created.append(time.perf_counter())
+                time.sleep(0.01)
+                return super(CountingClient, self)._new_transport()
+
+        client = CountingClient(auth=("key_id", "key_secret"))
+        barrier = threading.Barrier(32)
+
+        def first_use(_):
+            barrier.wait()
+            return client.Payment, client.Code, client.transport
+
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            seen = list(executor.map(first_use, range(32)))
+        self.assertEqual(len(created), 1)
+        for resources in zip(*seen):
+            self.assertEqual(len(set(map(id, resources))), 1)
+        client.close()
+
+    def test_assume_merchant_per_call(self):
+        """Test a per-call merchant does not leak into the client default."""
+        simulator = Simulator()
+        transport = MerchantCheckingTransport(simulator.handle)
+        client = simulator.client(transport=transport, assume_merchant="merchant_0")
+        client.Payment.get_payment_details("merchant_1-order", assume_merchant="merchant_1")
+        client.Payment.get_payment_details("merchant_0-order")
+        self.assertEqual(client.assume_merchant, "merchant_0")
+        self.assertEqual(transport.mismatches, [])
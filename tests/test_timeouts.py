@@ -0,0 +1,200 @@
+import asyncio
+import threading
+import time
+import unittest
+
+import requests
+
+import paypayopa
+from paypayopa import timeouts
+from paypayopa.bulk import run_concurrent
+from paypayopa.constants.api_list import API_NAMES
+from paypayopa.errors import DeadlineExceeded, MaintenanceError
+from paypayopa.poller import PaymentPoller
+from paypayopa.retry import RetryPolicy
+from paypayopa.simulator import Simulator
+from paypayopa.singleflight import SingleFlight
+from paypayopa.timeouts import Timeouts, deadline
+from paypayopa.transports import InMemoryTransport
+
+
+class TimeoutSpyTransport(InMemoryTransport):
+
+    def __init__(self, handler):
+        super(TimeoutSpyTransport, self).__init__(handler)
+        self.timeouts = []
+
+    def request(self, method, url, headers, data=None, params=None, timeout=None):
+        self.timeouts.append(timeout)
+        return super(TimeoutSpyTransport, self).request(method, url, headers, data, params)
+
+
+class TestTimeouts(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = Simulator()
+        self.transport = TimeoutSpyTransport(self.simulator.handle)
+
+    def client(self, **options):
+        return self.simulator.client(transport=self.transport, **options)
+
+    def test_default_and_per_api_timeouts(self):
+        """Test every request gets the connect/read timeouts of its API."""
+        client = self.client(timeout=Timeouts(2, 10, {API_NAMES.GET_PAYMENT: 3}))
+        client.Payment.cancel_payment('order_1')
+        client.Payment.get_payment_details('order_1')
+        self.assertEqual(self.transport.timeouts, [(2, 10), (2, 3)])
+
+    def test_timeout_option_forms(self):
+        """Test the timeout option accepts seconds, tuples and False."""
+        self.assertEqual(timeouts.get_timeouts().get(None), (5.0, 30.0))
+        self.assertEqual(timeouts.get_timeouts(2).get(None), (2, 2))
+        self.assertEqual(timeouts.get_timeouts((1, 4)).get(None), (1, 4))
+        self.assertEqual(timeouts.get_timeouts(False).get(None), (None, None))
+
+    def test_deadline_shortens_timeouts(self):
+        """Test timeouts are clamped to the time left before the deadline."""
+        client = self.client()
+        with deadline(0.5):
+            client.Payment.get_payment_details('order_1')
+        connect, read = self.transport.timeouts[0]
+        self.assertLessEqual(connect, 0.5)
+        self.assertLessEqual(read, 0.5)
+
+    def test_nested_deadline_keeps_the_earlier_one(self):
+        """Test an inner deadline cannot extend an outer one."""
+        with deadline(0.1) as outer:
+            with deadline(10) as inner:
+                self.assertEqual(inner, outer)
+        self.assertIsNone(timeouts.remaining())
+
+    def test_expired_deadline_sends_nothing(self):
+        """Test requests after the deadline fail without being sent."""
+        client = self.client()
+        with deadline(0.01):
+            time.sleep(0.02)
+            with self.assertRaises(DeadlineExceeded):
+                client.Payment.get_payment_details('order_1')
+        self.assertEqual(self.transport.timeouts, [])
+
+    def test_deadline_stops_retries(self):
+        """Test a retry that cannot finish before the deadline is not sent."""
+        self.simulator.inject(503, count=5)
+        client = self.client(retry=RetryPolicy(max_attempts=5, backoff_base=1, jitter=False))
+        started = time.monotonic()
+        with deadline(0.5):
+            with self.assertRaises(MaintenanceError):
+                client.Payment.get_payment_details('order_1')
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(len(self.transport.timeouts), 1)
+
+    def test_read_timeout_over_http(self):
+        """Test a stalled response times out instead of blocking."""
+        simulator = Simulator(latency=0.5)
+        with simulator.serve() as server:
+            client = paypayopa.Client(auth=next(iter(simulator.credentials.items())),
+                                      base_url=server.url, timeout=(1, 0.1))
+            with self.assertRaises(requests.Timeout):
+                client.Payment.get_payment_details('order_1')
+            client = paypayopa.Client(auth=next(iter(simulator.credentials.items())),
+                                      base_url=server.url, retry=True)
+            started = time.monotonic()
+            with deadline(0.2):
+                with self.assertRaises(DeadlineExceeded):
+                    client.Payment.get_payment_details('order_1')
+            self.assertLess(time.monotonic() - started, 0.45)
+
+    def test_coalesced_reads_keep_their_deadlines(self):
+        """Test GETs under different deadlines are not shared."""
+        simulator = Simulator(latency=0.3)
+        with simulator.serve() as server:
+            client = paypayopa.Client(auth=next(iter(simulator.credentials.items())),
+                                      base_url=server.url)
+            errors = []
+
+            def fetch():
+                with deadline(0.1):
+                    try:
+                        client.Payment.get_payment_details('order_1')
+                    except DeadlineExceeded as e:
+                        errors.append(e)
+            thread = threading.Thread(target=fetch)
+            thread.start()
+            time.sleep(0.02)
+            client.Payment.get_payment_details('order_1')
+            thread.join()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(simulator.stats[API_NAMES.GET_PAYMENT], 2)
+
+    def test_follower_waits_until_its_deadline(self):
+        """Test a caller sharing an in-flight call stops at its deadline."""
+        single_flight = SingleFlight()
+        started = threading.Event()
+
+        def slow():
+            started.set()
+            time.sleep(0.3)
+            return 'done'
+        thread = threading.Thread(target=single_flight.do, args=(('api', 1), slow))
+        thread.start()
+        started.wait()
+        begun = time.monotonic()
+        with deadline(0.05):
+            with self.assertRaises(DeadlineExceeded):
+                single_flight.do(('api', 1), slow)
+        self.assertLess(time.monotonic() - begun, 0.2)
+        thread.join()
+
+    def test_deadline_propagates_to_bulk_calls(self):
+        """Test bulk calls run under the caller's deadline."""
+        def call(key):
+            time.sleep(0.05)
+            return timeouts.remaining()
+
+        with deadline(0.08):
+            results = list(run_concurrent(call, range(6), concurrency=2, ordered=True))
+        self.assertTrue(all(r.response is not None for r in results if r.ok))
+        self.assertTrue(any(isinstance(r.error, DeadlineExceeded) for r in results))
+
+    def test_deadline_propagates_to_poller(self):
+        """Test watches started under a deadline stop when it passes."""
+        client = self.client()
+        client.post('/v2/codes', {"merchantPaymentId": "order_1", "codeType": "ORDER_QR",
+                                  "amount": {"amount": 1, "currency": "JPY"}},
+                    api_id=API_NAMES.CREATE_QRCODE)
+
+        def fetch(merchant_payment_id):
+            return client.get('/v2/codes/payments/{}'.format(merchant_payment_id), None,
+                              api_id=API_NAMES.GET_QR_PAYMENT)
+        with PaymentPoller(fetch=fetch, initial_interval=0.02) as poller:
+            with deadline(0.1):
+                future = poller.watch('order_1')
+            with self.assertRaises(DeadlineExceeded):
+                future.result(timeout=2)
+
+
+class TestAsyncDeadline(unittest.IsolatedAsyncioTestCase):
+
+    async def test_follower_waits_until_its_deadline(self):
+        """Test an async caller sharing an in-flight call stops at its deadline."""
+        single_flight = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.3)
+            return 'done'
+        leader = asyncio.ensure_future(single_flight.do_async(('api', 1), slow))
+        await asyncio.sleep(0)
+        with deadline(0.05):
+            with self.assertRaises(DeadlineExceeded):
+                await single_flight.do_async(('api', 1), slow)
+        self.assertEqual(await leader, 'done')
+
+    async def test_deadline_cancels_request(self):
+        """Test the AsyncClient cancels a request at the deadline."""
+        simulator = Simulator(latency=1.0)
+        async with simulator.async_client() as client:
+            started = time.monotonic()
+            with deadline(0.1):
+                with self.assertRaises(DeadlineExceeded):
+                    await client.Payment.get_payment_details('order_1')
+        self.assertLess(time.monotonic() - started, 0.5)
@@ -0,0 +1,167 @@
+import gzip
+import os
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+
+import requests
+import urllib3
+
+import paypayopa
+from paypayopa.constants.api_list import API_NAMES
+from paypayopa.objects.payment import PaymentAPIResponse
+from paypayopa.recording import RecordingTransport, Replayer, load
+from paypayopa.retry import RetryPolicy
+from paypayopa.simulator import Simulator
+from paypayopa.transports import (HttpxTransport, InMemoryTransport, RequestsTransport,
+                                  Urllib3Transport, get_transport)
+
+
+def payment(merchant_payment_id):
+    return {"merchantPaymentId": merchant_payment_id,
+            "userAuthorizationId": "fake_user_authorization_id",
+            "amount": {"amount": 100, "currency": "JPY"},
+            "requestedAt": int(time.time())}
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class TestTransports(unittest.TestCase):
+
+    def setUp(self):
+        self.simulator = Simulator()
+        self.auth = next(iter(self.simulator.credentials.items()))
+        self.server = self.simulator.serve()
+
+    def tearDown(self):
+        self.server.close()
+
+    def round_trip(self, transport):
+        client = paypayopa.Client(auth=self.auth, base_url=self.server.url,
+                                  transport=transport, warm_up=True)
+        created = client.Payment.create(payment('order_{}'.format(transport)))
+        self.assertIsInstance(created, PaymentAPIResponse)
+        details = client.Payment.get_payment_details('order_{}'.format(transport))
+        self.assertEqual(details.data.payment_id, created.data.payment_id)
+        self.assertIsNone(client.Payment.get_payment_details('missing'))
+        return client
+
+    def test_builtin_transports(self):
+        """Test every built-in transport against the simulator server."""
+        for name, cls in (('requests', RequestsTransport), ('urllib3', Urllib3Transport),
+                          ('httpx', HttpxTransport)):
+            with self.subTest(name):
+                client = self.round_trip(name)
+                self.assertIsInstance(client.transport, cls)
+                client.close()
+
+    def test_urllib3_pool_stats(self):
+        """Test the urllib3 transport reuses and reports connections."""
+        client = self.round_trip('urllib3')
+        host = client.pool_stats()[self.server.url]
+        self.assertEqual(host['connections_opened'], 1)
+        self.assertEqual(host['requests'], 4)
+
+    def test_transport_errors_are_retried(self):
+        """Test connection errors of any transport are retried."""
+        for name in ('requests', 'urllib3', 'httpx'):
+            with self.subTest(name):
+                retry = RetryPolicy(max_attempts=2, backoff_base=0.001)
+                client = paypayopa.Client(auth=self.auth, transport=name, retry=retry,
+                                          base_url='http://127.0.0.1:{}'.format(closed_port()))
+                with self.assertRaises(client.transport.errors):
+                    client.Payment.get_payment_details('order_1')
+                self.assertEqual(retry.stats.snapshot()[API_NAMES.GET_PAYMENT]['retries'], 1)
+
+    def test_tls_errors_are_retried(self):
+        """Test a failed TLS handshake is retried by the urllib3 transport."""
+        retry = RetryPolicy(max_attempts=2, backoff_base=0.001)
+        client = paypayopa.Client(auth=self.auth, transport='urllib3', retry=retry,
+                                  base_url=self.server.url.replace('http:', 'https:'))
+        with self.assertRaises(client.transport.errors):
+            client.Payment.get_payment_details('order_1')
+        self.assertEqual(retry.stats.snapshot()[API_NAMES.GET_PAYMENT]['retries'], 1)
+        client.close()
+
+    def test_session_must_fit_the_transport(self):
+        """Test a session of another HTTP library is rejected."""
+        with self.assertRaises(TypeError):
+            get_transport(session=requests.Session(), transport='urllib3')
+        with self.assertRaises(TypeError):
+            get_transport(session=urllib3.PoolManager(), transport='requests')
+
+    def test_unknown_transport(self):
+        """Test unknown transport names are rejected."""
+        with self.assertRaises(ValueError):
+            get_transport(transport='curl')
+
+    def test_session_is_wrapped(self):
+        """Test a given session is used by the requests transport."""
+        session = self.simulator.session()
+        client = paypayopa.Client(auth=self.auth, session=session)
+        self.assertIs(client.session, session)
+        self.assertIsInstance(client.Payment.create(payment('order_1')), PaymentAPIResponse)
+
+
+class TestInMemoryTransport(unittest.TestCase):
+
+    def test_in_memory_transport(self):
+        """Test the in-memory transport passes the signed request."""
+        requests = []
+
+        def handler(method, path, headers, body, query):
+            requests.append((method, path, headers, body, query))
+            return 200, {'Retry-After': '1'}, b'{"resultInfo": {"code": "SUCCESS"}}'
+        client = paypayopa.Client(auth=('key_id', 'key_secret'),
+                                  transport=InMemoryTransport(handler))
+        client.Payment.cancel_payment('order_1')
+        method, path, headers, body, query = requests[-1]
+        self.assertEqual((method, path, body), ('DELETE', '/v2/payments/order_1', b''))
+        self.assertTrue(headers['Authorization'].startswith('hmac OPA-Auth:key_id:'))
+
+    def test_record_and_replay_transport(self):
+        """Test recording and replaying at the transport layer."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'traffic.jsonl.gz')
+        simulator = Simulator()
+        transport = RecordingTransport(path, simulator.transport())
+        client = simulator.client(transport=transport)
+        created = client.Payment.create(payment('order_1'))
+        client.close()
+        self.assertEqual([e['path'] for e in load(path)], ['/v2/payments'])
+        with gzip.open(path) as f:
+            self.assertNotIn(b'fake_user_authorization_id', f.read())
+        client = paypayopa.Client(auth=('key_id', 'key_secret'),
+                                  transport=Replayer(path).transport())
+        self.assertEqual(client.Payment.create(payment('order_1')).data.payment_id,
+                         created.data.payment_id)
+
+
+class TestAsyncTransports(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_in_memory_transport(self):
+        """Test the AsyncClient over the simulator's async transport."""
+        simulator = Simulator()
+        async with simulator.async_client() as client:
+            created = await client.Payment.create(payment('order_1'))
+            self.assertEqual(client.pool_stats(), {})
+        self.assertEqual(created.data.status, 'COMPLETED')
+
+    async def test_async_httpx_transport(self):
+        """Test the default AsyncClient transport over HTTP."""
+        simulator = Simulator()
+        with simulator.serve() as server:
+            async with paypayopa.AsyncClient(auth=next(iter(simulator.credentials.items())),
+                                             base_url=server.url) as client:
+                await client.warm_up()
+                created = await client.Payment.create(payment('order_1'))
+                self.assertEqual(sum(host['connections']
+                                     for host in client.pool_stats().values()), 1)
+        self.assertEqual(created.data.status, 'COMPLETED')
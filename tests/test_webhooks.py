@@ -0,0 +1,225 @@
+import asyncio
+import base64
+import datetime
+import io
+import json
+import threading
+import unittest
+
+import jwt
+
+from paypayopa.objects.notification import TransactionNotification, UserAuthorizationNotification
+from paypayopa.simulator import Simulator
+from paypayopa.webhooks import ApiVerifier, LRUSet, WebhookReceiver
+
+SECRET = base64.b64encode(b'fake_secret_fake_secret_fake_sec').decode()
+
+
+def transaction(state='COMPLETED', merchant_order_id='fake_merchant_payment_id'):
+    return json.dumps({
+        "notification_type": "Transaction",
+        "merchant_id": "fake_merchant_id",
+        "store_id": "",
+        "pos_id": "",
+        "order_id": "fake_order_id",
+        "merchant_order_id": merchant_order_id,
+        "authorized_at": None,
+        "expires_at": None,
+        "paid_at": "2024-01-01T00:00:00Z",
+        "order_amount": "100",
+        "state": state,
+    }).encode()
+
+
+class TestWebhookReceiver(unittest.TestCase):
+
+    def setUp(self):
+        self.receiver = WebhookReceiver(secret=SECRET, client_id='fake_client_id',
+                                        verifier=lambda notification: True)
+        self.received = []
+        self.receiver.on(TransactionNotification)(self.received.append)
+
+    def test_dispatch(self):
+        """Test a notification is parsed into its class and dispatched."""
+        status, _ = self.receiver.handle(transaction())
+        self.assertEqual(status, 200)
+        notification, = self.received
+        self.assertEqual(notification.state, 'COMPLETED')
+        self.assertEqual(notification.merchant_order_id, 'fake_merchant_payment_id')
+
+    def test_duplicates(self):
+        """Test redelivered notifications are acknowledged once."""
+        self.receiver.handle(transaction())
+        status, body = self.receiver.handle(transaction())
+        self.assertEqual(status, 200)
+        self.assertIn(b'duplicate', body)
+        self.receiver.handle(transaction(state='REFUNDED'))
+        self.assertEqual([n.state for n in self.received], ['COMPLETED', 'REFUNDED'])
+
+    def test_handler_failure_is_redelivered(self):
+        """Test a failed handler leaves the notification to be delivered again."""
+        receiver = WebhookReceiver(verifier=lambda notification: True)
+        calls = []
+
+        @receiver.on(object)
+        def flaky(notification):
+            calls.append(notification)
+            if len(calls) == 1:
+                raise RuntimeError("database down")
+        with self.assertLogs('paypayopa.webhooks', 'ERROR'):
+            self.assertEqual(receiver.handle(transaction())[0], 500)
+        self.assertEqual(receiver.handle(transaction())[0], 200)
+        self.assertEqual(len(calls), 2)
+
+    def test_invalid_body(self):
+        """Test unparseable bodies are rejected."""
+        with self.assertLogs('paypayopa.webhooks', 'WARNING'):
+            self.assertEqual(self.receiver.handle(b'not json')[0], 400)
+            self.assertEqual(self.receiver.handle(b'{"notification_type": "Nope"}')[0], 400)
+
+    def test_verifier(self):
+        """Test a notification the verifier rejects is not dispatched or remembered."""
+        self.receiver.verifier = lambda notification: notification.state != 'FAILED'
+        with self.assertLogs('paypayopa.webhooks', 'WARNING'):
+            self.assertEqual(self.receiver.handle(transaction(state='FAILED'))[0], 401)
+        self.assertEqual(self.received, [])
+        self.assertEqual(len(self.receiver.seen), 0)
+
+    def test_verification_is_required(self):
+        """Test a receiver cannot accept notifications unverified by default."""
+        with self.assertRaises(ValueError):
+            WebhookReceiver(secret=SECRET)
+        with self.assertLogs('paypayopa.webhooks', 'WARNING'):
+            receiver = WebhookReceiver(verify=False)
+        self.assertEqual(receiver.handle(transaction())[0], 200)
+        self.receiver.verifier = None
+        with self.assertLogs('paypayopa.webhooks', 'WARNING'):
+            self.assertEqual(self.receiver.handle(transaction())[0], 401)
+        self.assertEqual(self.received, [])
+
+    def test_api_verifier(self):
+        """Test transaction states are confirmed through the API by default."""
+        client = Simulator().client()
+        client.Payment.create({"merchantPaymentId": "fake_merchant_payment_id",
+                               "userAuthorizationId": "fake_user_authorization_id",
+                               "amount": {"amount": 100, "currency": "JPY"},
+                               "requestedAt": 1})
+        receiver = WebhookReceiver(client=client)
+        self.assertIsInstance(receiver.verifier, ApiVerifier)
+        self.assertEqual(receiver.handle(transaction(state='COMPLETED'))[0], 200)
+        with self.assertLogs('paypayopa.webhooks', 'WARNING'):
+            self.assertEqual(receiver.handle(transaction(state='REFUNDED'))[0], 401)
+
+    def test_api_verifier_skips_the_cache(self):
+        """Test a cached payment state does not reject a genuine notification."""
+        simulator = Simulator()
+        client = simulator.client(cache=True)
+        created = client.Payment.create({"merchantPaymentId": "fake_merchant_payment_id",
+                                         "userAuthorizationId": "fake_user_authorization_id",
+                                         "amount": {"amount": 100, "currency": "JPY"},
+                                         "requestedAt": 1})
+        client.Payment.get_payment_details("fake_merchant_payment_id")
+        # refunded through another client, so the cached COMPLETED stays
+        simulator.client().Payment.refund_payment({
+            "merchantRefundId": "fake_refund_id", "paymentId": created.data.payment_id,
+            "amount": {"amount": 100, "currency": "JPY"}})
+        receiver = WebhookReceiver(client=client)
+        self.assertEqual(receiver.handle(transaction(state='REFUNDED'))[0], 200)
+
+    def test_async_api_verifier(self):
+        """Test an AsyncClient verifies notifications received with handle_async."""
+        simulator = Simulator()
+        receiver = WebhookReceiver(client=simulator.async_client())
+        received = []
+        receiver.on(TransactionNotification)(received.append)
+
+        async def receive():
+            await receiver.verifier.client.Payment.create(
+                {"merchantPaymentId": "fake_merchant_payment_id",
+                 "userAuthorizationId": "fake_user_authorization_id",
+                 "amount": {"amount": 100, "currency": "JPY"},
+                 "requestedAt": 1})
+            with self.assertLogs('paypayopa.webhooks', 'WARNING'):
+                self.assertEqual((await receiver.handle_async(transaction(state='REFUNDED')))[0],
+                                 401)
+            return (await receiver.handle_async(transaction(state='COMPLETED')))[0]
+        self.assertEqual(asyncio.run(receive()), 200)
+        self.assertEqual([n.state for n in received], ['COMPLETED'])
+        # the blocking handle() cannot await the verifier
+        with self.assertLogs('paypayopa.webhooks', 'ERROR'):
+            self.assertEqual(receiver.handle(transaction(state='CANCELED'))[0], 500)
+
+    def test_asgi_does_not_block_the_loop(self):
+        """Test a blocking verifier runs off the event loop under asgi."""
+        threads = []
+
+        def verifier(notification):
+            threads.append(threading.get_ident())
+            return True
+        self.receiver.verifier = verifier
+        messages = [{'type': 'http.request', 'body': transaction()}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        async def serve():
+            await self.receiver.asgi({'type': 'http', 'headers': []}, receive, send)
+            return threading.get_ident()
+        loop_thread = asyncio.run(serve())
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], loop_thread)
+
+    def test_jwt(self):
+        """Test account link JWTs are verified with the secret."""
+        results = []
+        self.receiver.on(UserAuthorizationNotification)(results.append)
+        claims = {"result": "succeeded", "userAuthorizationId": "fake_user_authorization_id",
+                  "referenceId": "fake_reference_id", "nonce": "abc", "aud": "fake_client_id",
+                  "exp": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)}
+        token = jwt.encode(claims, base64.b64decode(SECRET), algorithm='HS256')
+        self.assertEqual(self.receiver.handle(token, 'application/jwt')[0], 200)
+        self.assertEqual(results[0].user_authorization_id, 'fake_user_authorization_id')
+        forged = jwt.encode(claims, b'other_secret_other_secret_other_', algorithm='HS256')
+        with self.assertLogs('paypayopa.webhooks', 'WARNING'):
+            self.assertEqual(self.receiver.handle(forged)[0], 401)
+
+    def test_wsgi(self):
+        """Test the WSGI adapter."""
+        body = transaction()
+        started = []
+        environ = {'CONTENT_LENGTH': str(len(body)), 'CONTENT_TYPE': 'application/json',
+                   'wsgi.input': io.BytesIO(body)}
+        payload = self.receiver.wsgi(environ, lambda status, headers: started.append(status))
+        self.assertEqual(started, ['200 OK'])
+        self.assertEqual(json.loads(b''.join(payload)), {'status': 'ok'})
+
+    def test_asgi(self):
+        """Test the ASGI adapter."""
+        body = transaction()
+        messages = [{'type': 'http.request', 'body': body[:10], 'more_body': True},
+                    {'type': 'http.request', 'body': body[10:]}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+        asyncio.run(self.receiver.asgi({'type': 'http', 'headers': []}, receive, send))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual(len(self.received), 1)
+
+    def test_lru_set(self):
+        """Test the dedupe store is bounded."""
+        seen = LRUSet(maxsize=2)
+        self.assertTrue(seen.add('a'))
+        self.assertTrue(seen.add('b'))
+        self.assertFalse(seen.add('a'))
+        self.assertTrue(seen.add('c'))
+        self.assertNotIn('b', seen)
+        self.assertIn('a', seen)